@@ -0,0 +1,97 @@
+"""
+Created on 2026-10-19
+
+@author: wf
+"""
+
+import asyncio
+import os
+from unittest import mock
+from urllib.parse import urlencode
+
+from ngwidgets.basetest import Basetest
+from starlette.requests import Request
+
+from wd.admin import AdminAccess
+
+
+class TestAdmin(Basetest):
+    """
+    test the access check for the admin pages
+    """
+
+    @staticmethod
+    def get_request(
+        host: str = "127.0.0.1",
+        headers: dict = None,
+        method: str = "GET",
+        body: bytes = b"",
+    ) -> Request:
+        """
+        get a request from the given client host with the given headers
+        """
+        headers = headers or {}
+        scope = {
+            "type": "http",
+            "method": method,
+            "scheme": "http",
+            "path": AdminAccess.login_path,
+            "query_string": b"",
+            "headers": [
+                (name.lower().encode("latin-1"), value.encode("latin-1"))
+                for name, value in headers.items()
+            ],
+            "client": (host, 4711),
+            "server": ("localhost", 9997),
+        }
+
+        async def receive():
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        request = Request(scope, receive)
+        return request
+
+    def testIsAdmin(self):
+        """
+        test that only the token grants admin access unless localhost is trusted
+        """
+        env = {AdminAccess.token_env: "secret"}
+        with mock.patch.dict(os.environ, env, clear=True):
+            self.assertFalse(AdminAccess.is_admin(self.get_request()))
+            self.assertFalse(AdminAccess.is_admin(None))
+            bearer = {"Authorization": "Bearer secret"}
+            self.assertTrue(AdminAccess.is_admin(self.get_request("10.0.0.1", bearer)))
+            wrong = {"Authorization": "Bearer guess"}
+            self.assertFalse(AdminAccess.is_admin(self.get_request(headers=wrong)))
+            cookie = f"{AdminAccess.cookie_name}={AdminAccess.session_value('secret')}"
+            request = self.get_request("10.0.0.1", {"Cookie": cookie})
+            self.assertTrue(AdminAccess.is_admin(request))
+        env = {AdminAccess.trust_localhost_env: "true"}
+        with mock.patch.dict(os.environ, env, clear=True):
+            self.assertTrue(AdminAccess.is_admin(self.get_request("::1")))
+            self.assertFalse(AdminAccess.is_admin(self.get_request("10.0.0.1")))
+
+    def testLogin(self):
+        """
+        test that the login sets the admin cookie without the token
+        """
+        headers = {"Content-Type": "application/x-www-form-urlencoded"}
+
+        def login(token: str, next_path: str):
+            body = urlencode({"token": token, "next": next_path}).encode("utf-8")
+            request = self.get_request(headers=headers, method="POST", body=body)
+            response = asyncio.run(AdminAccess.login(request))
+            return response
+
+        with mock.patch.dict(os.environ, {AdminAccess.token_env: "secret"}):
+            response = login("guess", "/admin/profiler")
+            self.assertEqual(403, response.status_code)
+            response = login("secret", "https://example.org/")
+            cookie = response.headers["set-cookie"]
+            if self.debug:
+                print(cookie)
+            self.assertEqual(303, response.status_code)
+            self.assertEqual("/admin/sessions", response.headers["location"])
+            self.assertIn(AdminAccess.session_value("secret"), cookie)
+            self.assertNotIn("secret;", cookie)
+            self.assertIn("HttpOnly", cookie)
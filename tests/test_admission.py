@@ -0,0 +1,128 @@
+"""
+Created on 2026-10-19
+
+@author: wf
+"""
+
+import asyncio
+import threading
+import time
+
+from ngwidgets.basetest import Basetest
+
+from wd.admission import AdmissionController
+
+
+class TestAdmission(Basetest):
+    """
+    test the fair share admission control
+    """
+
+    def testFairShare(self):
+        """
+        test that a client with many queued analyses does not starve others
+        """
+        controller = AdmissionController(max_analyses=1)
+        order = []
+        positions = {}
+        release = threading.Event()
+
+        def analysis(client_id: str, name: str):
+            def on_wait(position: int):
+                positions.setdefault(name, position)
+
+            with controller.analysis(client_id, on_wait=on_wait):
+                order.append(name)
+                if name == "a0":
+                    release.wait(5)
+
+        threads = []
+        for name, client_id in [
+            ("a0", "a"),
+            ("a1", "a"),
+            ("a2", "a"),
+            ("a3", "a"),
+            ("b1", "b"),
+        ]:
+            thread = threading.Thread(target=analysis, args=(client_id, name))
+            thread.start()
+            threads.append(thread)
+            # make sure the tickets arrive in order
+            time.sleep(0.05)
+        metrics = {record["kind"]: record for record in controller.metrics()}
+        self.assertEqual(1, metrics["analysis"]["running"])
+        self.assertEqual(4, metrics["analysis"]["queue depth"])
+        # client b has no running analysis and overtakes the queued ones of a
+        self.assertEqual(1, positions["b1"])
+        release.set()
+        for thread in threads:
+            thread.join(5)
+        if self.debug:
+            print(order)
+            print(controller.metrics())
+        self.assertEqual(["a0", "b1", "a1", "a2", "a3"], order)
+        metrics = {record["kind"]: record for record in controller.metrics()}
+        self.assertEqual(5, metrics["analysis"]["admitted"])
+        self.assertEqual(0, metrics["analysis"]["queue depth"])
+        self.assertGreater(metrics["analysis"]["wait max s"], 0.1)
+
+    def testReentrant(self):
+        """
+        test that nested slots of the same thread do not wait for themselves
+        """
+        controller = AdmissionController(max_analyses=1, max_queries=1)
+        with controller.client("a"), controller.analysis() as ticket:
+            self.assertEqual("a", ticket.client_id)
+            with controller.analysis() as nested:
+                self.assertIsNone(nested)
+                with controller.query(), controller.query():
+                    self.assertEqual(1, controller.running["query"])
+        self.assertEqual({"analysis": 0, "query": 0}, controller.running)
+
+    def testRunAdmitted(self):
+        """
+        test that analyses queued on the event loop hold no worker thread
+        """
+        controller = AdmissionController(max_analyses=1)
+        running = []
+        positions = []
+
+        def analysis(name: str) -> str:
+            running.append(name)
+            # the slot is held in the worker thread
+            self.assertEqual(1, controller.running["analysis"])
+            self.assertEqual(1, controller.depth("analysis"))
+            time.sleep(0.1)
+            return name
+
+        async def run_all():
+            tasks = [
+                asyncio.create_task(
+                    controller.run_admitted(
+                        "analysis",
+                        analysis,
+                        name,
+                        client_id=client_id,
+                        on_wait=positions.append,
+                    )
+                )
+                for name, client_id in [("a0", "a"), ("a1", "a"), ("b1", "b")]
+            ]
+            await asyncio.sleep(0.05)
+            metrics = {record["kind"]: record for record in controller.metrics()}
+            self.assertEqual(2, metrics["analysis"]["queue depth"])
+            # a queued analysis that is cancelled never runs
+            tasks[1].cancel()
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+            return results
+
+        results = asyncio.run(run_all())
+        if self.debug:
+            print(results, running, positions)
+        self.assertEqual("a0", results[0])
+        self.assertIsInstance(results[1], asyncio.CancelledError)
+        self.assertEqual("b1", results[2])
+        self.assertEqual(["a0", "b1"], running)
+        self.assertIn(1, positions)
+        self.assertEqual({"analysis": 0, "query": 0}, controller.running)
+        self.assertEqual([], controller.waiting)
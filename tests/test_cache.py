@@ -0,0 +1,49 @@
+"""
+Created on 2026-10-19
+
+@author: wf
+"""
+
+import time
+
+from ngwidgets.basetest import Basetest
+
+from wd.cache import TTLCache
+
+
+class TestCache(Basetest):
+    """
+    test the shared time to live cache
+    """
+
+    def testTTLCache(self):
+        """
+        test size limit, time to live and statistics
+        """
+        cache = TTLCache("test", max_size=3, ttl=0.2)
+        for i in range(5):
+            cache.put(("Q5", i), i)
+        self.assertEqual(3, len(cache))
+        self.assertIsNone(cache.get(("Q5", 0)))
+        self.assertEqual(4, cache.get(("Q5", 4)))
+        computed = cache.get_or_compute(("Q5", 5), lambda: 5)
+        self.assertEqual(5, computed)
+        self.assertIn(("Q5", 5), cache)
+        time.sleep(0.3)
+        self.assertNotIn(("Q5", 5), cache)
+        self.assertIsNone(cache.get(("Q5", 5)))
+        stats = cache.stats()
+        if self.debug:
+            print(stats)
+        self.assertEqual(1, stats["hits"])
+
+    def testExpiresIn(self):
+        """
+        test the remaining time to live of entries computed with their own ttl
+        """
+        cache = TTLCache("test", ttl=10)
+        self.assertEqual(0.0, cache.expires_in("Q5"))
+        cache.get_or_compute("Q5", lambda: 5, ttl=100)
+        self.assertGreater(cache.expires_in("Q5"), 10)
+        cache.put("Q6", 6)
+        self.assertLessEqual(cache.expires_in("Q6"), 10)
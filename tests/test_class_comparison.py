@@ -0,0 +1,58 @@
+"""
+Created on 2026-10-19
+
+@author: wf
+"""
+
+from ngwidgets.basetest import Basetest
+
+from wd.class_comparison import ClassComparison
+from wd.truly_tabular_display import TrulyTabularConfig
+
+
+class TestClassComparison(Basetest):
+    """
+    test the grouped multi class comparison queries
+    """
+
+    def testGroupedQueries(self):
+        """
+        test that the classes are fanned out in chunks
+        """
+        qids = ClassComparison.parse_qids("Q5, Q215627,Q5,,Q7889")
+        self.assertEqual(["Q5", "Q215627", "Q7889"], qids)
+        endpoint = TrulyTabularConfig().sparql_endpoint
+        comparison = ClassComparison(endpoint, qids, chunk_size=2)
+        chunks = comparison.chunks()
+        self.assertEqual([["Q5", "Q215627"], ["Q7889"]], chunks)
+        count_query = comparison.count_query(chunks[0])
+        properties_query = comparison.properties_query(chunks[0])
+        if self.debug:
+            print(count_query)
+            print(properties_query)
+        for query in [count_query, properties_query]:
+            self.assertIn("VALUES ?class { wd:Q5 wd:Q215627 }", query)
+            self.assertIn("?item wdt:P31 ?class.", query)
+        self.assertIn("GROUP BY ?class ?p", properties_query)
+
+    def testInvalidQids(self):
+        """
+        test that only plain QIDs are accepted and the number of classes is capped
+        """
+        for qids_text in [
+            "Q5,wd:Q1} ?s ?p ?o {",
+            "Q5 Q215627",
+            "P31",
+            "Q5\nQ7",
+        ]:
+            with self.assertRaises(ValueError):
+                ClassComparison.parse_qids(qids_text)
+        too_many = ",".join(f"Q{i}" for i in range(ClassComparison.max_classes + 1))
+        with self.assertRaises(ValueError):
+            ClassComparison.parse_qids(too_many)
+        endpoint = TrulyTabularConfig().sparql_endpoint
+        comparison = ClassComparison(endpoint, ["Q5", "Q5}"])
+        with self.assertRaises(ValueError):
+            comparison.values_clause(comparison.qids)
+        with self.assertRaises(ValueError):
+            comparison.values_clause(["Q5\n"])
@@ -0,0 +1,137 @@
+"""
+Created on 2026-10-19
+
+@author: wf
+"""
+
+import tempfile
+
+from ngwidgets.basetest import Basetest
+
+from wd.class_profile import ClassProfile, ClassProfileStore, ProfileRefresh
+from wd.truly_tabular_display import PropertySelection, TrulyTabularConfig
+
+
+class TestClassProfile(Basetest):
+    """
+    test the incremental refresh of stored class profiles
+    """
+
+    def get_profile(self) -> ClassProfile:
+        profile = ClassProfile(
+            qid="Q5",
+            predicate="wdt:P31",
+            endpoint_name="wikidata-qlever",
+            lang="en",
+            min_property_frequency=20.0,
+            item_count=1000,
+            counts={"P21": 950, "P569": 800, "P570": 300, "P19": 150},
+            stats={
+                "P21": {"property": "sex or gender", "total": 950, "total%": 95.0},
+                "P569": {"property": "date of birth", "total": 800, "total%": 80.0},
+                "P570": {"property": "date of death", "total": 300, "total%": 30.0},
+            },
+        )
+        return profile
+
+    def testCompare(self):
+        """
+        test comparing the current counts with the stored profile
+        """
+        refresh = ProfileRefresh(self.get_profile(), tolerance=0.02)
+        counts = {"P21": 960, "P569": 900, "P19": 250, "P570": 100}
+        report = refresh.compare(1010, counts)
+        if self.debug:
+            print(report.asText())
+        self.assertEqual(["P21"], report.unchanged)
+        self.assertEqual(["P569"], report.changed)
+        self.assertEqual(["P19"], report.added)
+        self.assertEqual(["P570"], report.dropped)
+        self.assertEqual(["P569", "P19"], report.recompute)
+        self.assertEqual(4, report.queries_sent)
+        self.assertEqual(5, report.queries_full)
+        self.assertEqual(1, report.queries_saved)
+        recomputed = {
+            "P569": {"property": "date of birth", "total": 900, "total%": 89.1},
+            "P19": {"property": "place of birth", "total": 250, "total%": 24.8},
+        }
+        refreshed = refresh.apply(report, counts, recomputed)
+        self.assertEqual(1010, refreshed.item_count)
+        self.assertEqual(["P21", "P569", "P19"], list(refreshed.stats))
+        # the reused statistics are rescaled to the new instance count
+        self.assertEqual(94.1, refreshed.stats["P21"]["total%"])
+        self.assertEqual(95.0, self.get_profile().stats["P21"]["total%"])
+        self.assertEqual(89.1, refreshed.stats["P569"]["total%"])
+
+    def testFromSelection(self):
+        """
+        test saving a profile from a prepared property selection as done by
+        TrulyTabularDisplay.on_save_profile_click and refreshing it
+        """
+        entity = "http://www.wikidata.org/entity/"
+        stored = self.get_profile()
+        lod = [
+            {
+                "prop": f"{entity}{pid}",
+                "propLabel": pid,
+                "wbType": "http://wikiba.se/ontology#WikibaseItem",
+                "count": count,
+            }
+            for pid, count in stored.counts.items()
+            if pid in stored.stats
+        ]
+        selection = PropertySelection(
+            lod,
+            total=1000,
+            paretoLevels=TrulyTabularConfig().pareto_levels,
+            minFrequency=20.0,
+        )
+        selection.prepare(compact=True)
+        # as in TrulyTabularDisplay.prepare_generation_specs
+        for row in selection.propertyList:
+            row["count"] = True
+        profile = ClassProfile.from_selection(
+            qid="Q5",
+            predicate="wdt:P31",
+            endpoint_name="wikidata-qlever",
+            lang="en",
+            item_count=1000,
+            property_selection=selection,
+            stats=stored.stats,
+        )
+        self.assertEqual({"P21": 950, "P569": 800, "P570": 300}, profile.counts)
+        self.assertEqual(20.0, profile.min_property_frequency)
+        # an unchanged class needs no statistics query
+        refresh = ProfileRefresh(profile)
+        report = refresh.compare(1000, dict(profile.counts))
+        self.assertEqual(["P21", "P569", "P570"], report.unchanged)
+        self.assertEqual([], report.recompute)
+        self.assertEqual(3, report.queries_saved)
+        # estimates are not saved as statistics to reuse
+        stats = dict(stored.stats)
+        stats["P570"] = dict(stats["P570"], approximate=True)
+        profile = ClassProfile.from_selection(
+            qid="Q5",
+            predicate="wdt:P31",
+            endpoint_name="wikidata-qlever",
+            lang="en",
+            item_count=1000,
+            property_selection=selection,
+            stats=stats,
+        )
+        self.assertEqual(["P21", "P569"], list(profile.stats))
+        report = ProfileRefresh(profile).compare(1000, dict(profile.counts))
+        self.assertEqual(["P570"], report.recompute)
+
+    def testStore(self):
+        """
+        test storing and loading a profile
+        """
+        with tempfile.TemporaryDirectory() as profile_dir:
+            store = ClassProfileStore(profile_dir)
+            profile = self.get_profile()
+            path = store.save(profile)
+            self.assertTrue(path.endswith("wikidata-qlever_Q5_wdt_P31_en.json"))
+            loaded = store.load(*profile.key)
+            self.assertEqual(profile, loaded)
+            self.assertIsNone(store.load("Q6", "wdt:P31", "wikidata-qlever", "en"))
@@ -0,0 +1,225 @@
+"""
+Created on 2026-10-19
+
+@author: wf
+"""
+
+from ez_wikidata.wdproperty import WikidataProperty
+from lodstorage.query import Endpoint
+from ngwidgets.basetest import Basetest
+
+from wd.class_slice import ClassSlice
+
+
+class TestClassSlice(Basetest):
+    """
+    test the locally materialized class slice
+    """
+
+    def get_slice(self) -> ClassSlice:
+        """
+        get a class slice of 4 items with the triples of two properties
+        """
+        class_slice = ClassSlice(Endpoint(), "Q5", "wdt:P31", page_size=1000)
+        for pid in ["P106", "P569"]:
+            class_slice.property_index[pid] = len(class_slice.property_ids)
+            class_slice.property_ids.append(pid)
+        entity = "http://www.wikidata.org/entity/"
+        direct = "http://www.wikidata.org/prop/direct/"
+        triples = [
+            ("Q1", "P106", "Q36180"),
+            ("Q1", "P106", "Q82955"),
+            ("Q1", "P569", 1900),
+            ("Q2", "P106", "Q36180"),
+            ("Q2", "P569", 1901),
+            ("Q3", "P106", "Q36180"),
+            ("Q3", "P106", "Q82955"),
+            ("Q3", "P106", "Q1622272"),
+            ("Q4", "P569", 1902),
+        ]
+        for page in [triples[:4], triples[4:]]:
+            class_slice.add_page(
+                {
+                    "item": [f"{entity}{item}" for item, _p, _v in page],
+                    "p": [f"{direct}{p}" for _item, p, _v in page],
+                    "value": [
+                        f"{entity}{v}" if isinstance(v, str) else v
+                        for _item, _p, v in page
+                    ],
+                }
+            )
+        return class_slice
+
+    def get_property(self, pid: str, label: str, type_name: str):
+        wd_property = WikidataProperty(
+            id=f"{pid}en",
+            pid=pid,
+            lang="en",
+            plabel=label,
+            description="",
+            type_name=type_name,
+        )
+        return wd_property
+
+    def testStatistics(self):
+        """
+        test the non tabular statistics computed from the local triples
+        """
+        class_slice = self.get_slice()
+        self.assertEqual(9, len(class_slice))
+        occupation = self.get_property("P106", "occupation", "WikibaseItem")
+        row = class_slice.stats_row(occupation, item_count=5)
+        if self.debug:
+            print(row)
+        self.assertEqual(1, row["1"])
+        self.assertEqual(3, row["maxf"])
+        self.assertEqual(3, row["total"])
+        self.assertEqual(60.0, row["total%"])
+        self.assertEqual(2, row["non tabular"])
+        self.assertEqual(66.7, row["non tabular%"])
+        birth = self.get_property("P569", "date of birth", "Time")
+        row = class_slice.stats_row(birth, item_count=5)
+        self.assertEqual(3, row["1"])
+        self.assertEqual(1, row["maxf"])
+        self.assertEqual(0, row["non tabular"])
+        self.assertNotIn("approximate", row)
+        # the scaled statistics of a sampled slice are estimates
+        class_slice.sample_digits = 1
+        row = class_slice.stats_row(birth, item_count=5)
+        self.assertTrue(row["approximate"])
+
+    def testSampling(self):
+        """
+        test choosing the sampling and scaling the frequencies
+        """
+        class_slice = ClassSlice(Endpoint(), "Q5", "wdt:P31", max_triples=1000)
+        class_slice.set_sampling(expected_triples=50000)
+        self.assertEqual(2, class_slice.sample_digits)
+        self.assertIn('"00"', class_slice.triple_query(["P106"]))
+        # the sampling is kept for later fetches
+        class_slice.set_sampling(expected_triples=10)
+        self.assertEqual(100, class_slice.scale)
+
+    def testAggregatePreview(self):
+        """
+        test the local preview of the aggregate query
+        """
+        class_slice = self.get_slice()
+        properties = {
+            "P106": self.get_property("P106", "occupation", "WikibaseItem"),
+            "P569": self.get_property("P569", "date of birth", "Time"),
+        }
+        gen_map = {"P106": ["count", "list"], "P569": ["min"]}
+        lod = class_slice.aggregate_preview(gen_map, properties, separator="|")
+        if self.debug:
+            for record in lod:
+                print(record)
+        self.assertEqual(4, len(lod))
+        self.assertEqual(
+            {
+                "item": "Q1",
+                "occupationItem_count": 2,
+                "occupationItem_list": "Q36180|Q82955",
+                "date_of_birth_min": "1900",
+            },
+            lod[0],
+        )
+        # items with more than one ignored value are left out
+        gen_map = {"P106": ["ignore"]}
+        lod = class_slice.aggregate_preview(gen_map, properties)
+        self.assertEqual(["Q2", "Q4"], [record["item"] for record in lod])
+
+    def testTruncation(self):
+        """
+        test that the properties of a truncated fetch are not used for statistics
+        """
+        entity = "http://www.wikidata.org/entity/"
+        direct = "http://www.wikidata.org/prop/direct/"
+
+        class PagedSlice(ClassSlice):
+            """
+            a class slice with a fixed number of triples per property
+            """
+
+            triples = {"P569": 3, "P106": 10}
+
+            def fetch_page(self, property_ids, start, expected_triples):
+                rows = sorted(
+                    (f"{entity}Q{i+1}", f"{direct}{pid}", i)
+                    for pid in property_ids
+                    for i in range(self.triples[pid])
+                )
+                rows = [row for row in rows if start is None or row[0] >= start]
+                rows = rows[: self.page_size]
+                columns = {
+                    "item": [item for item, _p, _v in rows],
+                    "p": [p for _item, p, _v in rows],
+                    "value": [v for _item, _p, v in rows],
+                }
+                return columns
+
+        class_slice = PagedSlice(
+            Endpoint(), "Q5", "wdt:P31", page_size=4, max_triples=6
+        )
+        self.assertEqual(3, class_slice.fetch(["P569"], expected_triples=3))
+        self.assertTrue(class_slice.has_properties(["P569"]))
+        # the last item of a full page is fetched again with the next page
+        self.assertEqual(3, class_slice.fetch(["P106"], expected_triples=5))
+        self.assertTrue(class_slice.truncated)
+        self.assertFalse(class_slice.has_properties(["P106"]))
+        self.assertFalse(class_slice.has_properties(["P569", "P106"]))
+        # a truncated slice fetches no further properties
+        class_slice.triples["P21"] = 2
+        self.assertEqual(0, class_slice.fetch(["P21"], expected_triples=2))
+        self.assertFalse(class_slice.has_properties(["P21"]))
+
+    def testKeysetPaging(self):
+        """
+        test that the pages start with the last item of the previous page
+        and that no triples of an item split by a page are lost
+        """
+        entity = "http://www.wikidata.org/entity/"
+        direct = "http://www.wikidata.org/prop/direct/"
+
+        class KeysetSlice(ClassSlice):
+            """
+            a class slice with items having several values
+            """
+
+            rows = [
+                (f"{entity}Q{item}", f"{direct}P106", f"{entity}Q{value}")
+                for item, values in [(1, 2), (2, 2), (3, 3)]
+                for value in range(values)
+            ]
+            starts = []
+
+            def fetch_page(self, property_ids, start, expected_triples):
+                self.starts.append(start)
+                rows = [row for row in self.rows if start is None or row[0] >= start]
+                rows = rows[: self.page_size]
+                columns = {
+                    "item": [item for item, _p, _v in rows],
+                    "p": [p for _item, p, _v in rows],
+                    "value": [v for _item, _p, v in rows],
+                }
+                return columns
+
+        endpoint = Endpoint()
+        endpoint.database = "qlever"
+        class_slice = KeysetSlice(endpoint, "Q5", "wdt:P31", page_size=4)
+        self.assertEqual(7, class_slice.fetch(["P106"], expected_triples=7))
+        self.assertEqual([None, f"{entity}Q2", f"{entity}Q3"], class_slice.starts)
+        self.assertTrue(class_slice.has_properties(["P106"]))
+        occupation = self.get_property("P106", "occupation", "WikibaseItem")
+        row = class_slice.stats_row(occupation, item_count=3)
+        self.assertEqual(3, row["maxf"])
+        self.assertEqual(3, row["non tabular"])
+        query = class_slice.triple_query(["P106"], f"{entity}Q3")
+        self.assertIn(f"FILTER(?item >= <{entity}Q3>)", query)
+        self.assertNotIn("OFFSET", query)
+        # a single item filling a whole page truncates the slice
+        class_slice = KeysetSlice(endpoint, "Q5", "wdt:P31", page_size=2)
+        class_slice.rows = class_slice.rows[4:]
+        class_slice.fetch(["P106"], expected_triples=3)
+        self.assertTrue(class_slice.truncated)
+        self.assertFalse(class_slice.has_properties(["P106"]))
@@ -0,0 +1,84 @@
+"""
+Created on 2026-10-19
+
+@author: wf
+"""
+
+import unittest
+
+from ngwidgets.basetest import Basetest
+
+from wd.cooccurrence import CooccurrenceAnalysis, InstanceSet
+from wd.truly_tabular_display import TrulyTabularConfig
+
+
+class TestCooccurrence(Basetest):
+    """
+    test the property co-occurrence analysis
+    """
+
+    def testMatrix(self):
+        """
+        test the co-occurrence matrix of locally given instance sets
+        """
+        entity = "http://www.wikidata.org/entity/"
+        self.assertEqual(5, InstanceSet.qid_number(f"{entity}Q5"))
+        self.assertIsNone(InstanceSet.qid_number(f"{entity}P5"))
+        endpoint = TrulyTabularConfig().sparql_endpoint
+        analysis = CooccurrenceAnalysis(endpoint, "Q5", "wdt:P31", item_count=10)
+        analysis.sets["P1"] = InstanceSet(range(0, 10))
+        analysis.sets["P2"] = InstanceSet(range(5, 10), use_roaring=False)
+        analysis.sets["P3"] = InstanceSet([1, 2, 3, 3])
+        pids = ["P1", "P2", "P3"]
+        matrix = analysis.matrix(pids)
+        if self.debug:
+            print(matrix)
+        self.assertEqual([[10, 5, 3], [5, 5, 0], [3, 0, 3]], matrix)
+        lod = analysis.heatmap_lod(pids, {"P1": "one"})
+        self.assertEqual("one", lod[0]["property"])
+        self.assertEqual(50.0, lod[1]["P2"])
+        self.assertGreater(analysis.memory_bytes(), 0)
+
+    def check_backend(self, use_roaring: bool):
+        """
+        check the instance set operations of the given backend against
+        the numpy backend
+        """
+        instance_set = InstanceSet([7, 3, 3, 100000, 5], use_roaring=use_roaring)
+        expected_backend = "roaring" if use_roaring else "numpy"
+        self.assertEqual(expected_backend, instance_set.backend)
+        self.assertEqual(4, len(instance_set))
+        self.assertEqual([3, 5, 7, 100000], instance_set.as_array().tolist())
+        other = InstanceSet(range(0, 10), use_roaring=False)
+        self.assertEqual(3, instance_set.intersection_size(other))
+        self.assertEqual(3, other.intersection_size(instance_set))
+        same = InstanceSet(range(5, 8), use_roaring=use_roaring)
+        self.assertEqual(2, instance_set.intersection_size(same))
+        self.assertGreater(instance_set.nbytes, 0)
+
+    def testNumpyBackend(self):
+        """
+        test the numpy fallback used without pyroaring
+        """
+        self.check_backend(use_roaring=False)
+
+    @unittest.skipUnless(
+        InstanceSet.roaring_available, "pyroaring of the bitmaps extra not installed"
+    )
+    def testRoaringBackend(self):
+        """
+        test the roaring bitmap backend
+        """
+        self.check_backend(use_roaring=True)
+
+    def testSampling(self):
+        """
+        test the consistent sampling of large classes
+        """
+        endpoint = TrulyTabularConfig().sparql_endpoint
+        analysis = CooccurrenceAnalysis(
+            endpoint, "Q5", "wdt:P31", item_count=12000000, max_instances=1000000
+        )
+        self.assertEqual(100, analysis.scale)
+        query = analysis.instance_query("P569", offset=0)
+        self.assertIn('STRENDS(STR(?item), "00")', query)
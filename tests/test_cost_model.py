@@ -0,0 +1,135 @@
+"""
+Created on 2026-10-19
+
+@author: wf
+"""
+
+from ngwidgets.basetest import Basetest
+
+from wd.cost_model import Observation, QueryCostModel
+from wd.truly_tabular_display import PropertySelection, TrulyTabularConfig
+
+
+class TestCostModel(Basetest):
+    """
+    test the query cost model
+    """
+
+    def testFit(self):
+        """
+        test fitting overhead and rate to the observed latencies
+        """
+        model = QueryCostModel()
+        prior = model.predict("qlever", "stats", 1000000)
+        for work in [1000, 100000, 1000000]:
+            model.record(
+                "qlever", "stats", Observation(work, prior, actual=0.1 + work * 1e-7)
+            )
+        overhead, rate = model.fit("qlever", "stats")
+        if self.debug:
+            print(overhead, rate)
+        self.assertAlmostEqual(0.1, overhead, places=3)
+        self.assertAlmostEqual(1e-7, rate, places=9)
+        self.assertAlmostEqual(1.1, model.predict("qlever", "stats", 10000000), 3)
+        # other endpoints keep the prior
+        self.assertAlmostEqual(prior, model.predict("wikidata", "stats", 1000000))
+
+    def testMeasure(self):
+        """
+        test measuring queries and timeouts
+        """
+        model = QueryCostModel(timeout=10)
+        with model.measure("wikidata", "count") as observation:
+            pass
+        self.assertEqual(model.prior_overhead, observation.predicted)
+        self.assertIsNotNone(observation.actual)
+        with self.assertRaises(Exception):
+            with model.measure("wikidata", "count", 5000):
+                raise Exception("Query timeout")
+        with self.assertRaises(ValueError):
+            with model.measure("wikidata", "count", 6000):
+                raise ValueError("parse error")
+        accuracy = model.accuracy()
+        if self.debug:
+            print(accuracy)
+        self.assertEqual(1, len(accuracy))
+        self.assertEqual(2, accuracy[0]["queries"])
+        self.assertEqual(1, accuracy[0]["timeouts"])
+
+    def testPlanStatistics(self):
+        """
+        test choosing the statistics strategy
+        """
+        model = QueryCostModel()
+        counts = {"P569": 1000, "P570": 800}
+        plan = model.plan_statistics("wikidata", 5000, counts, max_triples=10**6)
+        self.assertEqual("direct", plan.strategy)
+        # too slow for direct queries - materialize up to the max triples
+        counts = {f"P{i}": 1000000 for i in range(1, 6)}
+        plan = model.plan_statistics("wikidata", 10**7, counts, max_triples=10**7)
+        self.assertEqual("materialized", plan.strategy)
+        # too many triples to materialize - exact queries per id range
+        plan = model.plan_statistics("wikidata", 10**7, counts, max_triples=10**6)
+        self.assertEqual("paginated", plan.strategy)
+        self.assertLess(plan.predicted, plan.direct)
+        self.assertNotIn("approximate", plan.reason)
+        counts = {f"P{i}": 5000000 for i in range(1, 5)}
+        plan = model.plan_statistics(
+            "wikidata", 10**9, counts, max_triples=10**6, shards=1
+        )
+        self.assertEqual("paginated", plan.strategy)
+        # estimates are only suggested
+        self.assertIn("approximate statistics", plan.reason)
+        counts = {f"P{i}": 3000000 for i in range(1, 7)}
+        plan = model.plan_statistics("wikidata", 10**7, counts, max_triples=10**8)
+        if self.debug:
+            print(plan.asText())
+        self.assertEqual("batched", plan.strategy)
+        self.assertEqual(2, len(plan.property_batches))
+        self.assertLessEqual(plan.predicted, model.budget)
+        self.assertEqual(5, sum(model.decisions.values()))
+
+    def testSplitBatches(self):
+        """
+        test splitting properties in balanced batches
+        """
+        counts = {"P1": 10, "P2": 6, "P3": 5, "P4": 1}
+        batches = QueryCostModel.split_batches(counts, 2)
+        self.assertEqual([["P1", "P4"], ["P2", "P3"]], batches)
+        self.assertEqual([list(counts)], QueryCostModel.split_batches(counts, 1))
+        self.assertEqual(4, len(QueryCostModel.split_batches(counts, 10)))
+
+    def testPlanFromSelection(self):
+        """
+        test planning with the usage counts of a prepared property selection
+        """
+        entity = "http://www.wikidata.org/entity/"
+        lod = [
+            {
+                "prop": f"{entity}P{i}",
+                "propLabel": f"property {i}",
+                "wbType": "http://wikiba.se/ontology#WikibaseItem",
+                "count": 5000000,
+            }
+            for i in range(1, 5)
+        ]
+        selection = PropertySelection(
+            lod,
+            total=10**7,
+            paretoLevels=TrulyTabularConfig().pareto_levels,
+            minFrequency=1.0,
+        )
+        selection.prepare(compact=True)
+        # the count column is the count aggregate checkbox now
+        for row in selection.propertyList:
+            row["count"] = True
+        model = QueryCostModel()
+        property_counts = {
+            row["propertyId"]: selection.usage_count(row["propertyId"])
+            for row in selection.propertyList
+        }
+        plan = model.plan_statistics(
+            "wikidata", 10**7, property_counts, max_triples=10**6
+        )
+        self.assertEqual(2 * 10**7, plan.work)
+        self.assertEqual("paginated", plan.strategy)
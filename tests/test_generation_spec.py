@@ -0,0 +1,66 @@
+"""
+Created on 2026-10-19
+
+@author: wf
+"""
+
+from ngwidgets.basetest import Basetest
+
+from wd.generation_spec import GenerationSpecState
+
+
+class TestGenerationSpec(Basetest):
+    """
+    test the server side generation spec state
+    """
+
+    def setUp(self, debug=False, profile=True):
+        Basetest.setUp(self, debug=debug, profile=profile)
+        self.checkbox_cols = ["min", "max", "count", "ignore", "label"]
+        self.lod = []
+        for i in range(5000):
+            self.lod.append(
+                {
+                    "#": i + 1,
+                    "propertyId": f"P{i+1}",
+                    "count": True,
+                    "label": i % 2 == 0,
+                }
+            )
+
+    def testSelection(self):
+        """
+        test the selection bitset
+        """
+        state = GenerationSpecState.from_lod(self.checkbox_cols, self.lod)
+        state.select_all()
+        self.assertEqual(5000, state.selected_count)
+        state.set_selected(state.index_of(3), False)
+        self.assertFalse(state.is_selected(2))
+        self.assertEqual(4999, len(state.selected_indices()))
+        state.select_all(False)
+        state.set_selected(4999)
+        state.set_selected(7)
+        self.assertEqual([7, 4999], state.selected_indices())
+        # the bitset is kept in sync with the set of selected indices
+        self.assertEqual((1 << 4999) | (1 << 7), state.selected)
+        self.assertEqual(2, state.selected_count)
+        # the selected keys of the rows shown in a window
+        self.assertEqual([8], state.selected_keys(list(range(1, 101))))
+        self.assertEqual([5000, 8], state.selected_keys([5000, 3, 8, 9999]))
+
+    def testGenMap(self):
+        """
+        test building the generation map from the flags
+        """
+        state = GenerationSpecState.from_lod(self.checkbox_cols, self.lod)
+        state.set_selected(0)
+        state.set_selected(1)
+        state.set_flag(1, "max", True)
+        state.set_flag(1, "count", False)
+        gen_map = state.gen_map()
+        self.assertEqual(
+            {"P1": ["count", "label"], "P2": ["max"]},
+            gen_map,
+        )
+        self.assertTrue(state.get_flag(1, "max"))
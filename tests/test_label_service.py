@@ -0,0 +1,76 @@
+"""
+Created on 2026-10-19
+
+@author: wf
+"""
+
+from ngwidgets.basetest import Basetest
+
+from wd.label_service import LabelService
+
+
+class TestLabelService(Basetest):
+    """
+    test the batched multilingual label service
+    """
+
+    def testFallbackChain(self):
+        """
+        test the language fallback chains
+        """
+        for lang, expected in [
+            ("de", ["de", "mul", "en"]),
+            ("en", ["en", "mul"]),
+            ("de-ch", ["de-ch", "de", "mul", "en"]),
+            ("lb", ["lb", "de", "fr", "mul", "en"]),
+        ]:
+            self.assertEqual(expected, LabelService.fallback_chain(lang))
+
+    def testLabelQuery(self):
+        """
+        test the chunked label query
+        """
+        service = LabelService()
+        query = service.label_query(["Q5", "P31"], ["de", "en"])
+        if self.debug:
+            print(query)
+        self.assertIn("VALUES ?entity { wd:Q5 wd:P31 }", query)
+        self.assertIn('FILTER(?lang IN ("de", "en"))', query)
+
+    def testEntries(self):
+        """
+        test resolving the labels from the cache via the fallback chain
+        """
+        service = LabelService()
+        prefix = LabelService.entity_prefix
+        columns = {
+            "entity": [f"{prefix}Q5", f"{prefix}Q5", f"{prefix}P31", f"{prefix}Q5"],
+            "lang": ["de", "en", "en", "de"],
+            "label": ["Mensch", "human", "instance of", None],
+            "description": [None, None, None, "Art der Gattung Homo"],
+        }
+        chain = LabelService.fallback_chain("de")
+        service.add_columns(columns, ["Q5", "P31"], chain)
+        self.assertEqual(6, len(service.labels))
+        # everything is cached - no query is needed
+        entries = service.get_entries(["Q5", "P31", "Q5"], "de")
+        self.assertEqual(0, service.queries)
+        self.assertEqual("Mensch", entries["Q5"].label)
+        self.assertEqual("de", entries["Q5"].lang)
+        self.assertEqual("Mensch (Q5)☞Art der Gattung Homo", entries["Q5"].asText())
+        self.assertEqual("instance of", entries["P31"].label)
+        self.assertEqual("en", entries["P31"].lang)
+        labels = service.get_labels(["P31"], "de")
+        self.assertEqual({"P31": "instance of"}, labels)
+
+    def testInstancePerEndpoint(self):
+        """
+        test that the labels are cached per endpoint
+        """
+        qlever = LabelService.get_instance("wikidata-qlever")
+        self.assertIs(qlever, LabelService.get_instance("wikidata-qlever"))
+        self.assertIs(qlever, LabelService.get_instance())
+        other = LabelService.get_instance("wikidata")
+        self.assertIsNot(qlever, other)
+        self.assertEqual("wikidata", other.endpoint_name)
+        self.assertIsNot(qlever.labels, other.labels)
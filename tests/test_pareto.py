@@ -4,10 +4,12 @@ Created on 2022-03-21
 @author: wf
 """
 
+import numpy as np
 from ngwidgets.basetest import Basetest
 from tabulate import tabulate
 
 from wd.pareto import Pareto
+from wd.pareto_analysis import CoverageAnalysis, ParetoTable
 
 
 class TestPareto(Basetest):
@@ -42,3 +44,54 @@ class TestPareto(Basetest):
         for tablefmt in ["mediawiki", "latex"]:
             markup = tabulate(paretoLod, headers="keys", tablefmt=tablefmt)
             print(markup)
+
+    def testParetoTable(self):
+        """
+        test the binary search Pareto level lookup against the linear one
+        """
+        levels = {level: Pareto(level) for level in range(1, 10)}
+        table = ParetoTable(levels)
+        ratios = [0.0, 1e-9, 0.0004, 0.001, 0.01, 0.04, 0.05, 0.2, 0.5, 1.0]
+        ratios.extend(1 / pareto.oneOutOf for pareto in levels.values())
+        for ratio in ratios:
+            expected = 0
+            for pareto in reversed(levels.values()):
+                if pareto.ratioInLevel(ratio):
+                    expected = pareto.level
+            self.assertEqual(expected, table.level_of(ratio), ratio)
+        self.assertEqual(
+            [table.level_of(ratio) for ratio in ratios],
+            table.levels_of(np.array(ratios)).tolist(),
+        )
+
+    def testCoverage(self):
+        """
+        test the coverage curve and the recommended property set
+        """
+        counts = {"P31": 1000, "P569": 900, "P21": 900, "P570": 150, "P19": 50}
+        analysis = CoverageAnalysis(counts, item_count=1000)
+        curve = analysis.coverage_curve()
+        if self.debug:
+            print(tabulate(curve, headers="keys"))
+        self.assertEqual("P31", curve[0]["propertyId"])
+        self.assertEqual(100.0, curve[-1]["coverage%"])
+        recommendation = analysis.recommend(80)
+        if self.debug:
+            print(recommendation.asText())
+        self.assertEqual(["P31", "P21", "P569"], recommendation.property_ids)
+        self.assertEqual(899, recommendation.min_count)
+        selected = [pid for pid, count in counts.items() if count > 899]
+        self.assertEqual(set(recommendation.property_ids), set(selected))
+        self.assertEqual(90.0, recommendation.min_percent)
+        self.assertAlmostEqual(93.33, recommendation.coverage, places=2)
+        # the first property alone covers a third
+        self.assertEqual(["P31"], analysis.recommend(30).property_ids)
+        self.assertEqual(5, len(analysis.recommend(100).property_ids))
+        lod = [
+            {"prop": f"http://www.wikidata.org/entity/{pid}", "count": str(count)}
+            for pid, count in counts.items()
+        ]
+        self.assertEqual(
+            analysis.property_ids,
+            CoverageAnalysis.from_lod(lod, 1000).property_ids,
+        )
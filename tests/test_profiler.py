@@ -0,0 +1,52 @@
+"""
+Created on 2026-10-19
+
+@author: wf
+"""
+
+import time
+
+from ngwidgets.basetest import Basetest
+
+from wd.profiler import SamplingProfiler
+
+
+class TestProfiler(Basetest):
+    """
+    test the on demand sampling profiler
+    """
+
+    def busy(self, seconds: float):
+        end = time.perf_counter() + seconds
+        while time.perf_counter() < end:
+            pass
+
+    def testProfile(self):
+        """
+        test arming, stage sampling and the collapsed stack output
+        """
+        profiler = SamplingProfiler(interval=0.001)
+        self.assertIsNone(profiler.start_profile("tt Q5", "client-1"))
+        profiler.arm(analyses=1)
+        profile = profiler.start_profile("tt Q5", "client-1")
+        self.assertIsNotNone(profile)
+        self.assertIsNone(profiler.start_profile("tt Q5", "client-2"))
+        with profiler.stage(profile, "do_update_display"):
+            with profiler.stage(profile, "count"):
+                self.busy(0.1)
+        profiler.end_profile(profile)
+        folded = profile.folded()
+        if self.debug:
+            print(folded)
+            print(profile.summary())
+        self.assertIn("do_update_display;count;", folded)
+        self.assertIn("busy", folded)
+        self.assertGreater(profile.stage_seconds["do_update_display;count"], 0.09)
+        profiler.arm(client_id="client-2")
+        self.assertIsNotNone(profiler.start_profile("tt Q5", "client-2"))
+        self.assertIsNotNone(profiler.start_profile("tt Q5", "client-2"))
+        self.assertIsNone(profiler.start_profile("tt Q5", "client-1"))
+        profiler.disarm()
+        # no recording for unprofiled analyses
+        with profiler.stage(None, "count"):
+            pass
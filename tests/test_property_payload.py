@@ -0,0 +1,109 @@
+"""
+Created on 2026-10-19
+
+@author: wf
+"""
+
+import urllib.parse
+
+from ngwidgets.basetest import Basetest
+from ngwidgets.widgets import Link
+
+from wd.property_payload import CompactPropertyPayload
+
+
+class TestPropertyPayload(Basetest):
+    """
+    test the compact wire format of the property grid
+    """
+
+    def setUp(self, debug=False, profile=True):
+        Basetest.setUp(self, debug=debug, profile=profile)
+        self.flag_cols = [
+            "min",
+            "max",
+            "avg",
+            "sample",
+            "list",
+            "count",
+            "ignore",
+            "label",
+        ]
+
+    def get_rows(self, count: int, compact: bool = False) -> list:
+        """
+        get a list of property rows as prepared by PropertySelection
+
+        Args:
+            count(int): the number of rows
+            compact(bool): if True use plain property labels instead of html links
+        """
+        lod = []
+        for i in range(count):
+            pid = f"P{i+1}"
+            query = f"""SELECT ?count (COUNT(?count) AS ?frequency) WHERE {{
+  SELECT ?item (COUNT(?value) AS ?count) WHERE {{
+    ?item wdt:P31 wd:Q5.
+    ?item wdt:{pid} ?value.
+  }} GROUP BY ?item
+}} GROUP BY ?count ORDER BY DESC(?frequency)"""
+            try_it_url = "https://qlever.dev/wikidata/?query=" + urllib.parse.quote(
+                query
+            )
+            row = {
+                "#": i + 1,
+                "%": "42.0",
+                "pareto": 1,
+                "property": (
+                    f"property {pid}"
+                    if compact
+                    else Link.create(
+                        f"http://www.wikidata.org/entity/{pid}", f"property {pid}"
+                    )
+                ),
+                "propertyId": pid,
+                "type": "WikibaseItem",
+                "1": 4711,
+                "maxf": 3,
+                "nt": 12,
+                "nt%": "0.3",
+                "?f": Link.create(try_it_url, "try it!", target="_blank"),
+                "?ex": Link.create(try_it_url, "try it!", target="_blank"),
+                "✔": "✔",
+                "count": True,
+            }
+            for col in self.flag_cols:
+                row[col] = col in ["count", "label"]
+            lod.append(row)
+        return lod
+
+    def testFlags(self):
+        """
+        test packing and unpacking the checkbox flags
+        """
+        payload = CompactPropertyPayload(self.flag_cols)
+        record = {"count": True, "label": True, "min": False}
+        flags = payload.pack_flags(record)
+        self.assertEqual(0b10100000, flags)
+        self.assertEqual(["count", "label"], payload.checked_cols(flags))
+        unpacked = payload.unpack_flags(flags)
+        self.assertTrue(unpacked["label"])
+        self.assertFalse(unpacked["min"])
+
+    def testPayloadSize(self):
+        """
+        benchmark the payload size of the full versus the compact format
+        """
+        payload = CompactPropertyPayload(self.flag_cols)
+        for count in [100, 1000, 3000]:
+            full_lod = self.get_rows(count)
+            compact_lod = payload.to_wire(self.get_rows(count, compact=True))
+            full_size = payload.payload_size(full_lod)
+            compact_size = payload.payload_size(compact_lod)
+            ratio = compact_size / full_size
+            if self.debug:
+                print(
+                    f"{count} properties: full {full_size} bytes, compact {compact_size} bytes ({ratio*100:.1f}%)"
+                )
+            self.assertLess(compact_size, full_size)
+            self.assertNotIn("<a", str(compact_lod[0]["?f"]))
@@ -0,0 +1,46 @@
+"""
+Created on 2026-10-19
+
+@author: wf
+"""
+
+from ngwidgets.basetest import Basetest
+
+from wd.property_rows import PropertyRowStore
+
+
+class TestPropertyRows(Basetest):
+    """
+    test the server side row model of the property grid
+    """
+
+    def setUp(self, debug=False, profile=True):
+        Basetest.setUp(self, debug=debug, profile=profile)
+        self.lod = []
+        for i in range(5000):
+            self.lod.append(
+                {
+                    "#": i + 1,
+                    "propertyId": f"P{i+1}",
+                    "property": f"property {i+1}",
+                    "%": f"{(i % 100):.1f}",
+                }
+            )
+
+    def testWindow(self):
+        """
+        test getting sorted and filtered windows of rows
+        """
+        store = PropertyRowStore.from_lod(self.lod)
+        self.assertEqual(5000, store.size)
+        rows, total = store.window(100, 50)
+        self.assertEqual(5000, total)
+        self.assertEqual(50, len(rows))
+        self.assertEqual(101, rows[0]["#"])
+        rows, total = store.window(0, 10, sort_col="%", descending=True)
+        self.assertEqual("99.0", rows[0]["%"])
+        rows, total = store.window(
+            0, 10, filter_text="P4711", filter_cols=["propertyId"]
+        )
+        self.assertEqual(1, total)
+        self.assertEqual("property 4711", rows[0]["property"])
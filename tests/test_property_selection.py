@@ -0,0 +1,83 @@
+"""
+Created on 2026-10-19
+
+@author: wf
+"""
+
+from ngwidgets.basetest import Basetest
+
+from wd.truly_tabular_display import PropertySelection, TrulyTabularConfig
+
+
+class TestPropertySelection(Basetest):
+    """
+    test the property selection of a truly tabular analysis
+    """
+
+    @staticmethod
+    def get_property_lod() -> list:
+        """
+        get property table records as returned by the most frequent
+        properties query
+        """
+        entity = "http://www.wikidata.org/entity/"
+        lod = [
+            {
+                "prop": f"{entity}{pid}",
+                "propLabel": label,
+                "wbType": f"http://wikiba.se/ontology#{wb_type}",
+                "count": count,
+            }
+            for pid, label, wb_type, count in [
+                ("P21", "sex or gender", "WikibaseItem", 950),
+                ("P569", "date of birth", "Time", 800),
+                ("P19", "place of birth", "WikibaseItem", 150),
+            ]
+        ]
+        return lod
+
+    @classmethod
+    def get_selection(cls) -> PropertySelection:
+        """
+        get a prepared property selection with the checkboxes as set by
+        TrulyTabularDisplay.prepare_generation_specs
+        """
+        selection = PropertySelection(
+            cls.get_property_lod(),
+            total=1000,
+            paretoLevels=TrulyTabularConfig().pareto_levels,
+            minFrequency=20.0,
+        )
+        selection.prepare(compact=True)
+        for row in selection.propertyList:
+            row["count"] = True
+        return selection
+
+    def testUsageCounts(self):
+        """
+        test that the usage counts survive the count aggregate checkbox
+        """
+        selection = self.get_selection()
+        row = selection.propertyMap["P569"]
+        if self.debug:
+            print(row)
+        self.assertIs(True, row["count"])
+        self.assertEqual("80.0", row["%"])
+        self.assertEqual(800, selection.usage_count("P569"))
+        self.assertEqual({"P21": 950, "P569": 800, "P19": 150}, selection.usage_counts)
+        self.assertEqual(0, selection.usage_count("P570"))
+
+    def testCompact(self):
+        """
+        test that compacted rows are restored on access
+        """
+        selection = self.get_selection()
+        rows = [dict(row) for row in selection.propertyList]
+        selection.compact()
+        self.assertIsNotNone(selection.row_store)
+        self.assertEqual(3, selection.row_store.size)
+        self.assertEqual(rows, selection.propertyList)
+        self.assertIsNone(selection.row_store)
+        self.assertIs(selection.propertyList[1], selection.propertyMap["P569"])
+        selected = [property_id for property_id, _row in selection.select()]
+        self.assertEqual(["P21", "P569"], selected)
@@ -0,0 +1,136 @@
+"""
+Created on 2026-10-19
+
+@author: wf
+"""
+
+import os
+import tempfile
+import threading
+
+from ez_wikidata.wdproperty import WikidataPropertyManager
+from ngwidgets.basetest import Basetest
+
+from wd.property_store import PropertyStore
+
+
+class StubManager:
+    """
+    a loaded property manager with fixed properties
+    """
+
+    def __init__(self, props_by_id: dict, refreshed: bool):
+        self.props_by_id = props_by_id
+        self.refreshed = refreshed
+        self.loaded = True
+
+
+class StubStore(PropertyStore):
+    """
+    a property store creating stub managers instead of querying wikidata
+    """
+
+    def __init__(self, cache_path: str, **kwargs):
+        super().__init__(**kwargs)
+        self._cache_path = cache_path
+        self.created = []
+        self.refreshed = threading.Event()
+        self.props_by_id = {
+            "en": {"P569": "date of birth", "P19": "place of birth"},
+            "de": {"P569": "Geburtsdatum"},
+        }
+
+    @property
+    def cache_path(self) -> str:
+        return self._cache_path
+
+    def create_manager(self, refresh: bool = False) -> StubManager:
+        self.created.append(refresh)
+        if refresh and self.created.count(True) >= 2:
+            self.refreshed.set()
+        return StubManager(self.props_by_id, refreshed=refresh)
+
+
+class TestPropertyStore(Basetest):
+    """
+    test the process wide property store
+    """
+
+    def setUp(self, debug=False, profile=True):
+        Basetest.setUp(self, debug=debug, profile=profile)
+        # the store installs its manager process wide
+        self.shared_wpm = WikidataPropertyManager.__dict__.get("wpm", None)
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.cache_path = os.path.join(self.cache_dir.name, "wikidata_properties.db")
+
+    def tearDown(self):
+        if self.shared_wpm is None:
+            if "wpm" in WikidataPropertyManager.__dict__:
+                del WikidataPropertyManager.wpm
+        else:
+            WikidataPropertyManager.wpm = self.shared_wpm
+        self.cache_dir.cleanup()
+        Basetest.tearDown(self)
+
+    def write_cache(self):
+        with open(self.cache_path, "w") as cache_file:
+            cache_file.write("cached")
+
+    def testPreload(self):
+        """
+        test preloading from a fresh cache and installing the shared manager
+        """
+        self.write_cache()
+        store = StubStore(self.cache_path)
+        store.start()
+        self.assertTrue(store.ready.wait(timeout=5))
+        wpm = store.get_manager()
+        self.assertIs(wpm, WikidataPropertyManager.wpm)
+        self.assertIs(wpm, WikidataPropertyManager.get_instance())
+        self.assertFalse(wpm.refreshed)
+        # a fresh cache needs no SPARQL reload and no second load
+        self.assertEqual([False], store.created)
+        store.stop()
+
+    def testStaleCache(self):
+        """
+        test that a missing or outdated cache is refreshed on preload
+        """
+        store = StubStore(self.cache_path)
+        self.assertTrue(store.is_stale())
+        store.preload()
+        store.stop()
+        self.assertEqual([False, True], store.created)
+        self.assertTrue(store.get_manager().refreshed)
+        # loading on demand if there has been no preload
+        store = StubStore(self.cache_path)
+        self.assertIs(store.get_manager(), WikidataPropertyManager.wpm)
+        self.assertEqual([False], store.created)
+
+    def testTimedRefresh(self):
+        """
+        test the periodic background refresh
+        """
+        self.write_cache()
+        store = StubStore(self.cache_path, refresh_interval=0.05)
+        store.min_refresh_delay = 0.01
+        store.preload()
+        loaded_at = store.loaded_at
+        self.assertTrue(store.refreshed.wait(timeout=5))
+        store.stop()
+        # let a refresh in progress finish installing its manager
+        store.refresh_timer.join(timeout=5)
+        self.assertGreaterEqual(store.created.count(True), 2)
+        self.assertGreater(store.loaded_at, loaded_at)
+        self.assertTrue(WikidataPropertyManager.wpm.refreshed)
+
+    def testLookupFallback(self):
+        """
+        test looking up properties with the fallback to english labels
+        """
+        store = StubStore(self.cache_path)
+        properties = store.get_properties_by_ids(["P569", "P19", "P99999"], lang="de")
+        self.assertEqual({"P569": "Geburtsdatum", "P19": "place of birth"}, properties)
+        # a language without any labels
+        properties = store.get_properties_by_ids(["P569"], lang="xx")
+        self.assertEqual({"P569": "date of birth"}, properties)
@@ -0,0 +1,69 @@
+"""
+Created on 2026-10-19
+
+@author: wf
+"""
+
+from ngwidgets.basetest import Basetest
+
+from wd.property_superset import PropertySuperset, StatsCache
+
+
+class TestPropertySuperset(Basetest):
+    """
+    test filtering the property table locally and reusing statistics
+    """
+
+    def get_superset(self) -> PropertySuperset:
+        entity = "http://www.wikidata.org/entity/"
+        counts = {"P31": 1000, "P21": 900, "P569": 800, "P570": 300, "P19": 100}
+        lod = [
+            {"prop": f"{entity}{pid}", "propLabel": pid, "count": str(count)}
+            for pid, count in counts.items()
+        ]
+        superset = PropertySuperset(("Q5", "wdt:P31", "wikidata-qlever"), 100, lod)
+        return superset
+
+    def testFilter(self):
+        """
+        test filtering the properties with more than min count usages
+        """
+        superset = self.get_superset()
+        self.assertEqual(5, superset.size)
+        labels = [record["propLabel"] for record in superset.filter(800)]
+        self.assertEqual(["P31", "P21"], labels)
+        # the threshold itself is excluded as by the property table query
+        self.assertEqual(4, len(superset.filter(100)))
+        # the records are copies
+        record = superset.filter(900)[0]
+        record["count"] = "0"
+        self.assertEqual("1000", superset.filter(900)[0]["count"])
+
+    def testCovers(self):
+        """
+        test that only a lower threshold or another analysis needs a query
+        """
+        superset = self.get_superset()
+        key = ("Q5", "wdt:P31", "wikidata-qlever")
+        self.assertTrue(superset.covers(key, 100))
+        self.assertTrue(superset.covers(key, 500))
+        self.assertFalse(superset.covers(key, 99))
+        self.assertFalse(superset.covers(("Q5", "wdt:P279*", "wikidata-qlever"), 500))
+
+    def testStatsCache(self):
+        """
+        test reusing the statistics rows already computed
+        """
+        stats_cache = StatsCache()
+        computed = []
+
+        def compute(pid: str):
+            computed.append(pid)
+            return {"property": pid, "total": 10} if pid != "P19" else None
+
+        for pids in [["P31", "P21", "P19"], ["P31", "P21", "P569", "P19"]]:
+            for pid in pids:
+                stats_cache.get_or_compute(pid, lambda: compute(pid))
+        # missing rows are computed again
+        self.assertEqual(["P31", "P21", "P19", "P569", "P19"], computed)
+        self.assertEqual(["P31", "P21", "P569"], list(stats_cache))
@@ -0,0 +1,135 @@
+"""
+Created on 2026-10-19
+
+@author: wf
+"""
+
+import threading
+
+from ngwidgets.basetest import Basetest
+
+from wd.session_registry import SessionRegistry
+
+
+class Session:
+    """
+    a minimal session holding some state to be reclaimed
+    """
+
+    def __init__(self, name: str, last_activity: float):
+        self.session_name = name
+        self.last_activity = last_activity
+        self.idle_state = "active"
+        self.lod = [{"count": i} for i in range(1000)]
+
+    def compact_state(self):
+        self.idle_state = "compacted"
+
+    def drop_state(self):
+        self.lod = None
+        self.idle_state = "dropped"
+
+    def memory_usage(self) -> dict:
+        usage = {"lod": SessionRegistry.estimate_size(self.lod)}
+        return usage
+
+
+class TestSessionRegistry(Basetest):
+    """
+    test the idle session registry
+    """
+
+    def testEstimateSize(self):
+        """
+        test the memory estimate of nested objects
+        """
+        shared = list(range(1000))
+        small = SessionRegistry.estimate_size({"a": 1})
+        big = SessionRegistry.estimate_size({"a": shared})
+        self.assertGreater(big, small + 1000 * 8)
+        # shared objects are only counted once
+        twice = SessionRegistry.estimate_size([shared, shared])
+        self.assertLess(twice, 2 * big)
+        self.assertEqual(0, SessionRegistry.estimate_size(None))
+
+    def testCheckIdle(self):
+        """
+        test compacting and dropping idle sessions
+        """
+        registry = SessionRegistry(compact_after=10, drop_after=100)
+        sessions = [Session(f"s{i}", last_activity=1000.0) for i in range(3)]
+        # register without starting the background check
+        for session in sessions:
+            registry.sessions.add(session)
+        sessions[1].last_activity = 1095.0
+        sessions[2].last_activity = 1105.0
+        counts = registry.check_idle(now=1100.0)
+        self.assertEqual({"compacted": 0, "dropped": 1}, counts)
+        self.assertEqual("dropped", sessions[0].idle_state)
+        self.assertEqual("active", sessions[1].idle_state)
+        counts = registry.check_idle(now=1120.0)
+        self.assertEqual({"compacted": 2, "dropped": 0}, counts)
+        self.assertEqual("compacted", sessions[1].idle_state)
+        report = registry.memory_report()
+        if self.debug:
+            for record in report:
+                print(record)
+        self.assertEqual(3, len(report))
+        self.assertEqual("dropped", report[-1]["state"])
+        self.assertEqual(0, report[-1]["total KB"])
+
+    def testBusyAndFailingSessions(self):
+        """
+        test that busy sessions are kept and a failing session does not
+        stop the idle check of the others
+        """
+        registry = SessionRegistry(compact_after=10, drop_after=100)
+        busy = Session("busy", last_activity=1000.0)
+        busy.is_busy = True
+        failing = Session("failing", last_activity=1000.0)
+
+        def fail():
+            raise ValueError("compaction failed")
+
+        failing.drop_state = fail
+        idle = Session("idle", last_activity=1000.0)
+        for session in [busy, failing, idle]:
+            registry.sessions.add(session)
+        counts = registry.check_idle(now=1200.0)
+        self.assertEqual({"compacted": 0, "dropped": 1}, counts)
+        self.assertEqual("active", busy.idle_state)
+        self.assertEqual("dropped", idle.idle_state)
+        registry.unregister(busy)
+        self.assertEqual(2, len(registry.get_sessions()))
+
+    def testBusyLock(self):
+        """
+        test that the busy check and the compaction run under the busy lock
+        of the session
+        """
+        registry = SessionRegistry(compact_after=10, drop_after=100)
+
+        class LockedSession(Session):
+            """
+            a session with a busy lock as TrulyTabularDisplay
+            """
+
+            def __init__(self, name: str, last_activity: float):
+                super().__init__(name, last_activity)
+                self.busy_lock = threading.Lock()
+                self.locked = []
+
+            def compact_state(self):
+                self.locked.append(self.busy_lock.locked())
+                super().compact_state()
+
+            def drop_state(self):
+                self.locked.append(self.busy_lock.locked())
+                super().drop_state()
+
+        session = LockedSession("locked", last_activity=1000.0)
+        registry.sessions.add(session)
+        self.assertEqual({"compacted": 1, "dropped": 0}, registry.check_idle(1020.0))
+        self.assertEqual({"compacted": 0, "dropped": 1}, registry.check_idle(1200.0))
+        self.assertEqual([True, True], session.locked)
+        self.assertFalse(session.busy_lock.locked())
@@ -0,0 +1,122 @@
+"""
+Created on 2026-10-19
+
+@author: wf
+"""
+
+import numpy as np
+from ngwidgets.basetest import Basetest
+
+from wd.admission import AdmissionController
+from wd.sketches import ApproximateStatistics, CountMinSketch, PropertySketch
+from wd.sparql_templates import SparqlTemplates
+from wd.truly_tabular_display import TrulyTabularConfig
+
+
+class TestSketches(Basetest):
+    """
+    test the mergeable sketches of the approximate statistics
+    """
+
+    def testCountMin(self):
+        """
+        test the frequency estimate bounds and merging
+        """
+        cms = CountMinSketch(width=64, depth=4)
+        rng = np.random.default_rng(42)
+        keys = rng.integers(1, 200, size=20000).astype(np.uint64)
+        half = len(keys) // 2
+        other = CountMinSketch(width=64, depth=4)
+        cms.add(keys[:half])
+        other.add(keys[half:])
+        cms.merge(other)
+        self.assertEqual(20000, cms.total)
+        exact = np.bincount(keys.astype(np.int64))
+        for key in [1, 7, 100]:
+            estimate = cms.estimate(key)
+            self.assertGreaterEqual(estimate, exact[key])
+            self.assertLessEqual(estimate - exact[key], 4 * cms.error_bound)
+
+    def testPropertySketch(self):
+        """
+        test the approximate statistics row of chunks merged across shards
+        """
+        rng = np.random.default_rng(1)
+        items = np.arange(1, 50001, dtype=np.uint64)
+        counts = rng.choice([1, 1, 1, 2, 3], size=len(items)).astype(np.int64)
+        shards = []
+        for shard in range(9):
+            sketch = PropertySketch()
+            shard_counts = counts[items % 9 == shard]
+            for start in range(0, len(shard_counts), 1000):
+                sketch.add_counts(shard_counts[start : start + 1000])
+            shards.append(sketch)
+        merged = shards[0]
+        for sketch in shards[1:]:
+            merged.merge(sketch)
+        row = merged.stats_row("occupation", item_count=100000)
+        if self.debug:
+            print(row)
+        self.assertEqual(3, row["maxf"])
+        self.assertEqual(int(counts.sum()), merged.values)
+        # the number of instances using the property is exact
+        self.assertEqual(50000, row["total"])
+        self.assertEqual(50.0, row["total%"])
+        single = int(np.sum(counts == 1))
+        estimate = float(row["1"].split()[0][1:])
+        bound = float(row["1"].split()[1][1:])
+        self.assertGreaterEqual(estimate, single)
+        self.assertLessEqual(estimate - single, bound)
+
+    def testShards(self):
+        """
+        test that the shards are disjoint id ranges covering all items
+        """
+        endpoint = TrulyTabularConfig().sparql_endpoint
+        statistics = ApproximateStatistics(endpoint, "Q5", "wdt:P31")
+        self.assertEqual("qlever", endpoint.database)
+        query = statistics.shard_query("P106", 0)
+        if self.debug:
+            print(query)
+        self.assertNotIn("STRENDS", query)
+        self.assertNotIn("OFFSET", query)
+        self.assertNotIn("ORDER BY", query)
+        prefix = SparqlTemplates.entity_prefix
+        self.assertIn(f"FILTER(?item >= <{prefix}Q1> && ?item < <{prefix}Q2>)", query)
+        ranges = [SparqlTemplates.id_range(shard) for shard in range(9)]
+        for (_first, after), (first, _after) in zip(ranges, ranges[1:]):
+            self.assertEqual(after, first)
+        for item in ["Q1", "Q5", "Q42", "Q9999", "Q107"]:
+            iri = f"{prefix}{item}"
+            shards = [
+                i for i, (first, after) in enumerate(ranges) if first <= iri < after
+            ]
+            self.assertEqual([int(item[1]) - 1], shards)
+        endpoint.database = "blazegraph"
+        shard_filter = statistics.shard_filter(8)
+        self.assertEqual(
+            f'\n  FILTER(STR(?item) >= "{prefix}Q9" && STR(?item) < "{prefix}Q:")',
+            shard_filter,
+        )
+
+    def testWorkerThreads(self):
+        """
+        test that shards fetched by worker threads share the admission control
+        """
+        admission = AdmissionController.get_instance()
+        clients = []
+
+        class StubStatistics(ApproximateStatistics):
+            def sketch_shard(self, property_id: str, shard: int) -> PropertySketch:
+                clients.append(admission.current_client.get())
+                sketch = PropertySketch()
+                sketch.add_counts(np.array([1, 2] if shard % 2 else [1]))
+                return sketch
+
+        endpoint = TrulyTabularConfig().sparql_endpoint
+        statistics = StubStatistics(endpoint, "Q5", "wdt:P31", workers=3)
+        with admission.client("a"):
+            row = statistics.stats_row("P106", "occupation", item_count=26)
+        self.assertEqual(9 * ["a"], clients)
+        self.assertEqual(13, row["total"])
+        self.assertEqual(50.0, row["total%"])
@@ -0,0 +1,196 @@
+"""
+Created on 2026-10-19
+
+@author: wf
+"""
+
+import io
+import json
+from urllib.error import HTTPError
+
+from ez_wikidata.wdproperty import WIKIDATA_USER_AGENT
+from lodstorage.query import Endpoint
+from ngwidgets.basetest import Basetest
+
+from wd.sparql_results import SparqlResultParser, SparqlResultReader
+
+
+class ScriptedReader(SparqlResultReader):
+    """
+    a result reader getting scripted responses instead of http requests
+    """
+
+    def __init__(self, endpoint: Endpoint, responses: list):
+        super().__init__(endpoint)
+        self.responses = responses
+        self.requests = []
+
+    def open(self, query: str, accept: str):
+        self.requests.append(accept)
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        content_type, content = response
+        stream = io.BytesIO(content)
+        stream.headers = {"Content-Type": content_type}
+        return stream
+
+
+class TestSparqlResults(Basetest):
+    """
+    test the SPARQL result parsers
+    """
+
+    def get_results(self, count: int):
+        """
+        get a property table result of the given size in JSON and TSV format
+        """
+        xsd_int = "http://www.w3.org/2001/XMLSchema#integer"
+        bindings = []
+        tsv_lines = ["?prop\t?propLabel\t?wbType\t?count"]
+        for i in range(count):
+            prop = f"http://www.wikidata.org/entity/P{i+1}"
+            label = f'property "{i+1}"'
+            wb_type = "http://wikiba.se/ontology#WikibaseItem"
+            bindings.append(
+                {
+                    "prop": {"type": "uri", "value": prop},
+                    "propLabel": {
+                        "type": "literal",
+                        "value": label,
+                        "xml:lang": "en",
+                    },
+                    "wbType": {"type": "uri", "value": wb_type},
+                    "count": {
+                        "type": "literal",
+                        "value": str(count - i),
+                        "datatype": xsd_int,
+                    },
+                }
+            )
+            escaped_label = label.replace('"', '\\"')
+            tsv_lines.append(
+                f'<{prop}>\t"{escaped_label}"@en\t<{wb_type}>\t{count-i}'
+            )
+        result = {
+            "head": {"vars": ["prop", "propLabel", "wbType", "count"]},
+            "results": {"bindings": bindings},
+        }
+        json_content = json.dumps(result).encode("utf-8")
+        tsv_content = "\n".join(tsv_lines).encode("utf-8")
+        return json_content, tsv_content
+
+    def testParseTerm(self):
+        """
+        test parsing single TSV terms
+        """
+        parse = SparqlResultParser.parse_term
+        self.assertEqual(
+            "http://www.wikidata.org/entity/Q5",
+            parse("<http://www.wikidata.org/entity/Q5>"),
+        )
+        self.assertEqual('a\t"b"', parse('"a\\t\\"b\\""@en'))
+        self.assertEqual(42, parse('"42"^^<http://www.w3.org/2001/XMLSchema#int>'))
+        self.assertEqual(42, parse("42"))
+        self.assertEqual(0.5, parse('"0.5"^^xsd:decimal'))
+        self.assertIsNone(parse(""))
+
+    def testParsers(self):
+        """
+        test that all parsers give the same result and compare their performance
+        """
+        json_content, tsv_content = self.get_results(20000)
+        expected = SparqlResultParser.parse_json_sparqlwrapper(json_content)
+        tsv_lod = SparqlResultParser.as_lod(
+            SparqlResultParser.parse_tsv(tsv_content.splitlines())
+        )
+        json_lod = SparqlResultParser.as_lod(
+            SparqlResultParser.parse_json(json_content)
+        )
+        self.assertEqual(expected[:100], tsv_lod[:100])
+        self.assertEqual(expected, json_lod)
+        for report in SparqlResultParser.benchmark(json_content, tsv_content):
+            if self.debug:
+                print(report.asText())
+            self.assertEqual(20000, report.rows)
+
+    def testReaderRequests(self):
+        """
+        test the user agent and the shared rate limit of the result reader
+        """
+        endpoint = Endpoint()
+        endpoint.name = "wikidata-main"
+        endpoint.endpoint = "https://query-main.wikidata.org/sparql"
+        endpoint.database = "blazegraph"
+        endpoint.calls_per_minute = 30
+        reader = SparqlResultReader(endpoint)
+        headers = reader.get_headers(SparqlResultReader.json_mime_type)
+        self.assertEqual(WIKIDATA_USER_AGENT, headers["User-Agent"])
+        self.assertNotIn("Authorization", headers)
+        # all readers of an endpoint share the rate limited urlopen
+        urlopen = SparqlResultReader.get_urlopen(endpoint)
+        self.assertIs(urlopen, SparqlResultReader(endpoint).get_urlopen(endpoint))
+        endpoint.auth = "BASIC"
+        endpoint.user = "wf"
+        endpoint.password = "secret"
+        headers = reader.get_headers(SparqlResultReader.tsv_mime_type)
+        self.assertEqual("Basic d2Y6c2VjcmV0", headers["Authorization"])
+
+    def testFormatFallback(self):
+        """
+        test that only an endpoint refusing TSV switches the reader to JSON
+        """
+        json_content, tsv_content = self.get_results(3)
+        endpoint = Endpoint()
+        endpoint.name = "qlever"
+        endpoint.endpoint = "https://qlever.example.org/api/wikidata"
+        endpoint.database = "qlever"
+        tsv = SparqlResultReader.tsv_mime_type
+        json_type = SparqlResultReader.json_mime_type
+        # rate limiting and timeouts are raised without a JSON retry
+        for error in [
+            HTTPError(endpoint.endpoint, 429, "Too Many Requests", {}, None),
+            TimeoutError("timed out"),
+        ]:
+            reader = ScriptedReader(endpoint, [error])
+            with self.assertRaises(type(error)):
+                reader.do_query_as_columns("SELECT")
+            self.assertTrue(reader.use_tsv)
+            self.assertEqual([tsv], reader.requests)
+        # TSV refused
+        refused = HTTPError(endpoint.endpoint, 406, "Not Acceptable", {}, None)
+        reader = ScriptedReader(endpoint, [refused, (json_type, json_content)])
+        columns = reader.do_query_as_columns("SELECT")
+        self.assertEqual([tsv, json_type], reader.requests)
+        self.assertFalse(reader.use_tsv)
+        self.assertEqual(3, len(columns["prop"]))
+        # answered in JSON anyway
+        reader = ScriptedReader(endpoint, [(json_type, json_content)])
+        columns = reader.do_query_as_columns("SELECT")
+        self.assertEqual([tsv], reader.requests)
+        self.assertFalse(reader.use_tsv)
+        self.assertEqual(3, len(columns["prop"]))
+        reader = ScriptedReader(endpoint, [(tsv, tsv_content)])
+        columns = reader.do_query_as_columns("SELECT")
+        self.assertTrue(reader.use_tsv)
+        self.assertEqual([3, 2, 1], columns["count"])
+
+    def testChunks(self):
+        """
+        test streaming a result in chunks of rows
+        """
+        json_content, tsv_content = self.get_results(5)
+        endpoint = Endpoint()
+        endpoint.name = "qlever"
+        endpoint.endpoint = "https://qlever.example.org/api/wikidata"
+        endpoint.database = "qlever"
+        for content_type, content in [
+            (SparqlResultReader.tsv_mime_type, tsv_content),
+            (SparqlResultReader.json_mime_type, json_content),
+        ]:
+            reader = ScriptedReader(endpoint, [(content_type, content)])
+            chunks = list(reader.query_as_chunks("SELECT", chunk_size=2))
+            counts = [chunk["count"] for chunk in chunks]
+            self.assertEqual([[5, 4], [3, 2], [1]], counts)
+        chunks = list(SparqlResultParser.iter_tsv([b"?item\t?count"], chunk_size=2))
+        self.assertEqual([], chunks)
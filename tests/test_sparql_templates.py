@@ -0,0 +1,168 @@
+"""
+Created on 2026-10-19
+
+@author: wf
+"""
+
+import datetime
+
+from ez_wikidata.trulytabular import TrulyTabular
+from ez_wikidata.wdproperty import WikidataProperty
+from ez_wikidata.wikidata import WikidataItem
+from lodstorage.query import Endpoint, Query
+from ngwidgets.basetest import Basetest
+
+from wd.sparql_templates import SparqlTemplate, SparqlTemplates
+
+
+class TestSparqlTemplates(Basetest):
+    """
+    test the compiled SPARQL templates
+    """
+
+    def get_truly_tabular(self, database: str = "qlever") -> TrulyTabular:
+        """
+        get a TrulyTabular for human (Q5) without resolving anything online
+        """
+        tt = TrulyTabular.__new__(TrulyTabular)
+        tt.itemQid = "Q5"
+        tt.search_predicate = "wdt:P31"
+        tt.where = ""
+        tt.lang = "en"
+        tt.isodate = datetime.datetime(2026, 10, 19).isoformat()
+        tt.endpointConf = Endpoint()
+        tt.endpointConf.database = database
+        item = WikidataItem("Q5")
+        item.qlabel = "human"
+        item.description = "any member of Homo sapiens"
+        item.itemVarname = "humanItem"
+        item.labelVarname = "human"
+        tt.item = item
+        tt.properties = {
+            wd_property.pid: wd_property for wd_property in self.get_properties()
+        }
+        return tt
+
+    def get_properties(self, count: int = 3) -> list:
+        labels = ["sex or gender", "described at URL", "date of birth", "occupation"]
+        type_names = ["WikibaseItem", "Url", "Time", "WikibaseItem"]
+        properties = []
+        for i in range(count):
+            label = labels[i % len(labels)] + ("" if i < len(labels) else f" {i}")
+            properties.append(
+                WikidataProperty(
+                    id=f"P{i+1}en",
+                    pid=f"P{i+1}",
+                    lang="en",
+                    plabel=label,
+                    description="",
+                    type_name=type_names[i % len(type_names)],
+                )
+            )
+        return properties
+
+    def testTemplate(self):
+        """
+        test compiling and rendering a single template
+        """
+        template = SparqlTemplate("test", "?item ${predicate} wd:${qid}. # ${qid}")
+        self.assertEqual(("predicate", "qid"), template.params)
+        text = template.render(qid="Q5", predicate="wdt:P31", lang="en")
+        self.assertEqual("?item wdt:P31 wd:Q5. # Q5", text)
+        self.assertIs(text, template.render(qid="Q5", predicate="wdt:P31"))
+        url = template.try_it_url(
+            "https://qlever.cs.uni-freiburg.de/wikidata",
+            "qlever",
+            qid="Q5",
+            predicate="wdt:P31",
+        )
+        self.assertTrue(url.endswith("?query=%3Fitem%20wdt%3AP31%20wd%3AQ5.%20%23%20Q5"))
+
+    def testSameAsStringBuilding(self):
+        """
+        test that the templates render the same queries as TrulyTabular
+        """
+        templates = SparqlTemplates()
+        for database in ["qlever", "blazegraph", "jena"]:
+            tt = self.get_truly_tabular(database)
+            for min_count in [0, 1000]:
+                expected = tt.mostFrequentPropertiesQuery(minCount=min_count)
+                query = templates.most_frequent_properties_query(tt, min_count)
+                self.assertEqual(expected.query, query.query)
+                self.assertEqual(expected.name, query.name)
+        for wd_property in tt.properties.values():
+            for as_frequency in [True, False]:
+                expected = tt.noneTabularQuery(wd_property, asFrequency=as_frequency)
+                text = templates.none_tabular_query(tt, wd_property, as_frequency)
+                self.assertEqual(expected.query, text)
+        pids = list(tt.properties.keys())
+        gen_map = {
+            pids[0]: ["count", "list", "label"],
+            pids[1]: ["ignore"],
+            pids[2]: ["min", "max", "sample"],
+        }
+        for naive in [True, False]:
+            expected = tt.generateSparqlQuery(
+                genMap=gen_map, naive=naive, lang="de", listSeparator="|"
+            )
+            text = templates.generate_query(
+                tt, genMap=gen_map, naive=naive, lang="de", listSeparator="|"
+            )
+            self.assertEqual(expected, text)
+        website = "https://query.wikidata.org"
+        self.assertEqual(
+            Query(name="test", query=text).getTryItUrl(website, "blazegraph"),
+            templates.try_it_url(text, website, "blazegraph"),
+        )
+
+    def testBenchmark(self):
+        """
+        compare the per property generation cost
+        """
+        templates = SparqlTemplates()
+        tt = self.get_truly_tabular()
+        properties = self.get_properties(200)
+        reports = templates.benchmark(
+            tt, properties, "https://qlever.cs.uni-freiburg.de/wikidata", "qlever"
+        )
+        if self.debug:
+            for report in reports:
+                print(report.asText())
+        baseline, compiled = reports
+        self.assertEqual(600, compiled.calls)
+        self.assertLess(compiled.seconds, baseline.seconds)
+
+    def testPaginatedStatistic(self):
+        """
+        test that the paginated statistic adds up the exact frequencies
+        of the id ranges
+        """
+        tt = self.get_truly_tabular()
+        queries = []
+
+        class ShardSPARQL:
+            def queryAsListOfDicts(self, query: str) -> list:
+                queries.append(query)
+                # every id range has 10 single valued and 2 double valued instances
+                lod = [{"count": 1, "frequency": 10}, {"count": 2, "frequency": 2}]
+                if len(queries) == 3:
+                    lod.append({"count": 5, "frequency": 1})
+                return lod
+
+        tt.sparql = ShardSPARQL()
+        templates = SparqlTemplates()
+        wd_property = self.get_properties(1)[0]
+        row = templates.property_statistic(tt, wd_property, 216, paginated=True)
+        if self.debug:
+            print(queries[0])
+            print(row)
+        self.assertEqual(SparqlTemplates.id_shards, len(queries))
+        prefix = SparqlTemplates.entity_prefix
+        self.assertIn(f"?item >= <{prefix}Q1> && ?item < <{prefix}Q2>", queries[0])
+        self.assertEqual(90, row["1"])
+        self.assertEqual(109, row["total"])
+        self.assertEqual(50.5, row["total%"])
+        self.assertEqual(19, row["non tabular"])
+        self.assertEqual(5, row["maxf"])
+        # the try it link is the unpaginated query
+        self.assertNotIn("FILTER(?item", row["queryf"])
@@ -0,0 +1,67 @@
+"""
+Created on 2026-10-19
+
+@author: wf
+"""
+
+import time
+
+from ez_wikidata.wdproperty import WIKIDATA_USER_AGENT, with_user_agent
+from lodstorage.query import Endpoint
+from lodstorage.sparql import SPARQL
+from ngwidgets.basetest import Basetest
+
+from wd.subclass_index import ClosureRewritingSPARQL, SubclassClosureIndex
+
+
+class TestSubclassIndex(Basetest):
+    """
+    test the subclass closure query rewriting
+    """
+
+    def testRewrite(self):
+        """
+        test rewriting the transitive search predicate
+        """
+        index = SubclassClosureIndex(
+            cache_dir="/tmp/wdgrid_subclass_test", max_values=3
+        )
+        query = """SELECT (COUNT(DISTINCT ?item) AS ?count)
+WHERE {
+  # instance of video game
+  ?item wdt:P31/wdt:P279* wd:Q7889.
+}"""
+        rewritten = index.rewrite(query, "Q7889", ["Q7889", "Q1", "Q2"])
+        if self.debug:
+            print(rewritten)
+        self.assertIn("VALUES ?ttClass { wd:Q7889 wd:Q1 wd:Q2 }", rewritten)
+        self.assertIn("?item wdt:P31 ?ttClass.", rewritten)
+        self.assertNotIn("P279*", rewritten)
+        self.assertLess(rewritten.index("VALUES"), rewritten.index("?item wdt:P31"))
+        # other classes, other predicates and too large closures are left alone
+        self.assertEqual(query, index.rewrite(query, "Q788", ["Q788"]))
+        too_large = ["Q1", "Q2", "Q3", "Q4"]
+        self.assertEqual(query, index.rewrite(query, "Q7889", too_large))
+        plain = query.replace("wdt:P31/wdt:P279*", "wdt:P31")
+        self.assertEqual(plain, index.rewrite(plain, "Q7889", ["Q7889"]))
+
+    def testClosureRewritingSPARQL(self):
+        """
+        test that the rewriting SPARQL access keeps the wrapped client
+        """
+        index = SubclassClosureIndex(cache_dir="/tmp/wdgrid_subclass_test")
+        endpoint = Endpoint()
+        endpoint.name = "wikidata-qlever"
+        endpoint.endpoint = "https://qlever.dev/api/wikidata"
+        index.closures[("Q7889", endpoint.name)] = {
+            "qid": "Q7889",
+            "endpoint": endpoint.name,
+            "timestamp": time.time(),
+            "classes": ["Q7889", "Q1"],
+        }
+        sparql = with_user_agent(SPARQL(endpoint.endpoint, calls_per_minute=30))
+        rewriting = ClosureRewritingSPARQL(sparql, endpoint, "Q7889", index)
+        self.assertIs(sparql, rewriting.wrapped)
+        self.assertIs(sparql.rate_limiter, rewriting.rate_limiter)
+        self.assertEqual(WIKIDATA_USER_AGENT, rewriting.sparql.agent)
+        self.assertEqual(["Q7889", "Q1"], rewriting.classes)
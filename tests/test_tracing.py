@@ -0,0 +1,104 @@
+"""
+Created on 2026-10-19
+
+@author: wf
+"""
+
+import json
+import tempfile
+import threading
+
+from ez_wikidata.wdproperty import WIKIDATA_USER_AGENT, with_user_agent
+from lodstorage.sparql import SPARQL
+from ngwidgets.basetest import Basetest
+
+from wd.tracing import JsonlSpanExporter, OtlpHttpExporter, TracedSPARQL, Tracer
+
+
+class TestTracing(Basetest):
+    """
+    test the tracing spans and exporters
+    """
+
+    def testSpans(self):
+        """
+        test nested spans, explicit parents and the jsonl export
+        """
+        self.assertFalse(Tracer().enabled)
+        with Tracer().span("analysis") as span:
+            self.assertIsNone(span)
+        with tempfile.NamedTemporaryFile(suffix=".jsonl", delete=False) as trace_file:
+            path = trace_file.name
+        tracer = Tracer([JsonlSpanExporter(path)])
+        with tracer.span("analysis", qid="Q5") as root:
+            with tracer.span("update_item_count_view", cache_hit=False) as count:
+                count.set_attribute("count", 12)
+
+            def stats_rows():
+                with tracer.span("stats rows", parent=root):
+                    pass
+
+            thread = threading.Thread(target=stats_rows)
+            thread.start()
+            thread.join()
+        with open(path) as jsonl_file:
+            records = [json.loads(line) for line in jsonl_file]
+        if self.debug:
+            for record in records:
+                print(record)
+        self.assertEqual(
+            ["update_item_count_view", "stats rows", "analysis"],
+            [record["name"] for record in records],
+        )
+        self.assertEqual(1, len({record["trace_id"] for record in records}))
+        self.assertEqual(root.span_id, records[1]["parent_id"])
+        self.assertEqual("Q5", records[2]["attributes"]["qid"])
+        summary = tracer.trace_summary(root.trace_id)
+        self.assertEqual("analysis", summary["critical path"][0].split(":")[0])
+
+    def testOtlpPayload(self):
+        """
+        test the OTLP/HTTP JSON encoding
+        """
+        exporter = OtlpHttpExporter("http://localhost:4318", flush_interval=3600)
+        tracer = Tracer([])
+        tracer.exporters = [exporter]
+        try:
+            with tracer.span("sparql", rows=3, endpoint="wikidata"):
+                pass
+            payload = exporter.payload(list(exporter.queue))
+            span = payload["resourceSpans"][0]["scopeSpans"][0]["spans"][0]
+            self.assertEqual("sparql", span["name"])
+            self.assertEqual(32, len(span["traceId"]))
+            rows = {"key": "rows", "value": {"intValue": "3"}}
+            self.assertIn(rows, span["attributes"])
+        finally:
+            exporter.queue.clear()
+            exporter.stopped = True
+
+    def testTracedSPARQL(self):
+        """
+        test that the traced SPARQL access keeps the wrapped client
+        """
+
+        class RecordingSPARQL(SPARQL):
+            """
+            SPARQL access recording the queries instead of sending them
+            """
+
+            queries = []
+
+            def rawQuery(self, queryString: str, method="POST"):
+                self.queries.append(queryString)
+                return []
+
+        sparql = with_user_agent(
+            RecordingSPARQL("https://qlever.dev/api/wikidata", calls_per_minute=30)
+        )
+        traced = TracedSPARQL(sparql, endpoint_name="wikidata-qlever")
+        self.assertIs(sparql.rate_limiter, traced.rate_limiter)
+        self.assertEqual(WIKIDATA_USER_AGENT, traced.sparql.agent)
+        self.assertEqual("https://qlever.dev/api/wikidata", traced.url)
+        bindings = traced.rawQuery("SELECT ?item WHERE { ?item ?p ?o }")
+        self.assertEqual([], bindings)
+        self.assertEqual(1, len(RecordingSPARQL.queries))
@@ -0,0 +1,86 @@
+"""
+Created on 2026-10-19
+
+@author: wf
+"""
+
+import tempfile
+
+from ngwidgets.basetest import Basetest
+
+from wd.cache import TTLCache
+from wd.item_cache import ItemCache
+from wd.warmup import CacheWarmer, RateLimiter, WarmupConfig
+
+
+class TestWarmup(Basetest):
+    """
+    test the cache warm up
+    """
+
+    def testAccessLog(self):
+        """
+        test deriving the popular classes from an access log
+        """
+        lines = [
+            '127.0.0.1:1 - "GET /tt/Q5 HTTP/1.1" 200',
+            '127.0.0.1:1 - "GET /tt/Q5 HTTP/1.1" 200',
+            '127.0.0.1:1 - "GET /tt/Q7889 HTTP/1.1" 200',
+            '127.0.0.1:1 - "GET /tt/Q42 HTTP/1.1" 404',
+            '127.0.0.1:1 - "GET /settings HTTP/1.1" 200',
+        ]
+        with tempfile.NamedTemporaryFile("w", suffix=".log", delete=False) as log:
+            log.write("\n".join(lines))
+        targets = CacheWarmer.targets_from_access_log(log.name, top=5)
+        self.assertEqual(["Q5", "Q7889"], [target.qid for target in targets])
+        with tempfile.NamedTemporaryFile("w", suffix=".yaml", delete=False) as yml:
+            yml.write(f"targets:\n- Q11424\n- qid: Q5\naccess_log: {log.name}\n")
+        config = WarmupConfig.load(yml.name)
+        warmer = CacheWarmer(config)
+        targets = warmer.get_targets()
+        self.assertEqual(["Q11424", "Q5", "Q7889"], [target.qid for target in targets])
+        self.assertIsNone(WarmupConfig.load("/tmp/wdgrid_no_such_warmup.yaml"))
+
+    def testRateLimiter(self):
+        """
+        test that the limiter gives way to interactive traffic
+        """
+        limiter = RateLimiter(calls_per_minute=6000, idle_seconds=0.1)
+        self.assertTrue(limiter.acquire())
+        RateLimiter.note_activity()
+        self.assertTrue(limiter.acquire())
+        self.assertGreaterEqual(limiter.next_call - RateLimiter.last_activity, 0.1)
+        limiter.stop()
+        self.assertFalse(limiter.acquire())
+
+    def testFreshness(self):
+        """
+        test that warmed entries outlive the interval and that entries
+        expiring before the next run are refreshed
+        """
+        config = WarmupConfig(interval=100, ttl_margin=10)
+        self.assertEqual(110, config.ttl)
+        default_config = WarmupConfig()
+        self.assertGreater(default_config.ttl, default_config.interval)
+        warmer = CacheWarmer(config)
+        cache = TTLCache("test", ttl=50)
+        key = ("Q5", "wdt:P31", "wikidata-qlever")
+        self.assertFalse(warmer.is_fresh(cache, key))
+        # an interactive entry with the default time to live
+        cache.put(key, 5)
+        self.assertFalse(warmer.is_fresh(cache, key))
+        cache.put(key, 5, ttl=config.ttl)
+        self.assertTrue(warmer.is_fresh(cache, key))
+
+    def testPropertyTable(self):
+        """
+        test the shared property table cache
+        """
+        item_cache = ItemCache()
+        key = ("Q5", "wdt:P31", "wikidata-qlever", "en")
+        lod = [{"prop": "P31", "count": 100}, {"prop": "P21", "count": 50}]
+        item_cache.put_property_table(key, 10, lod)
+        self.assertIsNone(item_cache.get_property_table(key, 5))
+        self.assertEqual(1, len(item_cache.get_property_table(key, 60)))
+        item_cache.put_property_table(key, 20, lod[:1])
+        self.assertEqual(2, len(item_cache.get_property_table(key, 10)))
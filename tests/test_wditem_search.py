@@ -0,0 +1,150 @@
+"""
+Created on 2026-10-19
+
+@author: wf
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+from ngwidgets.basetest import Basetest
+
+from wd.wditem_search import AdaptiveDebounce, SearchLatency, WikidataItemSearch
+
+
+class TestWikidataItemSearch(Basetest):
+    """
+    test the cancellable item search helpers
+    """
+
+    def testAdaptiveDebounce(self):
+        """
+        test adapting the debounce delay to typing speed and latency
+        """
+        debounce = AdaptiveDebounce(initial=0.65, alpha=1.0)
+        self.assertAlmostEqual(0.975, debounce.delay)
+        # fast typing - 0.2 s between keystrokes
+        for i in range(5):
+            debounce.note_keystroke(10.0 + i * 0.2)
+        self.assertAlmostEqual(0.2, debounce.typing_gap)
+        self.assertAlmostEqual(0.325, debounce.delay)
+        # a pause does not count as typing speed
+        debounce.note_keystroke(20.0)
+        self.assertAlmostEqual(0.2, debounce.typing_gap)
+        # a fast backend does not shorten the delay below the typing gap
+        debounce.note_latency(0.05)
+        self.assertAlmostEqual(0.3, debounce.delay)
+        # a slow backend lengthens the delay
+        debounce.note_latency(1.0)
+        self.assertAlmostEqual(0.5, debounce.delay)
+        # slow typing and a very slow backend are capped
+        debounce.note_latency(6.0)
+        debounce.note_keystroke(21.5)
+        self.assertAlmostEqual(debounce.max_delay, debounce.delay)
+        self.assertGreater(debounce.delay, debounce.typing_gap)
+        # very fast typing is bounded by the minimum
+        for i in range(3):
+            debounce.note_keystroke(30.0 + i * 0.02)
+        debounce.note_latency(0.05)
+        self.assertAlmostEqual(debounce.min_delay, debounce.delay)
+
+    def testDebouncedSearch(self):
+        """
+        test cancelling a search in flight and discarding superseded results
+        """
+
+        class StubSearch(WikidataItemSearch):
+            """
+            an item search without user interface and with scripted responses
+            """
+
+            def setup(self):
+                self.search_input = SimpleNamespace(value="")
+                self.search_result_row = SimpleNamespace()
+                self.latency_label = SimpleNamespace(text="")
+                self.adaptive = False
+                self.keyStrokeTime = 0.01
+                self.latency = SearchLatency()
+                self.in_flight = asyncio.Event()
+                self.release = asyncio.Event()
+                self.cancelled = []
+                self.shown = []
+
+            def notify_search(self, search_for: str):
+                pass
+
+            def show_result(self, wd_search_result):
+                self.shown.append(wd_search_result)
+
+            async def search_options(self, search_for: str, limit: int):
+                self.in_flight.set()
+                try:
+                    await self.release.wait()
+                except asyncio.CancelledError:
+                    self.cancelled.append(search_for)
+                    raise
+                if search_for == "stale":
+                    # a keystroke noted before this search resumed
+                    self.search_seq += 1
+                return [(search_for, search_for, "")]
+
+            async def type(self, text: str):
+                self.search_input.value = text
+                await self.on_search_change(None)
+
+        async def run_searches():
+            search = StubSearch(solution=None)
+            # a new keystroke cancels the request in flight
+            await search.type("hu")
+            await search.in_flight.wait()
+            await search.type("human")
+            search.release.set()
+            await search.search_debounce_task
+            self.assertEqual(["hu"], search.cancelled)
+            self.assertEqual([[("human", "human", "")]], search.shown)
+            # a response arriving after a newer keystroke is discarded
+            await search.type("stale")
+            await search.search_debounce_task
+            self.assertEqual(1, len(search.shown))
+            return search.latency.counts
+
+        counts = asyncio.run(run_searches())
+        if self.debug:
+            print(counts)
+        self.assertEqual(1, counts[("fixed", "cancelled")])
+        self.assertEqual(1, counts[("fixed", "stale")])
+        self.assertEqual(3, counts[("fixed", "started")])
+
+    def testSearchLatency(self):
+        """
+        test the perceived latency statistics
+        """
+        latency = SearchLatency()
+        for value in [0.5, 0.7, 0.9]:
+            latency.record("fixed", value)
+        latency.record("adaptive", 0.3)
+        latency.note("adaptive", "cancelled")
+        summary = latency.summary()
+        if self.debug:
+            print(latency.asText())
+        self.assertEqual(["adaptive", "fixed"], [r["mode"] for r in summary])
+        self.assertEqual(1, summary[0]["cancelled"])
+        self.assertAlmostEqual(0.7, summary[1]["p50 s"])
+
+    def testToOptions(self):
+        """
+        test converting the wbsearchentities result
+        """
+        srlist = [
+            {
+                "id": "Q5",
+                "label": "human",
+                "display": {"description": {"value": "any member of Homo sapiens"}},
+            },
+            {"id": "Q42"},
+        ]
+        options = WikidataItemSearch.to_options(srlist)
+        self.assertEqual(
+            [("Q5", "human", "any member of Homo sapiens"), ("Q42", "Q42", "")],
+            options,
+        )
@@ -0,0 +1,128 @@
+"""
+Created on 2026-10-19
+
+@author: wf
+"""
+
+import hashlib
+import html
+import os
+import secrets
+from typing import Optional
+
+from starlette.requests import Request
+from starlette.responses import HTMLResponse, RedirectResponse, Response
+
+
+class AdminAccess:
+    """
+    access check for the admin pages
+
+    admins authenticate with the token of the WDGRID_ADMIN_TOKEN environment
+    variable - scripts send it as bearer token in the Authorization header,
+    browsers post it once to the login page which sets an http only cookie.
+    Local requests are only trusted without the token if
+    WDGRID_ADMIN_TRUST_LOCALHOST is set since behind a reverse proxy
+    every request comes from localhost
+    """
+
+    admin_hosts = ["127.0.0.1", "::1", "localhost"]
+    token_env = "WDGRID_ADMIN_TOKEN"
+    trust_localhost_env = "WDGRID_ADMIN_TRUST_LOCALHOST"
+    cookie_name = "wdgrid_admin"
+    login_path = "/admin/login"
+
+    @classmethod
+    def get_token(cls) -> Optional[str]:
+        token = os.environ.get(cls.token_env, None)
+        return token or None
+
+    @classmethod
+    def trust_localhost(cls) -> bool:
+        value = os.environ.get(cls.trust_localhost_env, "")
+        trust = value.lower() in ("1", "true", "yes")
+        return trust
+
+    @classmethod
+    def session_value(cls, token: str) -> str:
+        """
+        get the cookie value for the given token - the token itself
+        is never stored in the browser
+        """
+        value = hashlib.sha256(f"wdgrid admin:{token}".encode("utf-8")).hexdigest()
+        return value
+
+    @classmethod
+    def is_admin(cls, request: Request) -> bool:
+        """
+        check whether the given request is allowed to use the admin pages
+
+        Args:
+            request(Request): the http request
+
+        Returns:
+            bool: True if the request is an admin request
+        """
+        if request is None:
+            return False
+        token = cls.get_token()
+        if token:
+            authorization = request.headers.get("authorization", "")
+            scheme, _, credentials = authorization.partition(" ")
+            if scheme.lower() == "bearer" and secrets.compare_digest(
+                credentials.strip(), token
+            ):
+                return True
+            cookie = request.cookies.get(cls.cookie_name, "")
+            if cookie and secrets.compare_digest(cookie, cls.session_value(token)):
+                return True
+        host = request.client.host if request.client else None
+        is_admin = cls.trust_localhost() and host in cls.admin_hosts
+        return is_admin
+
+    @classmethod
+    def login_form(cls, next_path: str = "/admin/sessions", error: str = "") -> str:
+        """
+        get the html login form posting the admin token
+        """
+        message = f"<p>{html.escape(error)}</p>" if error else ""
+        form = f"""<html><body>{message}
+<form method="post" action="{cls.login_path}">
+<input type="hidden" name="next" value="{html.escape(next_path)}">
+<input type="password" name="token" placeholder="admin token" autofocus>
+<button type="submit">login</button>
+</form></body></html>"""
+        return form
+
+    @classmethod
+    async def login(cls, request: Request) -> Response:
+        """
+        check the posted admin token and set the admin cookie
+
+        Args:
+            request(Request): the posted login form
+
+        Returns:
+            Response: a redirect to the requested admin page or the form again
+        """
+        form = await request.form()
+        next_path = str(form.get("next", "/admin/sessions"))
+        if not next_path.startswith("/admin/") or next_path.startswith("//"):
+            next_path = "/admin/sessions"
+        token = cls.get_token()
+        posted = str(form.get("token", ""))
+        if not token or not secrets.compare_digest(posted, token):
+            return HTMLResponse(
+                cls.login_form(next_path, error="invalid admin token"),
+                status_code=403,
+            )
+        response = RedirectResponse(next_path, status_code=303)
+        response.set_cookie(
+            cls.cookie_name,
+            cls.session_value(token),
+            httponly=True,
+            samesite="strict",
+            secure=request.url.scheme == "https",
+            path="/admin",
+        )
+        return response
@@ -0,0 +1,408 @@
+"""
+Created on 2026-10-19
+
+@author: wf
+"""
+
+import asyncio
+import collections
+import contextlib
+import contextvars
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+
+@dataclass
+class Ticket:
+    """
+    a request for a slot of the admission controller
+    """
+
+    kind: str
+    client_id: str
+    seq: int
+    enqueued: float = field(default_factory=time.monotonic)
+    admitted: Optional[float] = None
+    released: bool = False
+
+    @property
+    def wait(self) -> float:
+        end = self.admitted or time.monotonic()
+        return end - self.enqueued
+
+
+class AdmissionController:
+    """
+    server wide admission control of analyses and SPARQL queries
+
+    at most max_analyses analyses and max_queries SPARQL queries run at once -
+    excess work is queued and the free slots are granted fair share: to the
+    waiting client with the fewest running slots of that kind first, then
+    round robin to the client served least recently and in order of arrival
+    among equals. Slots are reentrant per thread so nested calls do not
+    wait for themselves
+
+    analyses are admitted on the event loop with run_admitted and run on a
+    dedicated executor with one worker per analysis slot - queued analyses
+    hold no worker thread and admitted ones do not compete with the shared
+    worker pool of the web server they need for their own background work
+    """
+
+    _instance: Optional["AdmissionController"] = None
+    _instance_lock = threading.Lock()
+    kinds = ["analysis", "query"]
+
+    def __init__(self, max_analyses: int = 4, max_queries: int = 8, keep: int = 1000):
+        """
+        constructor
+
+        Args:
+            max_analyses(int): the maximum number of concurrent analyses
+            max_queries(int): the maximum number of in-flight SPARQL queries
+            keep(int): the number of recent wait times to keep per kind
+        """
+        self.limits = {"analysis": max_analyses, "query": max_queries}
+        self.condition = threading.Condition()
+        self.seq = itertools.count(1)
+        self.waiting: List[Ticket] = []
+        self.running: Dict[str, int] = {kind: 0 for kind in self.kinds}
+        self.running_by_client: Dict[str, collections.Counter] = {
+            kind: collections.Counter() for kind in self.kinds
+        }
+        self.admitted: Dict[str, int] = {kind: 0 for kind in self.kinds}
+        # admission number of the last slot granted to each client
+        self.last_admitted: Dict[str, Dict[str, int]] = {
+            kind: {} for kind in self.kinds
+        }
+        self.max_clients = 10000
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_analyses, thread_name_prefix="analysis"
+        )
+        self.waits: Dict[str, Deque[float]] = {
+            kind: collections.deque(maxlen=keep) for kind in self.kinds
+        }
+        self.local = threading.local()
+        self.current_client: contextvars.ContextVar = contextvars.ContextVar(
+            "wdgrid_client", default="anonymous"
+        )
+
+    @classmethod
+    def get_instance(cls) -> "AdmissionController":
+        """
+        get the process wide admission controller
+        """
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = AdmissionController()
+        return cls._instance
+
+    def fair_order(self, kind: str) -> List[Ticket]:
+        """
+        get the waiting tickets of the given kind in the order they are admitted
+        """
+        running = self.running_by_client[kind]
+        last_admitted = self.last_admitted[kind]
+        tickets = sorted(
+            (ticket for ticket in self.waiting if ticket.kind == kind),
+            key=lambda ticket: (
+                running[ticket.client_id],
+                last_admitted.get(ticket.client_id, 0),
+                ticket.seq,
+            ),
+        )
+        return tickets
+
+    def position(self, ticket: Ticket) -> int:
+        """
+        get the 1 based queue position of the given waiting ticket
+        """
+        position = self.fair_order(ticket.kind).index(ticket) + 1
+        return position
+
+    def is_next(self, ticket: Ticket) -> bool:
+        if self.running[ticket.kind] >= self.limits[ticket.kind]:
+            return False
+        is_next = self.fair_order(ticket.kind)[0] is ticket
+        return is_next
+
+    def depth(self, kind: str) -> int:
+        depth = getattr(self.local, kind, 0)
+        return depth
+
+    def acquire(
+        self,
+        kind: str,
+        client_id: str = None,
+        on_wait: Callable[[int], None] = None,
+    ) -> Optional[Ticket]:
+        """
+        wait for a slot of the given kind
+
+        Args:
+            kind(str): analysis or query
+            client_id(str): the client session - default: the current client
+            on_wait(Callable): called with the queue position whenever it changes
+
+        Returns:
+            Ticket: the admitted ticket or None if this thread already holds a slot
+        """
+        depth = self.depth(kind)
+        setattr(self.local, kind, depth + 1)
+        if depth > 0:
+            return None
+        client_id = client_id or self.current_client.get()
+        ticket = Ticket(kind, client_id, next(self.seq))
+        last_position = None
+        with self.condition:
+            self.waiting.append(ticket)
+            try:
+                while not self.is_next(ticket):
+                    position = self.position(ticket)
+                    if on_wait and position != last_position:
+                        last_position = position
+                        self.condition.release()
+                        try:
+                            on_wait(position)
+                        finally:
+                            self.condition.acquire()
+                        continue
+                    self.condition.wait(1.0)
+            except BaseException:
+                self.waiting.remove(ticket)
+                setattr(self.local, kind, depth)
+                self.condition.notify_all()
+                raise
+            self.admit(ticket)
+        return ticket
+
+    def admit(self, ticket: Ticket):
+        """
+        grant a slot to the given waiting ticket - the condition is held
+        """
+        kind = ticket.kind
+        self.waiting.remove(ticket)
+        ticket.admitted = time.monotonic()
+        self.running[kind] += 1
+        self.running_by_client[kind][ticket.client_id] += 1
+        self.admitted[kind] += 1
+        self.note_admitted(kind, ticket.client_id)
+        self.waits[kind].append(ticket.wait)
+        # the order of the other waiting tickets may have changed
+        self.condition.notify_all()
+
+    async def acquire_async(
+        self,
+        kind: str,
+        client_id: str = None,
+        on_wait: Callable[[int], None] = None,
+        poll: float = 0.1,
+    ) -> Ticket:
+        """
+        wait for a slot of the given kind on the event loop without
+        blocking a worker thread
+
+        Args:
+            kind(str): analysis or query
+            client_id(str): the client session - default: the current client
+            on_wait(Callable): called with the queue position whenever it changes
+            poll(float): the interval to check for a free slot in seconds
+
+        Returns:
+            Ticket: the admitted ticket - to be freed with free
+        """
+        client_id = client_id or self.current_client.get()
+        ticket = Ticket(kind, client_id, next(self.seq))
+        last_position = None
+        with self.condition:
+            self.waiting.append(ticket)
+        try:
+            while True:
+                with self.condition:
+                    if self.is_next(ticket):
+                        self.admit(ticket)
+                        return ticket
+                    position = self.position(ticket)
+                if on_wait and position != last_position:
+                    last_position = position
+                    on_wait(position)
+                await asyncio.sleep(poll)
+        except BaseException:
+            with self.condition:
+                if ticket in self.waiting:
+                    self.waiting.remove(ticket)
+                self.condition.notify_all()
+            raise
+
+    async def run_admitted(
+        self,
+        kind: str,
+        func: Callable,
+        *args,
+        client_id: str = None,
+        on_wait: Callable[[int], None] = None,
+    ) -> Any:
+        """
+        wait for a slot on the event loop and call func in a worker thread
+        of the dedicated executor - the slot is freed when func returns
+        even if the awaiting task is cancelled in the meantime
+
+        Args:
+            kind(str): analysis or query
+            func(Callable): the blocking work to run in the slot
+            *args: the arguments of func
+            client_id(str): the client session - default: the current client
+            on_wait(Callable): called with the queue position whenever it changes
+
+        Returns:
+            the result of func
+        """
+        ticket = await self.acquire_async(kind, client_id, on_wait)
+        state = {"started": False, "abandoned": False}
+        state_lock = threading.Lock()
+
+        def call():
+            with state_lock:
+                if state["abandoned"]:
+                    return None
+                state["started"] = True
+            try:
+                with self.client(ticket.client_id), self.holding(kind):
+                    return func(*args)
+            finally:
+                self.free(ticket)
+
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self.executor, call)
+        except BaseException:
+            with state_lock:
+                if not state["started"]:
+                    state["abandoned"] = True
+                    self.free(ticket)
+            raise
+        return result
+
+    @contextlib.contextmanager
+    def holding(self, kind: str):
+        """
+        mark the current thread as holding a slot of the given kind so that
+        nested slots of that kind do not wait for themselves
+        """
+        depth = self.depth(kind)
+        setattr(self.local, kind, depth + 1)
+        try:
+            yield
+        finally:
+            setattr(self.local, kind, depth)
+
+    def note_admitted(self, kind: str, client_id: str):
+        last_admitted = self.last_admitted[kind]
+        last_admitted.pop(client_id, None)
+        last_admitted[client_id] = self.admitted[kind]
+        if len(last_admitted) > self.max_clients:
+            # forget the clients served longest ago - dicts keep insertion order
+            for stale in list(last_admitted)[: self.max_clients // 2]:
+                del last_admitted[stale]
+
+    def release(self, kind: str, ticket: Optional[Ticket]):
+        """
+        release the slot of the given ticket
+        """
+        setattr(self.local, kind, self.depth(kind) - 1)
+        if ticket is None:
+            return
+        self.free(ticket)
+
+    def free(self, ticket: Ticket):
+        """
+        free the slot of the given admitted ticket - only once
+        """
+        kind = ticket.kind
+        with self.condition:
+            if ticket.released:
+                return
+            ticket.released = True
+            self.running[kind] -= 1
+            self.running_by_client[kind][ticket.client_id] -= 1
+            if self.running_by_client[kind][ticket.client_id] <= 0:
+                del self.running_by_client[kind][ticket.client_id]
+            self.condition.notify_all()
+
+    @contextlib.contextmanager
+    def slot(
+        self,
+        kind: str,
+        client_id: str = None,
+        on_wait: Callable[[int], None] = None,
+    ):
+        """
+        run the enclosed block in a slot of the given kind
+        """
+        ticket = self.acquire(kind, client_id, on_wait)
+        try:
+            yield ticket
+        finally:
+            self.release(kind, ticket)
+
+    def analysis(self, client_id: str = None, on_wait: Callable[[int], None] = None):
+        """
+        run the enclosed analysis in an analysis slot of the given client
+        """
+        return self.slot("analysis", client_id, on_wait)
+
+    def query(self):
+        """
+        run the enclosed SPARQL query in a query slot of the current client
+        """
+        return self.slot("query")
+
+    @contextlib.contextmanager
+    def client(self, client_id: str):
+        """
+        attribute the slots taken in the enclosed block to the given client -
+        work handed to other threads needs to set its client again
+        """
+        token = self.current_client.set(client_id)
+        try:
+            yield
+        finally:
+            self.current_client.reset(token)
+
+    def metrics(self) -> List[dict]:
+        """
+        get the queue depth, running slots and wait time metrics per kind
+        """
+        lod = []
+        with self.condition:
+            for kind in self.kinds:
+                waits = sorted(self.waits[kind])
+                waiting = [ticket for ticket in self.waiting if ticket.kind == kind]
+                record = {
+                    "kind": kind,
+                    "limit": self.limits[kind],
+                    "running": self.running[kind],
+                    "queue depth": len(waiting),
+                    "queued clients": len({ticket.client_id for ticket in waiting}),
+                    "oldest wait s": round(
+                        max((ticket.wait for ticket in waiting), default=0.0), 2
+                    ),
+                    "admitted": self.admitted[kind],
+                    "wait p50 s": self.percentile(waits, 50),
+                    "wait p95 s": self.percentile(waits, 95),
+                    "wait max s": round(waits[-1], 3) if waits else None,
+                }
+                lod.append(record)
+        return lod
+
+    @staticmethod
+    def percentile(sorted_values: List[float], percent: float) -> Optional[float]:
+        if not sorted_values:
+            return None
+        index = min(
+            len(sorted_values) - 1, int(round(percent / 100 * (len(sorted_values) - 1)))
+        )
+        return round(sorted_values[index], 3)
@@ -0,0 +1,143 @@
+"""
+Created on 2026-10-19
+
+@author: wf
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class TTLCache:
+    """
+    thread safe least recently used cache with a time to live
+    shared by all client sessions of the server process
+    """
+
+    def __init__(self, name: str, max_size: int = 1000, ttl: float = 3600.0):
+        """
+        constructor
+
+        Args:
+            name(str): the name of the cache
+            max_size(int): the maximum number of entries
+            ttl(float): the time to live of an entry in seconds
+        """
+        self.name = name
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries: OrderedDict = OrderedDict()
+        self.lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, key: Hashable, default=None) -> Any:
+        """
+        get the value for the given key
+
+        Args:
+            key: the key
+            default: the value to return if the key is missing or expired
+
+        Returns:
+            the cached value or the default
+        """
+        with self.lock:
+            entry = self.entries.get(key, None)
+            if entry is not None:
+                expires, value = entry
+                if expires >= time.monotonic():
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self.entries[key]
+            self.misses += 1
+            return default
+
+    def put(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """
+        put the given value into the cache
+
+        Args:
+            key: the key
+            value: the value
+            ttl(float): an optional time to live overriding the default
+        """
+        ttl = self.ttl if ttl is None else ttl
+        with self.lock:
+            self.entries[key] = (time.monotonic() + ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self.lock:
+            entry = self.entries.get(key, None)
+            contained = entry is not None and entry[0] >= time.monotonic()
+            return contained
+
+    def expires_in(self, key: Hashable) -> float:
+        """
+        get the remaining time to live of the given key
+
+        Returns:
+            float: the seconds until the entry expires - 0 if it is missing
+        """
+        with self.lock:
+            entry = self.entries.get(key, None)
+            remaining = 0.0
+            if entry is not None:
+                remaining = max(entry[0] - time.monotonic(), 0.0)
+            return remaining
+
+    def get_or_compute(
+        self, key: Hashable, compute: Callable[[], Any], ttl: Optional[float] = None
+    ) -> Any:
+        """
+        get the value for the given key computing and caching it if missing
+
+        Args:
+            key: the key
+            compute(Callable): function to compute the value - a None result is not cached
+            ttl(float): an optional time to live of a computed value
+
+        Returns:
+            the cached or computed value
+        """
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            if value is not None:
+                self.put(key, value, ttl=ttl)
+        return value
+
+    def invalidate(self, key: Hashable = None):
+        """
+        invalidate the given key or all entries if no key is given
+        """
+        with self.lock:
+            if key is None:
+                self.entries.clear()
+            else:
+                self.entries.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        get the statistics of this cache
+        """
+        total = self.hits + self.misses
+        stats = {
+            "name": self.name,
+            "size": len(self.entries),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit%": round(self.hits / total * 100, 1) if total else None,
+        }
+        return stats
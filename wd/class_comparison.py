@@ -0,0 +1,242 @@
+"""
+Created on 2026-10-19
+
+@author: wf
+"""
+
+import re
+from typing import Dict, List, Optional
+
+from lodstorage.prefixes import Prefixes
+from lodstorage.query import Endpoint
+
+from wd.pareto import Pareto
+from wd.property_store import PropertyStore
+from wd.sparql_results import SparqlResultReader
+
+
+class ClassComparison:
+    """
+    side by side property frequencies of several classes
+
+    the counts and the property usages of all classes are fetched with
+    grouped queries - one VALUES list per chunk of classes - so the number of
+    endpoint queries grows with the number of chunks not the number of classes.
+    Property labels and types come from the shared property metadata
+    """
+
+    direct_prefix = "http://www.wikidata.org/prop/direct/"
+    entity_prefix = "http://www.wikidata.org/entity/"
+    # the QIDs end up in the SPARQL queries - nothing else is allowed
+    qid_pattern = re.compile(r"^Q\d+$")
+    max_classes = 50
+
+    def __init__(
+        self,
+        endpoint: Endpoint,
+        qids: List[str],
+        search_predicate: str = "wdt:P31",
+        lang: str = "en",
+        chunk_size: int = 10,
+    ):
+        """
+        constructor
+
+        Args:
+            endpoint(Endpoint): the endpoint to query
+            qids(list): the classes to compare e.g. ["Q5","Q215627"]
+            search_predicate(str): the predicate to select the instances
+            lang(str): the language of the labels
+            chunk_size(int): the maximum number of classes per grouped query
+        """
+        self.endpoint = endpoint
+        self.qids = qids
+        self.search_predicate = search_predicate
+        self.lang = lang
+        self.chunk_size = chunk_size
+        self.counts: Dict[str, int] = {}
+        self.labels: Dict[str, str] = {}
+        # property id -> class qid -> count
+        self.usages: Dict[str, Dict[str, int]] = {}
+        self.query_count = 0
+
+    @staticmethod
+    def parse_qids(qids_text: str) -> List[str]:
+        """
+        parse a comma separated list of QIDs
+
+        Args:
+            qids_text(str): e.g. "Q5,Q215627"
+
+        Returns:
+            list: the distinct QIDs in the given order
+
+        Raises:
+            ValueError: if a QID is invalid or there are more than max_classes
+        """
+        qids = []
+        for qid in qids_text.split(","):
+            qid = qid.strip()
+            if qid and qid not in qids:
+                ClassComparison.check_qid(qid)
+                qids.append(qid)
+        if len(qids) > ClassComparison.max_classes:
+            raise ValueError(
+                f"{len(qids)} classes given - "
+                f"at most {ClassComparison.max_classes} can be compared"
+            )
+        return qids
+
+    @classmethod
+    def check_qid(cls, qid: str):
+        """
+        check that the given QID is a plain Wikidata item id
+
+        Raises:
+            ValueError: if the QID is invalid
+        """
+        if not cls.qid_pattern.fullmatch(qid):
+            raise ValueError(f"invalid QID {qid!r} - expected e.g. Q5")
+
+    def chunks(self) -> List[List[str]]:
+        chunks = [
+            self.qids[i : i + self.chunk_size]
+            for i in range(0, len(self.qids), self.chunk_size)
+        ]
+        return chunks
+
+    def values_clause(self, qids: List[str]) -> str:
+        for qid in qids:
+            self.check_qid(qid)
+        values = " ".join(f"wd:{qid}" for qid in qids)
+        clause = f"VALUES ?class {{ {values} }}"
+        return clause
+
+    def count_query(self, qids: List[str]) -> str:
+        """
+        get the grouped query for the instance counts and labels of the given classes
+        """
+        query = f"""# Count all items of the classes {",".join(qids)}
+{Prefixes.getPrefixes()}
+SELECT ?class ?classLabel (COUNT(DISTINCT ?item) AS ?count)
+WHERE
+{{
+  {self.values_clause(qids)}
+  ?item {self.search_predicate} ?class.
+  OPTIONAL {{
+    ?class rdfs:label ?classLabel.
+    FILTER(LANG(?classLabel) = "{self.lang}")
+  }}
+}}
+GROUP BY ?class ?classLabel"""
+        return query
+
+    def properties_query(self, qids: List[str]) -> str:
+        """
+        get the grouped query for the property usages of the given classes
+        """
+        if self.endpoint.database == "qlever":
+            has_predicate = "?item ql:has-predicate ?p."
+        else:
+            has_predicate = "?item ?p ?value."
+        query = f"""# get the used properties for the classes {",".join(qids)}
+{Prefixes.getPrefixes()}
+SELECT ?class ?p (COUNT(DISTINCT ?item) AS ?count)
+WHERE
+{{
+  {self.values_clause(qids)}
+  ?item {self.search_predicate} ?class.
+  {has_predicate}
+  FILTER(STRSTARTS(STR(?p), "{self.direct_prefix}"))
+}}
+GROUP BY ?class ?p"""
+        return query
+
+    def run_query(self, query: str) -> Dict[str, list]:
+        reader = SparqlResultReader(self.endpoint)
+        columns = reader.query_as_columns(query)
+        self.query_count += 1
+        return columns
+
+    def fetch(self):
+        """
+        fetch the counts and property usages of all classes
+        """
+        for qids in self.chunks():
+            columns = self.run_query(self.count_query(qids))
+            for class_url, label, count in zip(
+                columns.get("class", []),
+                columns.get("classLabel", []),
+                columns.get("count", []),
+            ):
+                qid = class_url.replace(self.entity_prefix, "")
+                self.counts[qid] = int(count)
+                self.labels[qid] = label or qid
+            columns = self.run_query(self.properties_query(qids))
+            for class_url, p_url, count in zip(
+                columns.get("class", []),
+                columns.get("p", []),
+                columns.get("count", []),
+            ):
+                qid = class_url.replace(self.entity_prefix, "")
+                pid = p_url.replace(self.direct_prefix, "")
+                self.usages.setdefault(pid, {})[qid] = int(count)
+
+    @staticmethod
+    def get_pareto_level(ratio: float, pareto_levels: Dict[int, Pareto]) -> int:
+        level = 0
+        for pareto in reversed(pareto_levels.values()):
+            if pareto.ratioInLevel(ratio):
+                level = pareto.level
+        return level
+
+    def merged_lod(
+        self,
+        pareto_levels: Dict[int, Pareto],
+        min_frequency: float = 0.0,
+        property_store: Optional[PropertyStore] = None,
+    ) -> List[dict]:
+        """
+        get the merged property table with frequency and Pareto columns per class
+
+        Args:
+            pareto_levels(dict): the pareto levels by level
+            min_frequency(float): the minimum frequency in percent a property
+                needs to have for at least one of the classes
+            property_store(PropertyStore): the shared property metadata
+
+        Returns:
+            list: one row per property ordered by the maximum frequency
+        """
+        property_store = property_store or PropertyStore.get_instance()
+        rows = []
+        for pid, class_counts in self.usages.items():
+            ratios = {}
+            for qid in self.qids:
+                total = self.counts.get(qid, 0)
+                count = class_counts.get(qid, 0)
+                ratios[qid] = count / total if total else 0.0
+            max_ratio = max(ratios.values(), default=0.0)
+            if max_ratio * 100 < min_frequency:
+                continue
+            rows.append((max_ratio, pid, ratios))
+        rows.sort(key=lambda row: (-row[0], int(row[1][1:])))
+        properties = property_store.get_properties_by_ids(
+            [pid for _ratio, pid, _ratios in rows], lang=self.lang
+        )
+        lod = []
+        for i, (_max_ratio, pid, ratios) in enumerate(rows):
+            prop = properties.get(pid, None)
+            record = {
+                "#": i + 1,
+                "property": prop.plabel if prop else pid,
+                "propertyId": pid,
+                "type": prop.type_name if prop else "",
+            }
+            for qid in self.qids:
+                ratio = ratios[qid]
+                record[f"{qid} count"] = self.usages[pid].get(qid, 0)
+                record[f"{qid} %"] = round(ratio * 100, 1)
+                record[f"{qid} pareto"] = self.get_pareto_level(ratio, pareto_levels)
+            lod.append(record)
+        return lod
@@ -0,0 +1,163 @@
+"""
+Created on 2026-10-19
+
+@author: wf
+"""
+
+from ngwidgets.lod_grid import GridConfig, ListOfDictsGrid
+from ngwidgets.widgets import Link
+from nicegui import ui
+
+from wd.admission import AdmissionController
+from wd.class_comparison import ClassComparison
+from wd.query_view import QueryView
+
+
+class ClassComparisonDisplay:
+    """
+    Displays a side by side comparison of the property
+    frequencies of several Wikidata classes
+    """
+
+    def __init__(self, solution, qids_text: str):
+        """
+        constructor
+
+        Args:
+            solution: the client specific solution
+            qids_text(str): comma separated list of the classes to compare
+        """
+        self.solution = solution
+        self.config = solution.tt_config
+        self.qids_text = qids_text
+        self.search_predicate = "wdt:P31"
+        self.comparison = None
+        self.setup()
+
+    def setup(self):
+        """
+        set up the user interface
+        """
+        with ui.element("div").classes("w-full") as self.main_container:
+            with ui.splitter() as splitter:
+                with splitter.before:
+                    with ui.row():
+                        ui.input(
+                            "items", value=self.qids_text, on_change=self.update_display
+                        ).bind_value(self, "qids_text")
+                        self.solution.add_select(
+                            "predicate",
+                            {
+                                "wdt:P31": "instance of (P31)",
+                                "wdt:P31/wdt:P279*": "instance/subclass of (P31/P279*)",
+                                "wdt:P279": "subclass of (P279)",
+                            },
+                            with_input=True,
+                            value=self.search_predicate,
+                            on_change=self.update_display,
+                        ).bind_value(self, "search_predicate")
+                        self.min_property_frequency_input = ui.input(
+                            "min%",
+                            value=str(self.config.min_property_frequency),
+                        ).on("keydown.enter", self.on_min_property_frequency_change)
+                    self.item_view = ui.html()
+                with splitter.after as self.query_display_container:
+                    self.count_query_view = QueryView(
+                        self.solution,
+                        name="count Query",
+                        sparql_endpoint=self.config.sparql_endpoint,
+                    )
+                    self.property_query_view = QueryView(
+                        self.solution,
+                        name="property Query",
+                        sparql_endpoint=self.config.sparql_endpoint,
+                    )
+            with ui.row().classes("w-full"):
+                self.property_grid = ListOfDictsGrid(config=GridConfig())
+        # immediately do an async call of update view
+        ui.timer(0, self.update_display, once=True)
+
+    async def on_min_property_frequency_change(self, _event):
+        """
+        handle a change in the minimum property frequency input
+        """
+        try:
+            self.config.min_property_frequency = float(
+                self.min_property_frequency_input.value
+            )
+            self.show_grid()
+        except Exception as ex:
+            self.solution.handle_exception(ex)
+
+    async def update_display(self):
+        """
+        update the display
+        """
+        admission = AdmissionController.get_instance()
+        await admission.run_admitted(
+            "analysis",
+            self.do_update_display,
+            client_id=self.solution.client.id,
+            on_wait=self.on_admission_wait,
+        )
+
+    def on_admission_wait(self, position: int):
+        with self.main_container:
+            ui.notify(f"waiting for a free analysis slot - queue position {position}")
+
+    def do_update_display(self):
+        """
+        fetch the counts and property usages of all classes and show them
+        """
+        try:
+            qids = ClassComparison.parse_qids(self.qids_text)
+            if not qids:
+                return
+            self.comparison = ClassComparison(
+                endpoint=self.config.sparql_endpoint,
+                qids=qids,
+                search_predicate=self.search_predicate,
+                lang=self.config.lang,
+            )
+            with self.main_container:
+                ui.notify(f"comparing {len(qids)} classes ...")
+                first_chunk = self.comparison.chunks()[0]
+                self.count_query_view.show_query(
+                    self.comparison.count_query(first_chunk)
+                )
+                self.property_query_view.show_query(
+                    self.comparison.properties_query(first_chunk)
+                )
+            self.comparison.fetch()
+            with self.main_container:
+                self.show_grid()
+        except Exception as ex:
+            self.solution.handle_exception(ex)
+
+    def show_grid(self):
+        """
+        show the merged property grid
+        """
+        if self.comparison is None:
+            return
+        comparison = self.comparison
+        items = []
+        for qid in comparison.qids:
+            label = comparison.labels.get(qid, qid)
+            count = comparison.counts.get(qid, "❓")
+            link = Link.create(f"/tt/{qid}", f"{label} ({qid})")
+            items.append(f"{link}: {count} instances")
+        queries = f"{comparison.query_count} endpoint queries"
+        self.item_view.content = "<br>".join(items + [queries])
+        lod = comparison.merged_lod(
+            self.config.pareto_levels,
+            min_frequency=self.config.min_property_frequency,
+        )
+        for record in lod:
+            pid = record["propertyId"]
+            record["property"] = Link.create(
+                f"https://www.wikidata.org/wiki/Property:{pid}", record["property"]
+            )
+        self.property_grid.load_lod(lod)
+        self.property_grid.update()
+        ui.notify(f"{len(lod)} properties for {len(comparison.qids)} classes")
@@ -0,0 +1,389 @@
+"""
+Created on 2026-10-19
+
+@author: wf
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from lodstorage.query import Endpoint
+
+from wd.item_cache import ItemCache
+from wd.property_store import PropertyStore
+from wd.sparql_results import SparqlResultReader
+from wd.sparql_templates import SparqlTemplates
+
+
+@dataclass
+class ClassProfile:
+    """
+    the stored result of a truly tabular analysis: the instance count,
+    the property counts of the property table and the exact statistics rows
+
+    the lang is the language of the analysis the instances need a label in
+    """
+
+    qid: str
+    predicate: str
+    endpoint_name: str
+    lang: str
+    min_property_frequency: float
+    item_count: int
+    timestamp: float = field(default_factory=time.time)
+    # the number of instances using each property by property id
+    counts: Dict[str, int] = field(default_factory=dict)
+    # the statistics rows by property id
+    stats: Dict[str, dict] = field(default_factory=dict)
+
+    @property
+    def key(self) -> tuple:
+        key = (self.qid, self.predicate, self.endpoint_name, self.lang)
+        return key
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    @staticmethod
+    def is_exact(stats_row: dict) -> bool:
+        """
+        check whether the given statistics row is exact - sketch estimates and
+        rows of a sampled class slice are flagged as approximate
+        """
+        exact = not stats_row.get("approximate", False)
+        return exact
+
+    @classmethod
+    def from_dict(cls, record: dict) -> "ClassProfile":
+        profile = cls(**record)
+        return profile
+
+    @classmethod
+    def from_selection(
+        cls,
+        qid: str,
+        predicate: str,
+        endpoint_name: str,
+        lang: str,
+        item_count: int,
+        property_selection,
+        stats: Dict[str, dict],
+    ) -> "ClassProfile":
+        """
+        create a profile from the property selection of an analysis
+
+        Args:
+            qid(str): the class e.g. Q5
+            predicate(str): the predicate to select the instances e.g. wdt:P31
+            endpoint_name(str): the name of the endpoint
+            lang(str): the language the instances need a label in - the lang
+                of the TrulyTabular of the analysis
+            item_count(int): the number of instances
+            property_selection(PropertySelection): the prepared property selection
+            stats(dict): the statistics rows by property id - only the
+                exact rows are kept
+
+        Returns:
+            ClassProfile: the profile
+        """
+        # the count column of the rows is the count aggregate checkbox
+        counts = {
+            row["propertyId"]: property_selection.usage_count(row["propertyId"])
+            for row in property_selection.propertyList
+        }
+        profile = cls(
+            qid=qid,
+            predicate=predicate,
+            endpoint_name=endpoint_name,
+            lang=lang,
+            min_property_frequency=property_selection.minFrequency,
+            item_count=item_count,
+            counts=counts,
+            stats={
+                pid: dict(row) for pid, row in stats.items() if cls.is_exact(row)
+            },
+        )
+        return profile
+
+
+@dataclass
+class RefreshReport:
+    """
+    the comparison of the current property counts with a stored profile
+    """
+
+    qid: str
+    item_count_before: int
+    item_count_after: int
+    # properties whose statistics are reused
+    unchanged: List[str] = field(default_factory=list)
+    # properties whose count changed beyond the tolerance
+    changed: List[str] = field(default_factory=list)
+    # properties that newly crossed the min% threshold
+    added: List[str] = field(default_factory=list)
+    # properties that are below the min% threshold now
+    dropped: List[str] = field(default_factory=list)
+    # the count and property table queries
+    cheap_queries: int = 2
+
+    @property
+    def recompute(self) -> List[str]:
+        recompute = self.changed + self.added
+        return recompute
+
+    @property
+    def queries_sent(self) -> int:
+        queries = self.cheap_queries + len(self.recompute)
+        return queries
+
+    @property
+    def queries_full(self) -> int:
+        """
+        the number of queries of a full analysis run
+        """
+        queries = self.cheap_queries + len(self.unchanged) + len(self.recompute)
+        return queries
+
+    @property
+    def queries_saved(self) -> int:
+        saved = self.queries_full - self.queries_sent
+        return saved
+
+    def asText(self) -> str:
+        text = (
+            f"{self.qid}: {self.item_count_before}→{self.item_count_after} "
+            f"instances - {len(self.changed)} changed, {len(self.added)} added, "
+            f"{len(self.dropped)} dropped, {len(self.unchanged)} unchanged "
+            "properties - "
+            f"{self.queries_sent} of {self.queries_full} queries sent, "
+            f"{self.queries_saved} saved"
+        )
+        return text
+
+
+class ClassProfileStore:
+    """
+    stores the class profiles as json files - one per class, predicate,
+    endpoint and language
+    """
+
+    _instance: Optional["ClassProfileStore"] = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, profile_dir: str = None):
+        """
+        constructor
+
+        Args:
+            profile_dir(str): the directory to store the profiles in
+        """
+        if profile_dir is None:
+            profile_dir = os.path.join(Path.home(), ".wdgrid", "profiles")
+        self.profile_dir = profile_dir
+
+    @classmethod
+    def get_instance(cls) -> "ClassProfileStore":
+        """
+        get the process wide class profile store
+        """
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = ClassProfileStore()
+        return cls._instance
+
+    def get_path(self, qid: str, predicate: str, endpoint_name: str, lang: str) -> str:
+        """
+        get the path of the stored profile for the given analysis
+        """
+        predicate_name = re.sub(r"\W+", "_", predicate).strip("_")
+        filename = f"{endpoint_name}_{qid}_{predicate_name}_{lang}.json"
+        path = os.path.join(self.profile_dir, filename)
+        return path
+
+    def save(self, profile: ClassProfile) -> str:
+        """
+        store the given profile
+
+        Returns:
+            str: the path of the stored profile
+        """
+        os.makedirs(self.profile_dir, exist_ok=True)
+        path = self.get_path(*profile.key)
+        with open(path, "w") as json_file:
+            json.dump(profile.to_dict(), json_file, indent=2, default=str)
+        return path
+
+    def load(
+        self, qid: str, predicate: str, endpoint_name: str, lang: str
+    ) -> Optional[ClassProfile]:
+        """
+        load the stored profile for the given analysis
+
+        Returns:
+            ClassProfile: the profile or None if none has been stored
+        """
+        path = self.get_path(qid, predicate, endpoint_name, lang)
+        if not os.path.isfile(path):
+            return None
+        with open(path) as json_file:
+            profile = ClassProfile.from_dict(json.load(json_file))
+        return profile
+
+
+class ProfileRefresh:
+    """
+    incremental refresh of a stored class profile
+
+    only the cheap count and property table queries are run again - the
+    expensive statistics are recomputed for the properties whose count
+    changed by more than the tolerance or that newly crossed the min%
+    threshold and reused for all others
+    """
+
+    def __init__(self, profile: ClassProfile, tolerance: float = 0.02):
+        """
+        constructor
+
+        Args:
+            profile(ClassProfile): the stored profile
+            tolerance(float): the relative count change up to which the
+                statistics are reused
+        """
+        self.profile = profile
+        self.tolerance = tolerance
+
+    def compare(
+        self, item_count: int, property_counts: Dict[str, int]
+    ) -> RefreshReport:
+        """
+        compare the current counts with the stored profile
+
+        Args:
+            item_count(int): the current number of instances
+            property_counts(dict): the current number of instances using each property
+
+        Returns:
+            RefreshReport: the properties to reuse, recompute and drop
+        """
+        profile = self.profile
+        report = RefreshReport(profile.qid, profile.item_count, item_count)
+        min_frequency = profile.min_property_frequency
+        selected = set()
+        for pid, count in property_counts.items():
+            if not item_count or count / item_count * 100 < min_frequency:
+                continue
+            selected.add(pid)
+            old_count = profile.counts.get(pid, None)
+            if pid not in profile.stats or old_count is None:
+                report.added.append(pid)
+            elif abs(count - old_count) > self.tolerance * max(old_count, 1):
+                report.changed.append(pid)
+            else:
+                report.unchanged.append(pid)
+        report.dropped = [pid for pid in profile.stats if pid not in selected]
+        return report
+
+    @staticmethod
+    def rescale(stats_row: dict, item_count: int) -> dict:
+        """
+        get a copy of the given statistics row with the percentage of
+        the total relative to the given instance count
+        """
+        stats_row = dict(stats_row)
+        total = stats_row.get("total", None)
+        if isinstance(total, (int, float)) and item_count:
+            stats_row["total%"] = float(f"{total/item_count*100:.1f}")
+        return stats_row
+
+    def apply(
+        self,
+        report: RefreshReport,
+        property_counts: Dict[str, int],
+        recomputed: Dict[str, dict],
+    ) -> ClassProfile:
+        """
+        get the refreshed profile
+
+        Args:
+            report(RefreshReport): the comparison with the stored profile
+            property_counts(dict): the current number of instances using each property
+            recomputed(dict): the recomputed statistics rows by property id
+
+        Returns:
+            ClassProfile: the refreshed profile
+        """
+        profile = self.profile
+        item_count = report.item_count_after
+        stats = {
+            pid: self.rescale(profile.stats[pid], item_count)
+            for pid in report.unchanged
+        }
+        stats.update(recomputed)
+        refreshed = ClassProfile(
+            qid=profile.qid,
+            predicate=profile.predicate,
+            endpoint_name=profile.endpoint_name,
+            lang=profile.lang,
+            min_property_frequency=profile.min_property_frequency,
+            item_count=item_count,
+            counts=dict(property_counts),
+            stats=stats,
+        )
+        return refreshed
+
+    def refresh(self, endpoint: Endpoint) -> Tuple[ClassProfile, RefreshReport]:
+        """
+        refresh the profile against the given endpoint and put the fresh
+        counts, property table and statistics into the shared item cache
+
+        Args:
+            endpoint(Endpoint): the endpoint to query
+
+        Returns:
+            tuple: the refreshed profile and the report
+        """
+        profile = self.profile
+        qid, predicate, name, lang = profile.key
+        item_cache = ItemCache.get_instance()
+        tt = item_cache.get_truly_tabular(
+            itemQid=qid, search_predicate=predicate, endpointConf=endpoint, lang=lang
+        )
+        item_cache.counts.invalidate((qid, predicate, name))
+        item_count, _query = item_cache.count(tt, name)
+        if tt.error:
+            raise Exception(f"count query of {qid} failed: {tt.error}")
+        min_count = round(item_count * profile.min_property_frequency / 100.0)
+        templates = SparqlTemplates.get_instance()
+        mfp_query = templates.most_frequent_properties_query(tt, minCount=min_count)
+        property_lod = SparqlResultReader(endpoint).query_as_lod(mfp_query.query)
+        table_key = (qid, predicate, name, lang)
+        item_cache.property_tables.invalidate(table_key)
+        item_cache.put_property_table(table_key, min_count, property_lod)
+        property_counts = {
+            str(record["prop"]).rsplit("/", 1)[-1]: int(record["count"])
+            for record in property_lod
+        }
+        report = self.compare(item_count, property_counts)
+        properties = PropertyStore.get_instance().get_properties_by_ids(
+            report.recompute
+        )
+        recomputed = {}
+        for pid in report.recompute:
+            wd_property = properties.get(pid, None)
+            if wd_property is not None:
+                recomputed[pid] = templates.property_statistic(
+                    tt, wd_property, item_count
+                )
+        refreshed = self.apply(report, property_counts, recomputed)
+        for pid, stats_row in refreshed.stats.items():
+            # estimates of profiles saved before must not pose as exact statistics
+            if ClassProfile.is_exact(stats_row):
+                key = item_cache.stats_key(tt, name, pid)
+                item_cache.stats.put(key, dict(stats_row))
+        return refreshed, report
@@ -0,0 +1,434 @@
+"""
+Created on 2026-10-19
+
+@author: wf
+"""
+
+import math
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+from ez_wikidata.wdproperty import WikidataProperty
+from lodstorage.query import Endpoint
+
+from wd.cooccurrence import InstanceSet
+from wd.cost_model import QueryCostModel
+from wd.sparql_results import SparqlResultReader
+from wd.sparql_templates import SparqlTemplates
+
+
+class ClassSlice:
+    """
+    the truthy (item, property, value) triples of the instances of a class
+    for a set of properties materialized in a local columnar store
+
+    the triples are fetched once in pages ordered by item and kept as three
+    numpy columns:
+    the numeric item id, the index of the property and the code of the value
+    in a value dictionary - the non tabular statistics and a preview of
+    the aggregate query are then computed locally with vectorized group bys
+
+    to bound memory the instances are sampled by a fixed digit suffix of
+    their id if more than max_triples triples are expected - the
+    frequencies are scaled back up by the sampling ratio - if the slice
+    still reaches max_triples it is truncated and only the properties
+    fetched completely before are used for statistics
+    """
+
+    def __init__(
+        self,
+        endpoint: Endpoint,
+        qid: str,
+        search_predicate: str,
+        lang: str = "en",
+        page_size: int = 100000,
+        max_triples: int = 2000000,
+        rewrite: Optional[Callable[[str], str]] = None,
+    ):
+        """
+        constructor
+
+        Args:
+            endpoint(Endpoint): the endpoint to query
+            qid(str): the class e.g. Q5
+            search_predicate(str): the predicate to select the instances e.g. wdt:P31
+            lang(str): the language the instances need a label in
+            page_size(int): the number of triples to fetch per query
+            max_triples(int): the maximum number of triples to keep
+            rewrite(Callable): optional rewriting of the queries e.g. with a subclass closure
+        """
+        self.endpoint = endpoint
+        self.qid = qid
+        self.search_predicate = search_predicate
+        self.lang = lang
+        self.page_size = page_size
+        self.max_triples = max_triples
+        self.rewrite = rewrite
+        self.sample_digits: Optional[int] = None
+        self.scale = 1
+        self.property_ids: List[str] = []
+        self.property_index: Dict[str, int] = {}
+        # the properties whose triples have been fetched completely
+        self.complete: Set[str] = set()
+        self.values: list = []
+        self.value_codes: Dict[object, int] = {}
+        self.chunks: List[Tuple[np.ndarray, np.ndarray, np.ndarray]] = []
+        self.columns: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None
+        self.frequencies: Optional[Dict[str, Tuple[np.ndarray, np.ndarray]]] = None
+        self.truncated = False
+        self.queries = 0
+
+    @property
+    def is_sampled(self) -> bool:
+        return bool(self.sample_digits)
+
+    def __len__(self) -> int:
+        return sum(len(items) for items, _props, _codes in self.chunks)
+
+    def has_properties(self, property_ids: List[str]) -> bool:
+        """
+        check whether the triples of all given properties have been fetched
+        completely - the properties of a truncated fetch are incomplete
+        """
+        has = all(pid in self.complete for pid in property_ids)
+        return has
+
+    def set_sampling(self, expected_triples: int):
+        """
+        choose the sampling for the given number of expected triples - the
+        sampling is fixed with the first fetch to keep all properties consistent
+        """
+        if self.sample_digits is None:
+            self.sample_digits = 0
+            if expected_triples > self.max_triples:
+                ratio = expected_triples / self.max_triples
+                self.sample_digits = math.ceil(math.log10(ratio))
+            self.scale = 10**self.sample_digits
+
+    def triple_query(self, property_ids: List[str], start: Optional[str] = None) -> str:
+        """
+        get the query for a page of the triples of the given properties - the
+        pages are keyed by item so that no page skips over the previous ones
+
+        Args:
+            property_ids(list): the properties e.g. ["P569","P570"]
+            start(str): the iri of the first item of the page - default: the first item
+        """
+        sample_filter = ""
+        if self.is_sampled:
+            suffix = "0" * self.sample_digits
+            sample_filter = f'\n  FILTER(STRENDS(STR(?item), "{suffix}"))'
+        start_filter = ""
+        if start is not None:
+            comparison = SparqlTemplates.item_comparison(
+                "?item", ">=", start, self.endpoint.database
+            )
+            start_filter = f"\n  FILTER({comparison})"
+        values = " ".join(f"wdt:{pid}" for pid in property_ids)
+        query = f"""# truthy triples of the instances of {self.qid}
+PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+PREFIX wd: <http://www.wikidata.org/entity/>
+PREFIX wdt: <http://www.wikidata.org/prop/direct/>
+SELECT ?item ?p ?value WHERE {{
+  VALUES ?p {{ {values} }}
+  ?item {self.search_predicate} wd:{self.qid}.{sample_filter}{start_filter}
+  ?item rdfs:label ?itemLabel.
+  FILTER (LANG(?itemLabel) = "{self.lang}").
+  ?item ?p ?value.
+}}
+ORDER BY ?item
+LIMIT {self.page_size}"""
+        if self.rewrite:
+            query = self.rewrite(query)
+        return query
+
+    def value_code(self, value) -> int:
+        code = self.value_codes.get(value, None)
+        if code is None:
+            code = len(self.values)
+            self.values.append(value)
+            self.value_codes[value] = code
+        return code
+
+    def add_page(self, columns: Dict[str, list]):
+        """
+        add a page of triples in the columnar form of SparqlResultReader
+        """
+        items = []
+        props = []
+        codes = []
+        for item, prop, value in zip(
+            columns.get("item", []), columns.get("p", []), columns.get("value", [])
+        ):
+            number = InstanceSet.qid_number(item)
+            index = self.property_index.get(prop.rsplit("/", 1)[-1], None)
+            if number is None or index is None:
+                continue
+            items.append(number)
+            props.append(index)
+            codes.append(self.value_code(value))
+        if items:
+            self.chunks.append(
+                (
+                    np.array(items, dtype=np.uint32),
+                    np.array(props, dtype=np.uint16),
+                    np.array(codes, dtype=np.uint32),
+                )
+            )
+            self.columns = None
+            self.frequencies = None
+
+    def fetch(
+        self,
+        property_ids: List[str],
+        expected_triples: int = 0,
+        on_page: Callable[[int], None] = None,
+    ) -> int:
+        """
+        fetch the triples of those of the given properties that are not
+        materialized yet page by page
+
+        Args:
+            property_ids(list): the properties
+            expected_triples(int): the estimated number of triples of all properties
+            on_page(Callable): optional callback with the number of triples fetched so far
+
+        Returns:
+            int: the number of triples fetched
+        """
+        missing = [pid for pid in property_ids if pid not in self.property_index]
+        if not missing or self.truncated:
+            return 0
+        self.set_sampling(expected_triples)
+        for pid in missing:
+            self.property_index[pid] = len(self.property_ids)
+            self.property_ids.append(pid)
+        fetched = 0
+        start = None
+        while True:
+            columns = self.fetch_page(missing, start, expected_triples)
+            self.queries += 1
+            items = columns.get("item", [])
+            page_size = len(items)
+            if page_size < self.page_size:
+                self.add_page(columns)
+                fetched += page_size
+                if on_page:
+                    on_page(fetched)
+                self.complete.update(missing)
+                break
+            # the triples of the last item may continue on the next page
+            start = items[-1]
+            cut = page_size
+            while cut > 0 and items[cut - 1] == start:
+                cut -= 1
+            if cut == 0:
+                # a single item fills the whole page
+                cut = page_size
+                self.truncated = True
+            self.add_page({col: values[:cut] for col, values in columns.items()})
+            fetched += cut
+            if on_page:
+                on_page(fetched)
+            if self.truncated or len(self) >= self.max_triples:
+                self.truncated = True
+                break
+        return fetched
+
+    def fetch_page(
+        self, property_ids: List[str], start: Optional[str], expected_triples: int
+    ) -> Dict[str, list]:
+        """
+        fetch a page of the triples of the given properties starting
+        with the given item
+
+        Returns:
+            dict: the item, p and value columns of the page
+        """
+        reader = SparqlResultReader(self.endpoint)
+        cost_model = QueryCostModel.get_instance()
+        # each ordered page may sort all expected triples
+        with cost_model.measure(self.endpoint.name, "triples", expected_triples):
+            columns = reader.query_as_columns(self.triple_query(property_ids, start))
+        return columns
+
+    def get_columns(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        get the item, property and value code columns
+        """
+        if self.columns is None:
+            if self.chunks:
+                self.columns = tuple(
+                    np.concatenate([chunk[i] for chunk in self.chunks])
+                    for i in range(3)
+                )
+                # keep a single chunk
+                self.chunks = [self.columns]
+            else:
+                empty = np.zeros(0, dtype=np.uint32)
+                self.columns = (empty, empty.astype(np.uint16), empty)
+        return self.columns
+
+    def get_frequencies(self) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+        """
+        get the frequencies of the number of values per item for all properties
+
+        Returns:
+            dict: by property id the value counts and how many items have that count
+        """
+        if self.frequencies is None:
+            items, props, _codes = self.get_columns()
+            # number of values per (property, item)
+            keys = (props.astype(np.uint64) << np.uint64(32)) | items
+            unique_keys, value_counts = np.unique(keys, return_counts=True)
+            key_props = (unique_keys >> np.uint64(32)).astype(np.uint64)
+            # number of items per (property, value count)
+            pairs = (key_props << np.uint64(32)) | value_counts.astype(np.uint64)
+            unique_pairs, item_counts = np.unique(pairs, return_counts=True)
+            pair_props = unique_pairs >> np.uint64(32)
+            pair_counts = unique_pairs & np.uint64(0xFFFFFFFF)
+            self.frequencies = {}
+            for index, pid in enumerate(self.property_ids):
+                mask = pair_props == index
+                self.frequencies[pid] = (
+                    pair_counts[mask].astype(np.int64),
+                    item_counts[mask].astype(np.int64) * self.scale,
+                )
+        return self.frequencies
+
+    @staticmethod
+    def add_stats_col_with_percent(row: dict, col: str, value, total):
+        """
+        add a statistics column and its percentage - see TrulyTabular.addStatsColWithPercent
+        """
+        row[col] = value
+        if total is not None and total > 0:
+            row[f"{col}%"] = float(f"{value/total*100:.1f}")
+        else:
+            row[f"{col}%"] = None
+
+    def stats_row(self, wdProperty: WikidataProperty, item_count: int) -> dict:
+        """
+        get the statistics row of the given property computed from the local triples
+
+        Args:
+            wdProperty(WikidataProperty): the property
+            item_count(int): the instance count of the class
+
+        Returns:
+            dict: the statistics row as TrulyTabular.genWdPropertyStatistic
+            without the queries - flagged as approximate if the slice is sampled
+        """
+        value_counts, frequencies = self.get_frequencies()[wdProperty.pid]
+        row = {"property": wdProperty.plabel}
+        single = frequencies[value_counts == 1]
+        if len(single):
+            row["1"] = int(single[0])
+        total = int(frequencies.sum())
+        nttotal = int(frequencies[value_counts > 1].sum())
+        row["maxf"] = int(value_counts.max()) if len(value_counts) else 0
+        self.add_stats_col_with_percent(row, "total", total, item_count)
+        self.add_stats_col_with_percent(row, "non tabular", nttotal, total)
+        if self.is_sampled:
+            row["approximate"] = True
+        return row
+
+    @staticmethod
+    def display_value(value) -> str:
+        text = str(value)
+        if text.startswith("http://www.wikidata.org/entity/"):
+            text = text.rsplit("/", 1)[-1]
+        return text
+
+    @staticmethod
+    def aggregate(aggregate: str, values: list, separator: str):
+        """
+        compute the given SPARQL aggregate of the given values locally
+        """
+        if aggregate == "count":
+            return len(set(values))
+        if aggregate == "list":
+            distinct = dict.fromkeys(ClassSlice.display_value(v) for v in values)
+            return separator.join(distinct)
+        if aggregate == "sample":
+            return ClassSlice.display_value(values[0])
+        if aggregate == "avg":
+            numbers = [v for v in values if isinstance(v, (int, float))]
+            return sum(numbers) / len(numbers) if numbers else None
+        try:
+            value = min(values) if aggregate == "min" else max(values)
+        except TypeError:
+            texts = [str(v) for v in values]
+            value = min(texts) if aggregate == "min" else max(texts)
+        return ClassSlice.display_value(value)
+
+    def aggregate_preview(
+        self,
+        genMap: Dict[str, list],
+        properties: Dict[str, WikidataProperty],
+        separator: str = "|",
+        limit: int = 20,
+    ) -> List[dict]:
+        """
+        compute the first rows of the aggregate query for the given generation
+        map from the local triples
+
+        Args:
+            genMap(dict): the aggregates/ignores/labels by property id
+            properties(dict): the properties by id for the variable names
+            separator(str): the list separator
+            limit(int): the maximum number of rows
+
+        Returns:
+            list: the preview rows of the items having at least one of the
+            materialized properties - labels are shown as ids since they
+            are not materialized
+        """
+        items, props, codes = self.get_columns()
+        if not len(items):
+            return []
+        order = np.lexsort((props, items))
+        items, props, codes = items[order], props[order], codes[order]
+        bounds = np.flatnonzero(np.diff(items)) + 1
+        starts = np.concatenate(([0], bounds))
+        ends = np.concatenate((bounds, [len(items)]))
+        pids = [pid for pid in genMap if pid in self.property_index]
+        lod = []
+        for start, end in zip(starts, ends):
+            by_property: Dict[str, list] = {}
+            for index, code in zip(props[start:end], codes[start:end]):
+                pid = self.property_ids[index]
+                by_property.setdefault(pid, []).append(self.values[code])
+            # HAVING COUNT(?value)<=1 for the ignored properties
+            if any(
+                "ignore" in genMap[pid] and len(by_property.get(pid, [])) > 1
+                for pid in pids
+            ):
+                continue
+            record = {"item": f"Q{items[start]}"}
+            for pid in pids:
+                wd_property = properties.get(pid, None)
+                var = wd_property.valueVarname if wd_property else pid
+                values = by_property.get(pid, [])
+                for aggregate in genMap[pid]:
+                    if aggregate in ["ignore", "label"]:
+                        record[var] = (
+                            self.display_value(values[0]) if values else None
+                        )
+                    else:
+                        record[f"{var}_{aggregate}"] = (
+                            self.aggregate(aggregate, values, separator)
+                            if values
+                            else None
+                        )
+            lod.append(record)
+            if len(lod) >= limit:
+                break
+        return lod
+
+    def memory_bytes(self) -> int:
+        """
+        get the memory used by the columns - the value dictionary is not included
+        """
+        nbytes = sum(column.nbytes for chunk in self.chunks for column in chunk)
+        return nbytes
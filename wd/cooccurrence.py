@@ -0,0 +1,288 @@
+"""
+Created on 2026-10-19
+
+@author: wf
+"""
+
+import math
+from typing import Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+from lodstorage.query import Endpoint
+
+from wd.sparql_results import SparqlResultReader
+
+try:
+    # optional compressed bitmaps - pip install wdgrid[bitmaps]
+    from pyroaring import BitMap
+except ImportError:  # pragma: no cover
+    BitMap = None
+
+
+class InstanceSet:
+    """
+    compressed set of the numeric ids of the instances using a property
+
+    a roaring bitmap is used if the optional pyroaring dependency of the
+    bitmaps extra is installed - otherwise a sorted numpy array of 32 bit
+    ids. Both backends give the same results and can be mixed, the numpy
+    array just needs up to 4 bytes per instance where dense bitmaps need
+    far less
+    """
+
+    roaring_available = BitMap is not None
+
+    def __init__(self, ids: Iterable[int], use_roaring: bool = True):
+        """
+        constructor
+
+        Args:
+            ids(Iterable): the numeric instance ids e.g. 5 for Q5
+            use_roaring(bool): if False use the numpy array even if pyroaring is available
+        """
+        if use_roaring and BitMap is not None:
+            self.bitmap = BitMap(ids)
+            self.array = None
+        else:
+            self.bitmap = None
+            self.array = np.unique(np.fromiter(ids, dtype=np.uint32))
+
+    @property
+    def backend(self) -> str:
+        backend = "roaring" if self.bitmap is not None else "numpy"
+        return backend
+
+    @staticmethod
+    def qid_number(url: str) -> Optional[int]:
+        """
+        get the numeric id of the given Wikidata entity url or id
+
+        Args:
+            url(str): e.g. http://www.wikidata.org/entity/Q5 or Q5
+
+        Returns:
+            int: the number e.g. 5 or None if this is not an item id
+        """
+        if not url:
+            return None
+        local_name = url.rsplit("/", 1)[-1]
+        if not local_name.startswith("Q") or not local_name[1:].isdigit():
+            return None
+        return int(local_name[1:])
+
+    def __len__(self) -> int:
+        if self.bitmap is not None:
+            return len(self.bitmap)
+        return len(self.array)
+
+    def intersection_size(self, other: "InstanceSet") -> int:
+        """
+        get the number of instances in both this and the other set
+        """
+        if self.bitmap is not None and other.bitmap is not None:
+            return self.bitmap.intersection_cardinality(other.bitmap)
+        size = len(
+            np.intersect1d(self.as_array(), other.as_array(), assume_unique=True)
+        )
+        return size
+
+    def as_array(self) -> np.ndarray:
+        if self.bitmap is not None:
+            return np.array(self.bitmap.to_array(), dtype=np.uint32)
+        return self.array
+
+    @property
+    def nbytes(self) -> int:
+        """
+        get the size of the compressed representation in bytes
+        """
+        if self.bitmap is not None:
+            return len(self.bitmap.serialize())
+        return self.array.nbytes
+
+
+class CooccurrenceAnalysis:
+    """
+    pairwise co-occurrence of properties on the instances of a class
+
+    the ids of the instances using each property are fetched in pages and
+    kept as compressed sets - the co-occurrence matrix is then computed
+    locally from the intersections
+
+    to bound memory for classes with millions of instances only instances
+    whose id ends with a fixed digit suffix are fetched - a consistent sample
+    for all properties so that intersections can be scaled back up
+    """
+
+    def __init__(
+        self,
+        endpoint: Endpoint,
+        qid: str,
+        search_predicate: str,
+        item_count: int,
+        page_size: int = 100000,
+        max_instances: int = 1000000,
+        rewrite: Optional[Callable[[str], str]] = None,
+    ):
+        """
+        constructor
+
+        Args:
+            endpoint(Endpoint): the endpoint to query
+            qid(str): the class e.g. Q5
+            search_predicate(str): the predicate to select the instances e.g. wdt:P31
+            item_count(int): the number of instances of the class
+            page_size(int): the number of instance ids to fetch per query
+            max_instances(int): the maximum number of instance ids to keep per property
+            rewrite(Callable): optional rewriting of the queries e.g. with a subclass closure
+        """
+        self.endpoint = endpoint
+        self.qid = qid
+        self.search_predicate = search_predicate
+        self.item_count = item_count
+        self.page_size = page_size
+        self.max_instances = max_instances
+        self.rewrite = rewrite
+        self.sample_digits = 0
+        if item_count and item_count > max_instances:
+            self.sample_digits = math.ceil(math.log10(item_count / max_instances))
+        self.scale = 10**self.sample_digits
+        self.sets: Dict[str, InstanceSet] = {}
+
+    @property
+    def is_sampled(self) -> bool:
+        return self.sample_digits > 0
+
+    def instance_query(self, property_id: str, offset: int) -> str:
+        """
+        get the query for a page of instances using the given property
+
+        Args:
+            property_id(str): the property e.g. P569
+            offset(int): the offset of the page
+        """
+        sample_filter = ""
+        if self.is_sampled:
+            suffix = "0" * self.sample_digits
+            sample_filter = f'\n  FILTER(STRENDS(STR(?item), "{suffix}"))'
+        query = f"""# instances of {self.qid} using {property_id}
+PREFIX wd: <http://www.wikidata.org/entity/>
+PREFIX wdt: <http://www.wikidata.org/prop/direct/>
+SELECT DISTINCT ?item WHERE {{
+  ?item {self.search_predicate} wd:{self.qid}.
+  FILTER EXISTS {{ ?item wdt:{property_id} ?value. }}{sample_filter}
+}}
+ORDER BY ?item
+LIMIT {self.page_size}
+OFFSET {offset}"""
+        if self.rewrite:
+            query = self.rewrite(query)
+        return query
+
+    def fetch_instances(self, property_id: str) -> InstanceSet:
+        """
+        fetch the ids of the instances using the given property page by page
+        """
+        reader = SparqlResultReader(self.endpoint)
+        ids = []
+        offset = 0
+        while True:
+            columns = reader.query_as_columns(
+                self.instance_query(property_id, offset)
+            )
+            page = columns.get("item", [])
+            for url in page:
+                number = InstanceSet.qid_number(url)
+                if number is not None:
+                    ids.append(number)
+            if len(page) < self.page_size or len(ids) >= self.max_instances:
+                break
+            offset += self.page_size
+        instance_set = InstanceSet(ids[: self.max_instances])
+        return instance_set
+
+    def add_property(self, property_id: str) -> InstanceSet:
+        """
+        get the instance set of the given property fetching it if needed
+        """
+        instance_set = self.sets.get(property_id, None)
+        if instance_set is None:
+            instance_set = self.fetch_instances(property_id)
+            self.sets[property_id] = instance_set
+        return instance_set
+
+    def matrix(self, property_ids: List[str]) -> List[List[int]]:
+        """
+        get the (estimated) number of instances using both properties
+        for each pair of the given properties
+
+        Args:
+            property_ids(list): the properties - their sets need to be added
+
+        Returns:
+            list: the symmetric matrix of co-occurrence counts
+        """
+        sets = [self.sets[pid] for pid in property_ids]
+        size = len(sets)
+        counts = [[0] * size for _ in range(size)]
+        for i in range(size):
+            counts[i][i] = len(sets[i]) * self.scale
+            for j in range(i + 1, size):
+                count = sets[i].intersection_size(sets[j]) * self.scale
+                counts[i][j] = count
+                counts[j][i] = count
+        return counts
+
+    def joint_coverage(self, property_ids: List[str]) -> List[List[float]]:
+        """
+        get the ratio of instances using both properties for each pair
+        of the given properties
+        """
+        total = self.item_count or 1
+        coverage = [
+            [min(count / total, 1.0) for count in row]
+            for row in self.matrix(property_ids)
+        ]
+        return coverage
+
+    def heatmap_lod(
+        self, property_ids: List[str], labels: Dict[str, str] = None
+    ) -> List[dict]:
+        """
+        get the joint coverage of the given properties in percent
+        as a list of dicts with one row and one column per property
+
+        Args:
+            property_ids(list): the properties
+            labels(dict): optional labels by property id
+
+        Returns:
+            list: the heatmap rows
+        """
+        labels = labels or {}
+        lod = []
+        for pid, row in zip(property_ids, self.joint_coverage(property_ids)):
+            record = {"propertyId": pid, "property": labels.get(pid, pid)}
+            for other_pid, ratio in zip(property_ids, row):
+                record[other_pid] = round(ratio * 100, 1)
+            lod.append(record)
+        return lod
+
+    def memory_bytes(self) -> int:
+        """
+        get the memory used by the compressed instance sets
+        """
+        nbytes = sum(instance_set.nbytes for instance_set in self.sets.values())
+        return nbytes
+
+    @staticmethod
+    def heatmap_cell_style() -> str:
+        """
+        get the javascript cell style coloring a percentage cell
+        """
+        js = (
+            "params => typeof params.value === 'number' ? "
+            "{backgroundColor: `hsl(210, 80%, ${100 - params.value * 0.55}%)`, "
+            "color: params.value > 60 ? 'white' : 'black'} : null"
+        )
+        return js
@@ -0,0 +1,365 @@
+"""
+Created on 2026-10-19
+
+@author: wf
+"""
+
+import collections
+import contextlib
+import math
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+@dataclass
+class Observation:
+    """
+    a measured query with the runtime predicted before sending it
+    """
+
+    work: Optional[int]
+    predicted: float
+    actual: Optional[float] = None
+    timed_out: bool = False
+
+
+@dataclass
+class QueryPlan:
+    """
+    the execution strategy chosen for a query before sending it
+
+    strategies - all of them compute the exact statistics:
+        direct: the query is sent as is
+        paginated: the query is sent once per id range of the instances and
+            the results are added up
+        batched: the triples are materialized in several batches of properties
+        materialized: the triples are materialized in one batch
+    """
+
+    shape: str
+    strategy: str
+    # predicted seconds of the chosen strategy and of the direct query
+    predicted: float
+    direct: float
+    work: Optional[int] = None
+    property_batches: List[List[str]] = field(default_factory=list)
+    reason: str = ""
+
+    def asText(self) -> str:
+        text = f"{self.strategy} {self.shape} query: predicted {self.predicted:.1f} s"
+        if self.strategy != "direct":
+            text += f" instead of {self.direct:.1f} s direct"
+        if len(self.property_batches) > 1:
+            text += f" in {len(self.property_batches)} batches"
+        if self.reason:
+            text += f" - {self.reason}"
+        return text
+
+
+class QueryCostModel:
+    """
+    predicts the runtime of the count, property table, statistics and triple
+    queries from the cached instance and property counts and the latencies
+    measured per endpoint and query shape
+
+    the runtime of a shape is modeled as overhead + rate * work with work
+    being the number of instances or triples the query has to touch - the
+    parameters are fitted to the recent observations by least squares and
+    start from priors for endpoints without history. Every prediction is
+    kept together with the measured runtime to report the accuracy
+    """
+
+    _instance: Optional["QueryCostModel"] = None
+    _instance_lock = threading.Lock()
+    # seconds per instance or triple for endpoints without history
+    prior_rates = {
+        "count": 2e-6,
+        "property table": 2e-5,
+        "stats": 4e-6,
+        "triples": 3e-6,
+    }
+    prior_overhead = 0.5
+    strategies = ["direct", "paginated", "batched", "sampled", "materialized"]
+
+    def __init__(
+        self,
+        timeout: float = 60.0,
+        safety: float = 0.5,
+        keep: int = 200,
+        min_observations: int = 3,
+    ):
+        """
+        constructor
+
+        Args:
+            timeout(float): the query timeout of the endpoints in seconds
+            safety(float): the fraction of the timeout a query may be predicted to take
+            keep(int): the number of recent observations to keep per endpoint and shape
+            min_observations(int): the number of observations needed to fit the model
+        """
+        self.timeout = timeout
+        self.safety = safety
+        self.min_observations = min_observations
+        self.lock = threading.RLock()
+        self.observations: Dict[Tuple[str, str], Deque[Observation]] = (
+            collections.defaultdict(lambda: collections.deque(maxlen=keep))
+        )
+        self.fits: Dict[Tuple[str, str], Tuple[float, float]] = {}
+        self.decisions = collections.Counter()
+
+    @classmethod
+    def get_instance(cls) -> "QueryCostModel":
+        """
+        get the process wide query cost model
+        """
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = QueryCostModel()
+        return cls._instance
+
+    @property
+    def budget(self) -> float:
+        """
+        the number of seconds a single query may be predicted to take
+        """
+        return self.timeout * self.safety
+
+    def fit(self, endpoint_name: str, shape: str) -> Tuple[float, float]:
+        """
+        get the overhead and rate of the given endpoint and query shape
+
+        Returns:
+            tuple: overhead in seconds and rate in seconds per unit of work
+        """
+        key = (endpoint_name, shape)
+        with self.lock:
+            fitted = self.fits.get(key)
+            if fitted is not None:
+                return fitted
+            observed = [
+                (obs.work, obs.actual)
+                for obs in self.observations.get(key, [])
+                if obs.work is not None and obs.actual is not None
+            ]
+            fitted = (self.prior_overhead, self.prior_rates.get(shape, 1e-5))
+            if len(observed) >= self.min_observations:
+                works = np.array([work for work, _ in observed], dtype=np.float64)
+                seconds = np.array([actual for _, actual in observed])
+                rate = -1.0
+                if np.ptp(works) > 0:
+                    rate, overhead = np.polyfit(works, seconds, 1)
+                if rate < 0:
+                    # no usable trend - attribute the median runtime to the work
+                    overhead = min(float(np.min(seconds)), self.prior_overhead)
+                    rate = float(
+                        np.median(np.maximum(seconds - overhead, 0) / (works + 1))
+                    )
+                fitted = (max(float(overhead), 0.0), float(rate))
+            self.fits[key] = fitted
+        return fitted
+
+    def predict(self, endpoint_name: str, shape: str, work: Optional[int]) -> float:
+        """
+        predict the runtime of a query
+
+        Args:
+            endpoint_name(str): the name of the endpoint
+            shape(str): count, property table, stats or triples
+            work(int): the number of instances or triples to touch - None if unknown
+
+        Returns:
+            float: the predicted runtime in seconds
+        """
+        if work is None:
+            with self.lock:
+                actuals = [
+                    obs.actual
+                    for obs in self.observations.get((endpoint_name, shape), [])
+                    if obs.actual is not None
+                ]
+            if actuals:
+                return float(np.median(actuals))
+            return self.prior_overhead
+        overhead, rate = self.fit(endpoint_name, shape)
+        predicted = overhead + rate * work
+        return predicted
+
+    def record(self, endpoint_name: str, shape: str, observation: Observation):
+        """
+        record the measured runtime of a query
+        """
+        with self.lock:
+            self.observations[(endpoint_name, shape)].append(observation)
+            self.fits.pop((endpoint_name, shape), None)
+
+    @contextlib.contextmanager
+    def measure(self, endpoint_name: str, shape: str, work: Optional[int] = None):
+        """
+        predict and measure the runtime of the query sent in the enclosed block
+
+        Args:
+            endpoint_name(str): the name of the endpoint
+            shape(str): count, property table, stats or triples
+            work(int): the number of instances or triples to touch - None if unknown
+
+        Yields:
+            Observation: the observation to be completed with the runtime
+        """
+        observation = Observation(work, self.predict(endpoint_name, shape, work))
+        start = time.monotonic()
+        try:
+            yield observation
+        except Exception as ex:
+            # only timeouts tell something about the runtime
+            if "timeout" in str(ex).lower():
+                observation.timed_out = True
+                observation.actual = max(time.monotonic() - start, self.timeout)
+                self.record(endpoint_name, shape, observation)
+            raise
+        observation.actual = time.monotonic() - start
+        self.record(endpoint_name, shape, observation)
+
+    def check(self, endpoint_name: str, shape: str, work: Optional[int]) -> QueryPlan:
+        """
+        plan a query for which only the direct strategy is available
+
+        Returns:
+            QueryPlan: the plan with the reason set if the query is likely to time out
+        """
+        predicted = self.predict(endpoint_name, shape, work)
+        plan = QueryPlan(shape, "direct", predicted, predicted, work=work)
+        if predicted > self.budget:
+            plan.reason = f"might exceed the {self.timeout:.0f} s timeout"
+        self.decisions[plan.strategy] += 1
+        return plan
+
+    @staticmethod
+    def split_batches(property_counts: Dict[str, int], batches: int) -> List[List[str]]:
+        """
+        split the given properties in the given number of batches with
+        about equal numbers of triples - largest first into the smallest batch
+        """
+        batches = max(1, min(batches, len(property_counts)))
+        groups = [[] for _ in range(batches)]
+        totals = [0] * batches
+        for pid, count in sorted(property_counts.items(), key=lambda kv: -kv[1]):
+            index = totals.index(min(totals))
+            groups[index].append(pid)
+            totals[index] += count
+        return [group for group in groups if group]
+
+    def plan_statistics(
+        self,
+        endpoint_name: str,
+        item_count: Optional[int],
+        property_counts: Dict[str, int],
+        max_triples: int,
+        shards: int = 9,
+    ) -> QueryPlan:
+        """
+        choose the strategy to compute the non tabular statistics of the properties
+        - estimates are never chosen, if even the paginated queries might time
+        out the reason of the plan says so
+
+        Args:
+            endpoint_name(str): the name of the endpoint
+            item_count(int): the number of instances of the class
+            property_counts(dict): the number of instances using each property
+            max_triples(int): the maximum number of triples to materialize
+            shards(int): the number of id ranges of a paginated query
+
+        Returns:
+            QueryPlan: the plan
+        """
+        property_ids = list(property_counts)
+        direct = max(
+            (
+                self.predict(endpoint_name, "stats", (item_count or 0) + count)
+                for count in property_counts.values()
+            ),
+            default=0.0,
+        )
+        triples = sum(property_counts.values())
+        # the ordered pages of the triple query scan all triples of the batch
+        scan = self.predict(endpoint_name, "triples", triples)
+        plan = QueryPlan("stats", "direct", direct, direct, work=triples)
+        if item_count is None or direct <= self.budget:
+            plan.property_batches = [property_ids]
+        elif triples > max_triples:
+            # every query of a paginated statistic groups the instances of one id range
+            plan.strategy = "paginated"
+            plan.predicted = max(
+                self.predict(
+                    endpoint_name, "stats", math.ceil((item_count + count) / shards)
+                )
+                for count in property_counts.values()
+            )
+            plan.reason = f"{triples} triples exceed {max_triples}"
+            if plan.predicted > self.budget:
+                plan.reason += (
+                    " - might still time out, approximate statistics would "
+                    "estimate the frequencies"
+                )
+        elif scan <= self.budget:
+            plan.strategy = "materialized"
+            plan.predicted = scan
+            plan.property_batches = [property_ids]
+        else:
+            plan.strategy = "batched"
+            batches = math.ceil(scan / self.budget)
+            while True:
+                plan.property_batches = self.split_batches(property_counts, batches)
+                plan.predicted = max(
+                    self.predict(
+                        endpoint_name,
+                        "triples",
+                        sum(property_counts[pid] for pid in batch),
+                    )
+                    for batch in plan.property_batches
+                )
+                # the overhead per query might need more batches
+                if plan.predicted <= self.budget or batches >= len(property_ids):
+                    break
+                batches += 1
+        self.decisions[plan.strategy] += 1
+        return plan
+
+    def accuracy(self) -> List[dict]:
+        """
+        get the accuracy of the predictions per endpoint and query shape
+        """
+        lod = []
+        with self.lock:
+            items = sorted(self.observations.items())
+            for (endpoint_name, shape), observations in items:
+                measured = [obs for obs in observations if obs.actual is not None]
+                if not measured:
+                    continue
+                predicted = np.array([max(obs.predicted, 1e-3) for obs in measured])
+                actual = np.array([max(obs.actual, 1e-3) for obs in measured])
+                ratio = actual / predicted
+                error = np.abs(actual - predicted) / actual
+                overhead, rate = self.fit(endpoint_name, shape)
+                record = {
+                    "#": len(lod) + 1,
+                    "endpoint": endpoint_name,
+                    "shape": shape,
+                    "queries": len(measured),
+                    "median error %": round(float(np.median(error)) * 100, 1),
+                    "within 2x %": round(
+                        float(np.mean((ratio >= 0.5) & (ratio <= 2))) * 100, 1
+                    ),
+                    "underestimated %": round(float(np.mean(ratio > 1)) * 100, 1),
+                    "timeouts": sum(obs.timed_out for obs in measured),
+                    "predicted timeouts": sum(
+                        obs.predicted > self.timeout for obs in measured
+                    ),
+                    "overhead s": round(overhead, 3),
+                    "s per M": round(rate * 1e6, 3),
+                }
+                lod.append(record)
+        return lod
@@ -0,0 +1,164 @@
+"""
+Created on 2026-10-19
+
+@author: wf
+"""
+
+from typing import Dict, List, Optional, Set
+
+from wd.property_payload import CompactPropertyPayload
+
+
+class GenerationSpecState:
+    """
+    server side state of the query generation specification
+
+    for each property row the selection is held as a bit of a
+    selection bitset and the aggregate and option checkboxes as a
+    compact per row bit mask - both are updated from grid events so
+    that the genMap can be built locally without asking the browser.
+    A set of the selected row indices next to the bitset answers the
+    selection queries without scanning the whole bitset
+    """
+
+    def __init__(
+        self, checkbox_cols: List[str], property_ids: List[str], keys: list
+    ):
+        """
+        constructor
+
+        Args:
+            checkbox_cols(list): the aggregate and option columns - the position defines the bit
+            property_ids(list): the property id of each row
+            keys(list): the row key (grid column "#") of each row
+        """
+        self.packer = CompactPropertyPayload(checkbox_cols)
+        self.property_ids = list(property_ids)
+        self.key_index: Dict[object, int] = {key: i for i, key in enumerate(keys)}
+        self.flags: List[int] = [0] * len(self.property_ids)
+        # bitset of the selected rows - bit i is row i
+        self.selected = 0
+        # the indices of the selected rows
+        self.selected_set: Set[int] = set()
+
+    @classmethod
+    def from_lod(
+        cls, checkbox_cols: List[str], lod: List[dict], key_col: str = "#"
+    ) -> "GenerationSpecState":
+        """
+        create the generation spec state from the given property records
+
+        Args:
+            checkbox_cols(list): the aggregate and option columns
+            lod(list): the property records with boolean checkbox columns
+            key_col(str): the column with the row key
+
+        Returns:
+            GenerationSpecState: the state with the flags of the records
+        """
+        state = cls(
+            checkbox_cols,
+            property_ids=[record["propertyId"] for record in lod],
+            keys=[record[key_col] for record in lod],
+        )
+        for i, record in enumerate(lod):
+            state.flags[i] = state.packer.pack_flags(record)
+        return state
+
+    @property
+    def checkbox_cols(self) -> List[str]:
+        return self.packer.flag_cols
+
+    @property
+    def size(self) -> int:
+        return len(self.property_ids)
+
+    def index_of(self, key) -> Optional[int]:
+        """
+        get the row index for the given row key
+        """
+        index = self.key_index.get(key, None)
+        return index
+
+    def set_flag(self, index: int, col: str, checked: bool):
+        """
+        set the checkbox flag of the given column for the given row
+        """
+        bit = self.packer.bits[col]
+        if checked:
+            self.flags[index] |= bit
+        else:
+            self.flags[index] &= ~bit
+
+    def get_flag(self, index: int, col: str) -> bool:
+        """
+        get the checkbox flag of the given column for the given row
+        """
+        checked = bool(self.flags[index] & self.packer.bits[col])
+        return checked
+
+    def set_selected(self, index: int, selected: bool = True):
+        """
+        set the selection state of the given row
+        """
+        if selected:
+            self.selected |= 1 << index
+            self.selected_set.add(index)
+        else:
+            self.selected &= ~(1 << index)
+            self.selected_set.discard(index)
+
+    def is_selected(self, index: int) -> bool:
+        """
+        check whether the given row is selected
+        """
+        selected = index in self.selected_set
+        return selected
+
+    def select_all(self, selected: bool = True):
+        """
+        select or deselect all rows
+        """
+        self.selected = (1 << self.size) - 1 if selected else 0
+        self.selected_set = set(range(self.size)) if selected else set()
+
+    @property
+    def selected_count(self) -> int:
+        return len(self.selected_set)
+
+    def selected_indices(self) -> List[int]:
+        """
+        get the indices of all selected rows in row order
+        """
+        indices = sorted(self.selected_set)
+        return indices
+
+    def selected_keys(self, keys: list) -> list:
+        """
+        get those of the given row keys whose rows are selected
+
+        Args:
+            keys(list): the row keys e.g. of the rows shown in the grid
+        """
+        selected_keys = [key for key in keys if self.index_of(key) in self.selected_set]
+        return selected_keys
+
+    def selected_property_ids(self) -> List[str]:
+        """
+        get the property ids of all selected rows
+        """
+        property_ids = [self.property_ids[index] for index in self.selected_indices()]
+        return property_ids
+
+    def gen_map(self) -> Dict[str, List[str]]:
+        """
+        get the generation map for the selected properties
+
+        Returns:
+            dict: the list of checked columns by property id
+        """
+        gen_map = {}
+        for index in self.selected_indices():
+            property_id = self.property_ids[index]
+            gen_map[property_id] = self.packer.checked_cols(self.flags[index])
+        return gen_map
@@ -0,0 +1,258 @@
+"""
+Created on 2026-10-19
+
+@author: wf
+"""
+
+import copy
+import datetime
+import threading
+from typing import List, Optional, Tuple
+
+from ez_wikidata.trulytabular import TrulyTabular
+from ez_wikidata.wdproperty import (
+    WikidataProperty,
+    WikidataPropertyManager,
+    with_user_agent,
+)
+from lodstorage.query import Endpoint
+from lodstorage.sparql import SPARQL
+
+from wd.admission import AdmissionController
+from wd.cache import TTLCache
+from wd.cost_model import QueryCostModel
+from wd.sparql_templates import SparqlTemplates
+
+
+class ItemCache:
+    """
+    process wide cache for the item header of the truly tabular analysis
+
+    - the item metadata (label and description) keyed by (qid, lang) in the
+      form of a prototype TrulyTabular with the resolved item
+    - the instance counts keyed by (qid, predicate, endpoint)
+    - the property tables keyed by (qid, predicate, endpoint, lang) together
+      with the min count they have been fetched for
+    - the property statistics keyed by (qid, predicate, endpoint, lang, pid)
+    """
+
+    _instance: Optional["ItemCache"] = None
+    _instance_lock = threading.Lock()
+
+    def __init__(
+        self,
+        item_max_size: int = 2000,
+        item_ttl: float = 24 * 3600,
+        count_max_size: int = 5000,
+        count_ttl: float = 3600,
+        table_max_size: int = 500,
+        stats_max_size: int = 50000,
+    ):
+        """
+        constructor
+
+        Args:
+            item_max_size(int): maximum number of cached items
+            item_ttl(float): time to live of the item metadata in seconds
+            count_max_size(int): maximum number of cached instance counts
+            count_ttl(float): time to live of the instance counts, property tables
+                and statistics in seconds
+            table_max_size(int): maximum number of cached property tables
+            stats_max_size(int): maximum number of cached property statistics
+        """
+        self.items = TTLCache("item metadata", max_size=item_max_size, ttl=item_ttl)
+        self.counts = TTLCache(
+            "instance counts", max_size=count_max_size, ttl=count_ttl
+        )
+        self.property_tables = TTLCache(
+            "property tables", max_size=table_max_size, ttl=count_ttl
+        )
+        self.stats = TTLCache(
+            "property statistics", max_size=stats_max_size, ttl=count_ttl
+        )
+
+    @classmethod
+    def get_instance(cls) -> "ItemCache":
+        """
+        get the process wide item cache
+        """
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = ItemCache()
+        return cls._instance
+
+    def has_item(self, itemQid: str, lang: str = "en") -> bool:
+        """
+        check whether the metadata of the given item is cached
+        """
+        has_item = (itemQid, lang) in self.items
+        return has_item
+
+    def get_truly_tabular(
+        self,
+        itemQid: str,
+        search_predicate: str,
+        endpointConf: Endpoint,
+        propertyIds: List[str] = [],
+        lang: str = "en",
+        debug: bool = False,
+    ) -> TrulyTabular:
+        """
+        get a TrulyTabular for the given item reusing the cached item
+        label and description if available
+
+        Args:
+            itemQid(str): e.g. Q5 human
+            search_predicate(str): e.g. wdt:P31
+            endpointConf(Endpoint): the endpoint to use
+            propertyIds(list): list of property Ids (if any) such as P17 country
+            lang(str): the language of the item label
+            debug(bool): if True switch on debugging
+
+        Returns:
+            TrulyTabular: a TrulyTabular owned by the caller
+        """
+        key = (itemQid, lang)
+        prototype = self.items.get(key)
+        if prototype is None:
+            # the item label and description are queried on construction
+            with AdmissionController.get_instance().query():
+                tt = TrulyTabular(
+                    itemQid=itemQid,
+                    propertyIds=propertyIds,
+                    search_predicate=search_predicate,
+                    endpointConf=endpointConf,
+                    lang=lang,
+                    debug=debug,
+                )
+            if getattr(tt.item, "qlabel", None):
+                self.items.put(key, copy.copy(tt))
+        else:
+            # shallow copy - the resolved item is shared read only
+            tt = copy.copy(prototype)
+            tt.debug = debug
+            tt.endpointConf = endpointConf
+            # as TrulyTabular does - with the rate limit, the authentication
+            # and the user agent of the endpoint
+            tt.sparql = with_user_agent(SPARQL.fromEndpointConf(endpointConf))
+            tt.sparql.debug = debug
+            tt.search_predicate = search_predicate
+            tt.wpm = WikidataPropertyManager.get_instance()
+            tt.properties = tt.wpm.get_properties_by_ids(propertyIds)
+            tt.isodate = datetime.datetime.now().isoformat()
+            tt.error = None
+        return tt
+
+    def count(
+        self, tt: TrulyTabular, endpoint_name: str, ttl: Optional[float] = None
+    ) -> Tuple[int, str]:
+        """
+        get the instance count of the given TrulyTabular
+
+        Args:
+            tt(TrulyTabular): the TrulyTabular to count the instances for
+            endpoint_name(str): the name of the endpoint
+            ttl(float): an optional time to live of a queried count
+
+        Returns:
+            tuple: the count and the count query - errors are not cached
+        """
+        key = (tt.itemQid, tt.search_predicate, endpoint_name)
+        cached = self.counts.get(key)
+        if cached is not None:
+            return cached
+        cost_model = QueryCostModel.get_instance()
+        with cost_model.measure(endpoint_name, "count"):
+            with AdmissionController.get_instance().query():
+                count, query = tt.count()
+        if not tt.error:
+            self.counts.put(key, (count, query), ttl=ttl)
+        return count, query
+
+    def get_property_table(self, key: tuple, min_count: int) -> Optional[List[dict]]:
+        """
+        get a copy of the cached property table for the given key filtered
+        for the given min count
+
+        Args:
+            key(tuple): (qid, predicate, endpoint_name, lang)
+            min_count(int): the minimum number of usages
+
+        Returns:
+            list: the property records or None if no table for a lower or
+            equal min count is cached
+        """
+        cached = self.property_tables.get(key)
+        if cached is None:
+            return None
+        cached_min_count, lod = cached
+        if min_count < cached_min_count:
+            return None
+        property_lod = [
+            dict(record) for record in lod if int(record["count"]) > min_count
+        ]
+        return property_lod
+
+    def put_property_table(
+        self, key: tuple, min_count: int, lod: List[dict], ttl: Optional[float] = None
+    ):
+        """
+        cache the property table fetched for the given min count unless a
+        table for a lower min count is already cached
+        """
+        cached = self.property_tables.get(key)
+        if cached is None or min_count < cached[0]:
+            self.property_tables.put(
+                key, (min_count, [dict(record) for record in lod]), ttl=ttl
+            )
+
+    @staticmethod
+    def stats_key(tt: TrulyTabular, endpoint_name: str, property_id: str) -> tuple:
+        """
+        get the key of the statistics of the given property - the statistics
+        depend on the language the instances need a label in
+        """
+        key = (tt.itemQid, tt.search_predicate, endpoint_name, tt.lang, property_id)
+        return key
+
+    def property_stats(
+        self,
+        tt: TrulyTabular,
+        endpoint_name: str,
+        wdProperty: WikidataProperty,
+        item_count: int,
+        property_count: int = 0,
+        paginated: bool = False,
+        ttl: Optional[float] = None,
+    ) -> Optional[dict]:
+        """
+        get the statistics of the given property for the given TrulyTabular
+
+        Args:
+            tt(TrulyTabular): the TrulyTabular of the item
+            endpoint_name(str): the name of the endpoint
+            wdProperty(WikidataProperty): the property
+            item_count(int): the instance count of the item
+            property_count(int): the number of instances using the property
+            paginated(bool): if True query the exact frequencies per id range
+            ttl(float): an optional time to live of computed statistics
+
+        Returns:
+            dict: the statistics row owned by the caller
+        """
+        key = self.stats_key(tt, endpoint_name, wdProperty.pid)
+        templates = SparqlTemplates.get_instance()
+        cost_model = QueryCostModel.get_instance()
+
+        def compute() -> dict:
+            work = item_count + property_count
+            with cost_model.measure(endpoint_name, "stats", work):
+                stats_row = templates.property_statistic(
+                    tt, wdProperty, item_count, paginated=paginated
+                )
+            return stats_row
+
+        stats_row = self.stats.get_or_compute(key, compute, ttl=ttl)
+        if stats_row is not None:
+            stats_row = dict(stats_row)
+        return stats_row
@@ -0,0 +1,260 @@
+"""
+Created on 2026-10-19
+
+@author: wf
+"""
+
+import os
+import threading
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from lodstorage.query import Endpoint, EndpointManager
+
+from wd.cache import TTLCache
+from wd.sparql_results import SparqlResultReader
+
+
+@dataclass
+class LabelEntry:
+    """
+    the label and description of an entity resolved via a fallback chain
+    """
+
+    qid: str
+    label: Optional[str] = None
+    description: Optional[str] = None
+    # the language the label has been found in
+    lang: Optional[str] = None
+
+    def asText(self) -> str:
+        text = f"{self.label or self.qid} ({self.qid})"
+        if self.description:
+            text += f"☞{self.description}"
+        return text
+
+
+class LabelService:
+    """
+    process wide service resolving the labels and descriptions of items and
+    properties in many languages at once
+
+    the missing (entity, lang) pairs of a request are fetched in chunked
+    VALUES queries for all languages of the fallback chains together and
+    cached per (entity, lang) for all sessions - missing labels are cached
+    as well so a language switch of a property grid needs only a handful
+    of queries and none when switching back. There is one service and
+    cache per endpoint since endpoints may serve different labels
+    """
+
+    _instances: Dict[str, "LabelService"] = {}
+    _instance_lock = threading.Lock()
+    entity_prefix = "http://www.wikidata.org/entity/"
+    # languages to try before the multilingual and the english labels
+    fallbacks = {
+        "als": ["gsw", "de"],
+        "bar": ["de"],
+        "de-at": ["de"],
+        "de-ch": ["de"],
+        "en-ca": ["en"],
+        "en-gb": ["en"],
+        "gsw": ["de"],
+        "lb": ["de", "fr"],
+        "nds": ["de"],
+        "nds-nl": ["nl"],
+        "pt-br": ["pt"],
+        "sr-el": ["sr"],
+        "zh-hans": ["zh"],
+        "zh-hant": ["zh"],
+    }
+
+    def __init__(
+        self,
+        endpoint_name: str = "wikidata-qlever",
+        chunk_size: int = 250,
+        max_size: int = 200000,
+        ttl: float = 24 * 3600,
+    ):
+        """
+        constructor
+
+        Args:
+            endpoint_name(str): the name of the endpoint to query
+            chunk_size(int): the maximum number of entities per query
+            max_size(int): the maximum number of cached (entity, lang) pairs
+            ttl(float): the time to live of the labels in seconds
+        """
+        self.endpoint_name = endpoint_name
+        self.chunk_size = chunk_size
+        self.labels = TTLCache("labels", max_size=max_size, ttl=ttl)
+        self.queries = 0
+
+    @classmethod
+    def get_instance(cls, endpoint_name: str = "wikidata-qlever") -> "LabelService":
+        """
+        get the process wide label service of the given endpoint
+
+        Args:
+            endpoint_name(str): the name of the endpoint to query
+        """
+        with cls._instance_lock:
+            instance = cls._instances.get(endpoint_name, None)
+            if instance is None:
+                instance = LabelService(endpoint_name=endpoint_name)
+                cls._instances[endpoint_name] = instance
+        return instance
+
+    @property
+    def endpoint(self) -> Endpoint:
+        endpoints_path = os.path.join(
+            os.path.dirname(__file__), "resources", "endpoints.yaml"
+        )
+        endpoints = EndpointManager.getEndpoints(
+            endpointPath=endpoints_path, lang="sparql", with_default=False
+        )
+        endpoint = endpoints.get(self.endpoint_name, None)
+        return endpoint
+
+    @classmethod
+    def fallback_chain(cls, lang: str) -> List[str]:
+        """
+        get the languages to look up a label in for the given language
+
+        Args:
+            lang(str): the language e.g. de-ch
+
+        Returns:
+            list: e.g. ["de-ch", "de", "mul", "en"]
+        """
+        chain = [lang]
+        chain.extend(cls.fallbacks.get(lang, []))
+        if "-" in lang:
+            chain.append(lang.split("-")[0])
+        chain.extend(["mul", "en"])
+        # keep the first occurrence
+        chain = list(dict.fromkeys(chain))
+        return chain
+
+    def label_query(self, qids: List[str], langs: List[str]) -> str:
+        """
+        get the query for the labels and descriptions of the given entities
+        in the given languages
+
+        Args:
+            qids(list): the entity ids e.g. ["Q5","P31"]
+            langs(list): the languages e.g. ["de","en"]
+        """
+        values = " ".join(f"wd:{qid}" for qid in qids)
+        lang_list = ", ".join(f'"{lang}"' for lang in langs)
+        query = f"""# labels and descriptions of {len(qids)} entities
+PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+PREFIX schema: <http://schema.org/>
+PREFIX wd: <http://www.wikidata.org/entity/>
+SELECT ?entity ?lang ?label ?description WHERE {{
+  VALUES ?entity {{ {values} }}
+  {{
+    ?entity rdfs:label ?label.
+    BIND(LANG(?label) AS ?lang)
+    FILTER(?lang IN ({lang_list}))
+  }} UNION {{
+    ?entity schema:description ?description.
+    BIND(LANG(?description) AS ?lang)
+    FILTER(?lang IN ({lang_list}))
+  }}
+}}"""
+        return query
+
+    def add_columns(
+        self, columns: Dict[str, list], qids: Iterable[str], langs: Iterable[str]
+    ):
+        """
+        cache the labels of a query result in the columnar form of
+        SparqlResultReader for all requested (entity, lang) pairs
+        """
+        found: Dict[Tuple[str, str], Tuple[Optional[str], Optional[str]]] = {}
+        for entity, lang, label, description in zip(
+            columns.get("entity", []),
+            columns.get("lang", []),
+            columns.get("label", []),
+            columns.get("description", []),
+        ):
+            if not entity or not lang:
+                continue
+            key = (str(entity).replace(self.entity_prefix, ""), str(lang))
+            old_label, old_description = found.get(key, (None, None))
+            found[key] = (
+                old_label or (str(label) if label else None),
+                old_description or (str(description) if description else None),
+            )
+        for qid in qids:
+            for lang in langs:
+                key = (qid, lang)
+                # missing labels are cached as well
+                self.labels.put(key, found.get(key, (None, None)))
+
+    def fetch(self, qids: List[str], langs: List[str]) -> int:
+        """
+        fetch the labels of the given entities in the given languages
+        in chunked queries
+
+        Returns:
+            int: the number of queries sent
+        """
+        reader = SparqlResultReader(self.endpoint)
+        queries = 0
+        for start in range(0, len(qids), self.chunk_size):
+            chunk = qids[start : start + self.chunk_size]
+            columns = reader.query_as_columns(self.label_query(chunk, langs))
+            self.add_columns(columns, chunk, langs)
+            queries += 1
+        self.queries += queries
+        return queries
+
+    def get_entries(self, qids: Iterable[str], lang: str) -> Dict[str, LabelEntry]:
+        """
+        get the labels and descriptions of the given entities in the given
+        language following its fallback chain
+
+        Args:
+            qids(Iterable): the entity ids e.g. ["Q5","P31"]
+            lang(str): the language e.g. de
+
+        Returns:
+            dict: the LabelEntry for each entity
+        """
+        qids = list(dict.fromkeys(qids))
+        chain = self.fallback_chain(lang)
+        missing = [
+            qid
+            for qid in qids
+            if any((qid, chain_lang) not in self.labels for chain_lang in chain)
+        ]
+        if missing:
+            self.fetch(missing, chain)
+        entries = {}
+        for qid in qids:
+            entry = LabelEntry(qid)
+            for chain_lang in chain:
+                label, description = self.labels.get((qid, chain_lang), (None, None))
+                if entry.label is None and label:
+                    entry.label = label
+                    entry.lang = chain_lang
+                if entry.description is None and description:
+                    entry.description = description
+            entries[qid] = entry
+        return entries
+
+    def get_labels(self, qids: Iterable[str], lang: str) -> Dict[str, str]:
+        """
+        get the labels of the given entities - the id if there is no label
+
+        Args:
+            qids(Iterable): the entity ids e.g. ["Q5","P31"]
+            lang(str): the language e.g. de
+
+        Returns:
+            dict: the label for each entity
+        """
+        entries = self.get_entries(qids, lang)
+        labels = {qid: entry.label or qid for qid, entry in entries.items()}
+        return labels
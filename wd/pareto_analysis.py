@@ -0,0 +1,183 @@
+"""
+Created on 2026-10-19
+
+@author: wf
+"""
+
+import bisect
+import math
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+import numpy as np
+
+from wd.pareto import Pareto
+
+
+class ParetoTable:
+    """
+    sorted threshold table of the Pareto levels
+
+    the level of a ratio is the lowest level the ratio is in - the
+    thresholds of the levels decrease with the level so the lookup is a
+    binary search in the ascending thresholds
+    """
+
+    def __init__(self, paretoLevels: Dict[int, Pareto]):
+        """
+        constructor
+
+        Args:
+            paretoLevels: a dict of paretoLevels with the key corresponding to the level
+        """
+        # highest level first - ascending thresholds
+        self.levels = sorted(paretoLevels.values(), key=lambda p: -p.level)
+        self.thresholds = [1 / pareto.oneOutOf for pareto in self.levels]
+
+    def level_of(self, ratio: float) -> int:
+        """
+        get the Pareto level of the given ratio
+
+        Args:
+            ratio(float): the ratio of instances using a property
+
+        Returns:
+            int: the lowest level the ratio is in or 0 if it is in no level
+        """
+        count = bisect.bisect_right(self.thresholds, ratio)
+        level = self.levels[count - 1].level if count > 0 else 0
+        return level
+
+    def levels_of(self, ratios: np.ndarray) -> np.ndarray:
+        """
+        get the Pareto levels of the given ratios at once
+        """
+        counts = np.searchsorted(self.thresholds, ratios, side="right")
+        lookup = np.array([0] + [pareto.level for pareto in self.levels])
+        levels = lookup[counts]
+        return levels
+
+
+@dataclass
+class CoverageRecommendation:
+    """
+    the smallest property set reaching a target statement coverage
+    """
+
+    target: float
+    # the achieved coverage in percent of all statements
+    coverage: float
+    # the properties with more usages are selected - as by the property table query
+    min_count: int
+    # the min% threshold selecting the set
+    min_percent: float
+    property_ids: List[str] = field(default_factory=list)
+    total_properties: int = 0
+
+    def asText(self) -> str:
+        text = (
+            f"{len(self.property_ids)} of {self.total_properties} properties cover "
+            f"{self.coverage:.1f}% of the statements (target {self.target:.1f}%) "
+            f"- min% {self.min_percent}"
+        )
+        return text
+
+
+class CoverageAnalysis:
+    """
+    cumulative statement coverage of the properties of a class
+
+    the properties are sorted by their count descending - the coverage of
+    the first k properties is the share of their counts in the sum of all
+    counts
+    """
+
+    def __init__(self, property_counts: Dict[str, int], item_count: int):
+        """
+        constructor
+
+        Args:
+            property_counts(dict): the number of instances using each property
+            item_count(int): the number of instances of the class
+        """
+        self.item_count = item_count
+        ranked = sorted(property_counts.items(), key=lambda kv: (-kv[1], kv[0]))
+        self.property_ids = [pid for pid, _count in ranked]
+        self.counts = np.array([count for _pid, count in ranked], dtype=np.int64)
+        self.cumulative = np.cumsum(self.counts)
+        self.total = int(self.cumulative[-1]) if len(self.counts) else 0
+
+    @classmethod
+    def from_lod(cls, lod: List[dict], item_count: int) -> "CoverageAnalysis":
+        """
+        create a coverage analysis from property table records
+        with a prop url and a count
+        """
+        property_counts = {
+            str(record["prop"]).rsplit("/", 1)[-1]: int(record["count"])
+            for record in lod
+        }
+        analysis = cls(property_counts, item_count)
+        return analysis
+
+    def coverage(self, k: int) -> float:
+        """
+        get the coverage of the first k properties in percent
+        """
+        if k <= 0 or not self.total:
+            return 0.0
+        k = min(k, len(self.counts))
+        coverage = float(self.cumulative[k - 1]) / self.total * 100
+        return coverage
+
+    def coverage_curve(self) -> List[dict]:
+        """
+        get the cumulative coverage curve
+
+        Returns:
+            list: one record per property in the order of descending counts
+        """
+        lod = []
+        for rank, (pid, count) in enumerate(zip(self.property_ids, self.counts)):
+            record = {
+                "#": rank + 1,
+                "propertyId": pid,
+                "count": int(count),
+                "coverage%": round(self.coverage(rank + 1), 2),
+            }
+            lod.append(record)
+        return lod
+
+    def recommend(self, target: float) -> CoverageRecommendation:
+        """
+        recommend the smallest property set reaching the given coverage
+
+        the set is extended to all properties with the count of its last
+        property so that it can be selected with a min% threshold
+
+        Args:
+            target(float): the target coverage in percent
+
+        Returns:
+            CoverageRecommendation: the recommended property set
+        """
+        n = len(self.counts)
+        if n == 0:
+            return CoverageRecommendation(target, 0.0, 0, 0.0)
+        needed = target / 100 * self.total
+        k = min(int(np.searchsorted(self.cumulative, needed, side="left")) + 1, n)
+        last_count = int(self.counts[k - 1])
+        # ties of the last count - counts are sorted descending
+        k = int(np.searchsorted(-self.counts, -last_count, side="right"))
+        # round down so the rounded percentages of the set still pass
+        percent = last_count / self.item_count * 100 if self.item_count else 0.0
+        min_percent = math.floor(percent * 10) / 10
+        recommendation = CoverageRecommendation(
+            target=target,
+            coverage=self.coverage(k),
+            min_count=last_count - 1,
+            min_percent=min_percent,
+            property_ids=self.property_ids[:k],
+            total_properties=n,
+        )
+        return recommendation
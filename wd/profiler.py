@@ -0,0 +1,242 @@
+"""
+Created on 2026-10-19
+
+@author: wf
+"""
+
+import collections
+import contextlib
+import itertools
+import sys
+import threading
+import time
+from typing import Deque, Dict, List, Optional
+
+
+class Profile:
+    """
+    stack samples and stage timings of one profiled analysis
+    """
+
+    _ids = itertools.count(1)
+
+    def __init__(self, name: str, client_id: str = None):
+        """
+        constructor
+
+        Args:
+            name(str): the name of the analysis e.g. "tt Q5"
+            client_id(str): the client session the analysis runs in
+        """
+        self.id = next(self._ids)
+        self.name = name
+        self.client_id = client_id
+        self.started = time.time()
+        self.ended: Optional[float] = None
+        self.samples: collections.Counter = collections.Counter()
+        self.stage_seconds: Dict[str, float] = collections.defaultdict(float)
+        # stage stacks of the threads working for this profile by thread id
+        self.threads: Dict[int, List[str]] = {}
+
+    @property
+    def active(self) -> bool:
+        return self.ended is None
+
+    def folded(self) -> str:
+        """
+        get the samples in the collapsed stack format of flamegraph.pl
+        and speedscope - one "stage;frame;frame count" line per stack
+        """
+        lines = [f"{stack} {count}" for stack, count in self.samples.most_common()]
+        text = "\n".join(lines) + "\n"
+        return text
+
+    def summary(self) -> dict:
+        """
+        get a summary record of this profile
+        """
+        end = self.ended or time.time()
+        record = {
+            "#": self.id,
+            "name": self.name,
+            "client": self.client_id,
+            "seconds": round(end - self.started, 2),
+            "samples": sum(self.samples.values()),
+            "stages": ", ".join(
+                f"{stage}: {seconds:.2f}s"
+                for stage, seconds in self.stage_seconds.items()
+            ),
+            "active": self.active,
+        }
+        return record
+
+
+class SamplingProfiler:
+    """
+    on demand stack sampling profiler for live analyses
+
+    a profile is only started for the client sessions or the number of
+    next analyses the profiler has been armed for - the sampling thread
+    only runs while a profile is active and instrumented stages of analyses
+    that are not profiled cost a single None check
+    """
+
+    _instance: Optional["SamplingProfiler"] = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, interval: float = 0.005, max_depth: int = 64, keep: int = 20):
+        """
+        constructor
+
+        Args:
+            interval(float): the sampling interval in seconds
+            max_depth(int): the maximum number of frames to keep per stack
+            keep(int): the number of finished profiles to keep for download
+        """
+        self.interval = interval
+        self.max_depth = max_depth
+        self.lock = threading.Lock()
+        self.armed_clients = set()
+        self.armed_analyses = 0
+        self.active: List[Profile] = []
+        self.profiles: Deque[Profile] = collections.deque(maxlen=keep)
+        self.sampler: Optional[threading.Thread] = None
+
+    @classmethod
+    def get_instance(cls) -> "SamplingProfiler":
+        """
+        get the process wide profiler
+        """
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = SamplingProfiler()
+        return cls._instance
+
+    def arm(self, client_id: str = None, analyses: int = 0):
+        """
+        arm the profiler for the given client session and/or the next analyses
+
+        Args:
+            client_id(str): profile all analyses of this client session
+            analyses(int): profile the next n analyses of any session
+        """
+        with self.lock:
+            if client_id:
+                self.armed_clients.add(client_id)
+            self.armed_analyses += analyses
+
+    def disarm(self):
+        with self.lock:
+            self.armed_clients.clear()
+            self.armed_analyses = 0
+
+    @property
+    def is_armed(self) -> bool:
+        armed = bool(self.armed_clients) or self.armed_analyses > 0
+        return armed
+
+    def start_profile(self, name: str, client_id: str = None) -> Optional[Profile]:
+        """
+        start a profile for the given analysis if the profiler is armed for it
+
+        Args:
+            name(str): the name of the analysis
+            client_id(str): the client session of the analysis
+
+        Returns:
+            Profile: the profile or None if the analysis is not to be profiled
+        """
+        if not self.is_armed:
+            return None
+        with self.lock:
+            if client_id in self.armed_clients:
+                pass
+            elif self.armed_analyses > 0:
+                self.armed_analyses -= 1
+            else:
+                return None
+            profile = Profile(name, client_id)
+            self.active.append(profile)
+            self.profiles.append(profile)
+            if self.sampler is None or not self.sampler.is_alive():
+                self.sampler = threading.Thread(
+                    target=self.sample_loop, name="wdgrid-profiler", daemon=True
+                )
+                self.sampler.start()
+        return profile
+
+    def end_profile(self, profile: Optional[Profile]):
+        """
+        end the given profile
+        """
+        if profile is None:
+            return
+        with self.lock:
+            profile.ended = time.time()
+            if profile in self.active:
+                self.active.remove(profile)
+
+    @contextlib.contextmanager
+    def stage(self, profile: Optional[Profile], name: str):
+        """
+        mark the current thread as working on the given stage of the given profile
+
+        Args:
+            profile(Profile): the profile - if None nothing is recorded
+            name(str): the name of the stage
+        """
+        if profile is None:
+            yield
+            return
+        thread_id = threading.get_ident()
+        stages = profile.threads.setdefault(thread_id, [])
+        stages.append(name)
+        label = ";".join(stages)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            profile.stage_seconds[label] += time.perf_counter() - start
+            stages.pop()
+            if not stages:
+                profile.threads.pop(thread_id, None)
+
+    def frame_stack(self, frame) -> List[str]:
+        """
+        get the function names of the given frame and its callers - outermost first
+        """
+        names = []
+        while frame is not None and len(names) < self.max_depth:
+            code = frame.f_code
+            module = frame.f_globals.get("__name__", "?")
+            names.append(f"{module}.{code.co_name}")
+            frame = frame.f_back
+        names.reverse()
+        return names
+
+    def sample(self):
+        """
+        take a stack sample of all threads working for an active profile
+        """
+        frames = sys._current_frames()
+        with self.lock:
+            active = list(self.active)
+        for profile in active:
+            for thread_id, stages in list(profile.threads.items()):
+                frame = frames.get(thread_id, None)
+                if frame is None or not stages:
+                    continue
+                stack = ";".join(stages + self.frame_stack(frame))
+                profile.samples[stack] += 1
+
+    def sample_loop(self):
+        """
+        sample while there are active profiles
+        """
+        while True:
+            with self.lock:
+                if not self.active:
+                    self.sampler = None
+                    return
+            self.sample()
+            time.sleep(self.interval)
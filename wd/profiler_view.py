@@ -0,0 +1,88 @@
+"""
+Created on 2026-10-19
+
+@author: wf
+"""
+
+from ngwidgets.lod_grid import GridConfig, ListOfDictsGrid
+from ngwidgets.widgets import Link
+from nicegui import Client, ui
+
+from wd.profiler import SamplingProfiler
+
+
+class ProfilerView:
+    """
+    admin view to arm the sampling profiler and download its profiles
+    """
+
+    def __init__(self, solution):
+        """
+        constructor
+
+        Args:
+            solution: the client specific solution
+        """
+        self.solution = solution
+        self.profiler = SamplingProfiler.get_instance()
+        self.analyses = 1
+        self.client_id = None
+        self.setup()
+
+    @staticmethod
+    def download_url(profile_id: int) -> str:
+        # the admin cookie authenticates the download - no token in the url
+        url = f"/admin/profiler/{profile_id}.folded"
+        return url
+
+    def setup(self):
+        """
+        set up the user interface
+        """
+        with ui.row():
+            ui.number("next analyses", min=0, format="%d").bind_value(
+                self, "analyses"
+            )
+            ui.select(
+                self.get_client_ids(), label="client session", with_input=True
+            ).bind_value(self, "client_id")
+            ui.button("arm", on_click=self.on_arm)
+            ui.button("disarm", on_click=self.on_disarm)
+            ui.button("refresh", on_click=self.refresh)
+        self.status_label = ui.label()
+        self.profile_grid = ListOfDictsGrid(config=GridConfig())
+        self.refresh()
+
+    def get_client_ids(self) -> list:
+        own_id = self.solution.client.id
+        client_ids = [
+            client_id for client_id in Client.instances.keys() if client_id != own_id
+        ]
+        return client_ids
+
+    def on_arm(self):
+        self.profiler.arm(client_id=self.client_id, analyses=int(self.analyses or 0))
+        self.refresh()
+
+    def on_disarm(self):
+        self.profiler.disarm()
+        self.refresh()
+
+    def refresh(self):
+        """
+        show the armed state and the available profiles
+        """
+        profiler = self.profiler
+        self.status_label.text = (
+            f"armed for {profiler.armed_analyses} analyses and "
+            f"{len(profiler.armed_clients)} sessions - "
+            f"{len(profiler.active)} active profiles"
+        )
+        lod = []
+        for profile in reversed(profiler.profiles):
+            record = profile.summary()
+            url = self.download_url(profile.id)
+            record["flame graph"] = Link.create(url, "download")
+            lod.append(record)
+        self.profile_grid.load_lod(lod)
+        self.profile_grid.update()
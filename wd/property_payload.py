@@ -0,0 +1,154 @@
+"""
+Created on 2026-10-19
+
+@author: wf
+"""
+
+import json
+from typing import Dict, List
+
+
+class CompactPropertyPayload:
+    """
+    compact wire format for the property grid
+
+    instead of sending full html link strings and one boolean per
+    generation spec checkbox column for every row the compact rows carry:
+
+    - the plain property label - the link is rendered client side from the propertyId
+    - a short marker for the ?f/?ex statistic queries - the try it url is
+      only generated on the server when the cell is clicked
+    - a single integer with all checkbox flags packed as bits
+    """
+
+    property_url_template = "https://www.wikidata.org/wiki/Property:"
+    try_it_cols = ["?f", "?ex"]
+    try_it_text = "try it!"
+
+    def __init__(self, flag_cols: List[str], flags_col: str = "flags"):
+        """
+        constructor
+
+        Args:
+            flag_cols(list): the boolean columns to pack - the position in the list defines the bit
+            flags_col(str): the name of the column holding the packed flags
+        """
+        self.flag_cols = list(flag_cols)
+        self.flags_col = flags_col
+        self.bits: Dict[str, int] = {
+            col: 1 << i for i, col in enumerate(self.flag_cols)
+        }
+
+    def pack_flags(self, record: dict) -> int:
+        """
+        pack the boolean flag columns of the given record
+
+        Args:
+            record(dict): the record with boolean flag columns
+
+        Returns:
+            int: the flags as a bit mask
+        """
+        flags = 0
+        for col, bit in self.bits.items():
+            if record.get(col, False):
+                flags |= bit
+        return flags
+
+    def unpack_flags(self, flags: int) -> Dict[str, bool]:
+        """
+        unpack the given bit mask
+
+        Args:
+            flags(int): the bit mask
+
+        Returns:
+            dict: the boolean value for each flag column
+        """
+        flag_dict = {col: bool(flags & bit) for col, bit in self.bits.items()}
+        return flag_dict
+
+    def checked_cols(self, flags: int) -> List[str]:
+        """
+        get the list of columns that are checked in the given bit mask
+        """
+        checked = [col for col, bit in self.bits.items() if flags & bit]
+        return checked
+
+    def compact_row(self, record: dict) -> dict:
+        """
+        convert the given property record to its compact wire form
+
+        Args:
+            record(dict): the property record as prepared by PropertySelection
+
+        Returns:
+            dict: the compact row
+        """
+        row = {}
+        for key, value in record.items():
+            if key in self.bits:
+                continue
+            if key in self.try_it_cols:
+                value = self.try_it_text if value else ""
+            row[key] = value
+        row[self.flags_col] = self.pack_flags(record)
+        return row
+
+    def to_wire(self, lod: List[dict]) -> List[dict]:
+        """
+        convert the given list of property records to compact rows
+        """
+        wire_lod = [self.compact_row(record) for record in lod]
+        return wire_lod
+
+    def property_link_renderer(self) -> str:
+        """
+        get the javascript cell renderer for the property column
+        """
+        js = (
+            "params => params.data && params.data.propertyId ? "
+            f"`<a href='{self.property_url_template}${{params.data.propertyId}}' "
+            "target='_blank'>${params.value}</a>` : params.value"
+        )
+        return js
+
+    def flag_column_def(self, col: str, header_name: str = None) -> dict:
+        """
+        get a virtual column definition for the given flag column
+        which reads and writes its bit of the packed flags on the client
+
+        Args:
+            col(str): the flag column
+            header_name(str): the header to show
+
+        Returns:
+            dict: the ag grid column definition
+        """
+        bit = self.bits[col]
+        flags = f"params.data.{self.flags_col}"
+        col_def = {
+            "field": col,
+            "headerName": header_name or col,
+            "editable": True,
+            "cellRenderer": "agCheckboxCellRenderer",
+            "cellEditor": "agCheckboxCellEditor",
+            ":valueGetter": f"params => ({flags} & {bit}) != 0",
+            ":valueSetter": f"params => {{ {flags} = params.newValue ? ({flags} | {bit}) : ({flags} & ~{bit}); return true; }}",
+        }
+        return col_def
+
+    @staticmethod
+    def payload_size(lod: List[dict]) -> int:
+        """
+        get the size in bytes of the given list of dicts as
+        it would be serialized to the browser
+
+        Args:
+            lod(list): the list of dicts
+
+        Returns:
+            int: the size of the json encoding in bytes
+        """
+        size = len(json.dumps(lod, default=str).encode("utf-8"))
+        return size
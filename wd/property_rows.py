@@ -0,0 +1,185 @@
+"""
+Created on 2026-10-19
+
+@author: wf
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+
+class PropertyRowStore:
+    """
+    server side columnar row model for the property grid
+
+    the rows are kept as one list per column, the browser only
+    gets the window of rows that is visible and sorting and filtering
+    are done here
+    """
+
+    def __init__(self, key_col: str = "#"):
+        """
+        constructor
+
+        Args:
+            key_col(str): the column with the row key
+        """
+        self.key_col = key_col
+        self.columns: Dict[str, list] = {}
+        self.size = 0
+        self.key_index: Dict[object, int] = {}
+        self._view_key = None
+        self._view: List[int] = []
+
+    @classmethod
+    def from_lod(cls, lod: List[dict], key_col: str = "#") -> "PropertyRowStore":
+        """
+        create a row store from the given list of dicts
+
+        Args:
+            lod(list): the list of dicts - the first record defines the columns
+            key_col(str): the column with the row key
+
+        Returns:
+            PropertyRowStore: the columnar store
+        """
+        store = cls(key_col=key_col)
+        store.load_lod(lod)
+        return store
+
+    def load_lod(self, lod: List[dict]):
+        """
+        load the given list of dicts into my columns
+        """
+        self.columns = {}
+        self.size = 0
+        for record in lod:
+            for col in record.keys():
+                if col not in self.columns:
+                    self.columns[col] = [None] * self.size
+            for col, values in self.columns.items():
+                values.append(record.get(col, None))
+            self.size += 1
+        self.key_index = {
+            key: i for i, key in enumerate(self.columns.get(self.key_col, []))
+        }
+        self.invalidate_view()
+
+    def invalidate_view(self):
+        """
+        invalidate the cached sort/filter view
+        """
+        self._view_key = None
+        self._view = []
+
+    def index_of(self, key) -> Optional[int]:
+        """
+        get the row index for the given row key
+        """
+        index = self.key_index.get(key, None)
+        return index
+
+    def get_row(self, index: int) -> dict:
+        """
+        get the row with the given index as a dict
+        """
+        row = {col: values[index] for col, values in self.columns.items()}
+        return row
+
+    def get_value(self, index: int, col: str):
+        """
+        get the value of the given cell
+        """
+        values = self.columns.get(col, None)
+        value = values[index] if values is not None else None
+        return value
+
+    def update_cell(self, index: int, col: str, value):
+        """
+        update the given cell
+        """
+        if col not in self.columns:
+            self.columns[col] = [None] * self.size
+        self.columns[col][index] = value
+        if self._view_key is not None:
+            sort_col, _descending, filter_text, _filter_cols = self._view_key
+            if col == sort_col or filter_text:
+                self.invalidate_view()
+
+    @staticmethod
+    def sort_key(value) -> Tuple[int, object]:
+        """
+        get a sort key that orders numbers numerically and everything else as text
+        """
+        if value is None or value == "":
+            return (2, "")
+        try:
+            return (0, float(value))
+        except (TypeError, ValueError):
+            return (1, str(value).lower())
+
+    def get_view(
+        self,
+        sort_col: Optional[str] = None,
+        descending: bool = False,
+        filter_text: Optional[str] = None,
+        filter_cols: Optional[List[str]] = None,
+    ) -> List[int]:
+        """
+        get the sorted and filtered row indices
+
+        Args:
+            sort_col(str): the column to sort by - None keeps the natural order
+            descending(bool): if True sort descending
+            filter_text(str): case insensitive text every shown row has to contain
+            filter_cols(list): the columns to apply the filter on - default all
+
+        Returns:
+            list: the row indices of the view
+        """
+        view_key = (sort_col, descending, filter_text, tuple(filter_cols or ()))
+        if view_key == self._view_key:
+            return self._view
+        indices = range(self.size)
+        if filter_text:
+            needle = filter_text.lower()
+            cols = filter_cols or list(self.columns.keys())
+            col_values = [self.columns[col] for col in cols if col in self.columns]
+            indices = [
+                i
+                for i in indices
+                if any(needle in str(values[i]).lower() for values in col_values)
+            ]
+        indices = list(indices)
+        if sort_col in self.columns:
+            values = self.columns[sort_col]
+            indices.sort(key=lambda i: self.sort_key(values[i]), reverse=descending)
+        self._view_key = view_key
+        self._view = indices
+        return indices
+
+    def window(
+        self,
+        start: int,
+        count: int,
+        sort_col: Optional[str] = None,
+        descending: bool = False,
+        filter_text: Optional[str] = None,
+        filter_cols: Optional[List[str]] = None,
+    ) -> Tuple[List[dict], int]:
+        """
+        get a window of rows
+
+        Args:
+            start(int): the index of the first row in the view
+            count(int): the maximum number of rows to return
+            sort_col(str): the column to sort by
+            descending(bool): if True sort descending
+            filter_text(str): the filter text
+            filter_cols(list): the columns to apply the filter on
+
+        Returns:
+            tuple: the list of row dicts and the total number of rows in the view
+        """
+        view = self.get_view(sort_col, descending, filter_text, filter_cols)
+        rows = [self.get_row(i) for i in view[start : start + count]]
+        return rows, len(view)
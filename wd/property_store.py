@@ -0,0 +1,223 @@
+"""
+Created on 2026-10-19
+
+@author: wf
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+from ez_wikidata.wdproperty import WikidataProperty, WikidataPropertyManager
+
+
+class PropertyStore:
+    """
+    process wide store of the Wikidata property metadata
+    (labels, descriptions and datatypes)
+
+    all Wikidata properties are loaded in bulk once - from the
+    persistent sqlite cache of the WikidataPropertyManager if available -
+    and refreshed periodically in the background. The store installs its
+    manager as the WikidataPropertyManager instance so that every
+    TrulyTabular shares it and property resolution is a dict lookup
+    """
+
+    _instance: Optional["PropertyStore"] = None
+    _instance_lock = threading.Lock()
+    # the minimum delay of a scheduled refresh in seconds
+    min_refresh_delay = 60.0
+
+    def __init__(
+        self,
+        endpoint_url: str = "https://qlever.dev/api/wikidata",
+        refresh_interval: float = 7 * 24 * 3600,
+        debug: bool = False,
+    ):
+        """
+        constructor
+
+        Args:
+            endpoint_url(str): the SPARQL endpoint to load the properties from
+            refresh_interval(float): the maximum age of the property metadata in seconds
+            debug(bool): if True show debug information
+        """
+        self.endpoint_url = endpoint_url
+        self.refresh_interval = refresh_interval
+        self.debug = debug
+        self.wpm: Optional[WikidataPropertyManager] = None
+        self.loaded_at: Optional[float] = None
+        self.lock = threading.RLock()
+        self.ready = threading.Event()
+        self.preloading = False
+        self.refresh_timer: Optional[threading.Timer] = None
+        self.stopped = threading.Event()
+
+    @classmethod
+    def get_instance(cls) -> "PropertyStore":
+        """
+        get the process wide property store
+        """
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = PropertyStore()
+        return cls._instance
+
+    @property
+    def cache_path(self) -> str:
+        cache_path = WikidataPropertyManager.get_cache_path()
+        return cache_path
+
+    def cache_age(self) -> Optional[float]:
+        """
+        get the age of the persistent property cache in seconds
+
+        Returns:
+            float: the age or None if there is no cache yet
+        """
+        age = None
+        path = self.cache_path
+        if os.path.isfile(path) and os.stat(path).st_size > 0:
+            age = time.time() - os.path.getmtime(path)
+        return age
+
+    def is_stale(self) -> bool:
+        """
+        check whether the persistent property cache needs a refresh
+        """
+        age = self.cache_age()
+        stale = age is None or age > self.refresh_interval
+        return stale
+
+    def install(self, wpm: WikidataPropertyManager):
+        """
+        install the given property manager as the one shared by all TrulyTabular instances
+        """
+        with self.lock:
+            self.wpm = wpm
+            self.loaded_at = time.time()
+            WikidataPropertyManager.wpm = wpm
+            self.ready.set()
+
+    def create_manager(self, refresh: bool = False) -> WikidataPropertyManager:
+        """
+        create a loaded property manager
+
+        Args:
+            refresh(bool): if True reload all properties via SPARQL and update
+                the persistent cache - otherwise load from the cache if available
+        """
+        wpm = WikidataPropertyManager(
+            endpoint_url=self.endpoint_url, with_load=not refresh, profile=self.debug
+        )
+        if refresh:
+            wpm.load_from_sparql()
+            wpm.prepare_store()
+            wpm.store()
+            wpm.init_props()
+            wpm.loaded = True
+        return wpm
+
+    def load(self):
+        """
+        load the property metadata from the persistent cache
+        or via SPARQL if there is no cache yet
+        """
+        self.install(self.create_manager())
+
+    def refresh(self):
+        """
+        reload all property metadata via SPARQL and swap it in
+        """
+        self.install(self.create_manager(refresh=True))
+
+    def preload(self):
+        """
+        preload the property metadata and schedule the periodic refresh
+        """
+        try:
+            self.load()
+            if self.is_stale():
+                self.refresh()
+        except Exception as ex:
+            logging.warning(f"could not preload wikidata properties: {ex}")
+        finally:
+            self.preloading = False
+            self.ready.set()
+            self.schedule_refresh()
+
+    def schedule_refresh(self):
+        """
+        schedule the next background refresh
+        """
+        if self.stopped.is_set():
+            return
+        age = self.cache_age() or 0.0
+        delay = max(self.refresh_interval - age, self.min_refresh_delay)
+        self.refresh_timer = threading.Timer(delay, self.on_refresh_timer)
+        self.refresh_timer.daemon = True
+        self.refresh_timer.start()
+
+    def on_refresh_timer(self):
+        try:
+            self.refresh()
+        except Exception as ex:
+            logging.warning(f"could not refresh wikidata properties: {ex}")
+        self.schedule_refresh()
+
+    def stop(self):
+        """
+        stop the periodic refresh
+        """
+        self.stopped.set()
+        if self.refresh_timer:
+            self.refresh_timer.cancel()
+
+    def start(self):
+        """
+        preload the property metadata in a background thread
+        """
+        self.preloading = True
+        thread = threading.Thread(
+            target=self.preload, name="wdgrid-property-store", daemon=True
+        )
+        thread.start()
+
+    def get_manager(self, timeout: float = 120.0) -> WikidataPropertyManager:
+        """
+        get the shared property manager - loading it if it has not been preloaded
+
+        Args:
+            timeout(float): the maximum time to wait for a running preload
+        """
+        if self.wpm is None and self.preloading:
+            self.ready.wait(timeout=timeout)
+        with self.lock:
+            if self.wpm is None:
+                self.load()
+            return self.wpm
+
+    def get_properties_by_ids(
+        self, ids: List[str], lang: str = "en"
+    ) -> Dict[str, WikidataProperty]:
+        """
+        get properties by their ids falling back to english labels
+
+        Args:
+            ids(list): the property ids e.g. ["P17","P569"]
+            lang(str): the language of the labels
+
+        Returns:
+            dict: the WikidataProperty for each id that was found
+        """
+        wpm = self.get_manager()
+        by_lang = wpm.props_by_id.get(lang, {})
+        by_en = wpm.props_by_id.get("en", {})
+        properties = {}
+        for pid in ids:
+            prop = by_lang.get(pid, None) or by_en.get(pid, None)
+            if prop is not None:
+                properties[pid] = prop
+        return properties
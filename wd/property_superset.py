@@ -0,0 +1,82 @@
+"""
+Created on 2026-10-19
+
+@author: wf
+"""
+
+from typing import Callable, List, Optional
+
+from wd.property_rows import PropertyRowStore
+
+
+class PropertySuperset:
+    """
+    the most frequently used properties of an analysis fetched for the
+    lowest min count requested so far - a higher min count is served by
+    filtering the superset locally without a query
+    """
+
+    def __init__(self, key: tuple, min_count: int, property_lod: List[dict]):
+        """
+        constructor
+
+        Args:
+            key(tuple): the analysis key (qid, predicate, endpoint_name)
+            min_count(int): the min count the properties have been fetched for
+            property_lod(list): the property records with a count column
+        """
+        self.key = key
+        self.min_count = min_count
+        # columnar copy - the records are modified by PropertySelection.prepare
+        self.rows = PropertyRowStore.from_lod(property_lod, key_col="prop")
+
+    @property
+    def size(self) -> int:
+        return self.rows.size
+
+    def covers(self, key: tuple, min_count: int) -> bool:
+        """
+        check whether the properties of the given analysis and min count
+        can be filtered from this superset
+        """
+        covers = self.key == key and min_count >= self.min_count
+        return covers
+
+    def filter(self, min_count: int) -> List[dict]:
+        """
+        get copies of the property records with more than min_count usages
+        """
+        counts = self.rows.columns.get("count", [])
+        property_lod = [
+            self.rows.get_row(i)
+            for i, count in enumerate(counts)
+            if int(count) > min_count
+        ]
+        return property_lod
+
+
+class StatsCache(dict):
+    """
+    the statistics rows of an analysis by property id - reused when the
+    property table is rebuilt for another min count
+    """
+
+    def get_or_compute(
+        self, property_id: str, compute: Callable[[], Optional[dict]]
+    ) -> Optional[dict]:
+        """
+        get the statistics row of the given property computing it if missing
+
+        Args:
+            property_id(str): the property id e.g. P569
+            compute(Callable): function to compute the row - a missing row is not cached
+
+        Returns:
+            dict: the cached or computed statistics row
+        """
+        stats_row = self.get(property_id, None)
+        if stats_row is None:
+            stats_row = compute()
+            if stats_row:
+                self[property_id] = stats_row
+        return stats_row
@@ -9,6 +9,8 @@ from ngwidgets.webserver import NiceGuiWebserver
 from ngwidgets.widgets import Link
 from nicegui import ui
 
+from wd.sparql_templates import SparqlTemplates
+
 
 class QueryView:
     """
@@ -53,7 +55,8 @@ class QueryView:
         # we might need to change the endpoint
         self.query = Query(name=self.name, query=sparql_query)
         if self.sparql_endpoint:
-            try_it_url_encoded = self.query.getTryItUrl(
+            try_it_url_encoded = SparqlTemplates.get_instance().try_it_url(
+                sparql_query,
                 baseurl=self.sparql_endpoint.website,
                 database=self.sparql_endpoint.database,
             )
@@ -0,0 +1,181 @@
+"""
+Created on 2026-10-19
+
+@author: wf
+"""
+
+import contextlib
+import logging
+import sys
+import threading
+import time
+import weakref
+from typing import Dict, List, Optional
+
+
+class SessionRegistry:
+    """
+    process wide registry of the open truly tabular sessions
+
+    a background check compacts the state of sessions that have been
+    idle for compact_after seconds and drops their heavy state after
+    drop_after seconds - a dropped session rebuilds its analysis from the
+    shared caches when its user returns. Busy sessions e.g. with a long
+    running analysis are never idle - the busy check and the compaction run
+    under the busy_lock of the session if it has one
+    """
+
+    _instance: Optional["SessionRegistry"] = None
+    _instance_lock = threading.Lock()
+
+    def __init__(
+        self,
+        compact_after: float = 10 * 60,
+        drop_after: float = 60 * 60,
+        check_interval: float = 60,
+    ):
+        """
+        constructor
+
+        Args:
+            compact_after(float): idle seconds after which the session state is compacted
+            drop_after(float): idle seconds after which the heavy session state is dropped
+            check_interval(float): seconds between two idle checks
+        """
+        self.compact_after = compact_after
+        self.drop_after = drop_after
+        self.check_interval = check_interval
+        self.sessions: "weakref.WeakSet" = weakref.WeakSet()
+        self.lock = threading.Lock()
+        self.timer: Optional[threading.Timer] = None
+
+    @classmethod
+    def get_instance(cls) -> "SessionRegistry":
+        """
+        get the process wide session registry
+        """
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = SessionRegistry()
+        return cls._instance
+
+    def register(self, session):
+        """
+        register the given session and start the idle checks if needed
+
+        Args:
+            session: an object with last_activity, idle_state, compact_state()
+                drop_state() and memory_usage() and optionally is_busy and busy_lock
+        """
+        with self.lock:
+            self.sessions.add(session)
+            if self.timer is None:
+                self.schedule()
+
+    def unregister(self, session):
+        """
+        unregister the given session e.g. when its client disconnected
+        """
+        with self.lock:
+            self.sessions.discard(session)
+
+    def get_sessions(self) -> list:
+        with self.lock:
+            sessions = list(self.sessions)
+        return sessions
+
+    def schedule(self):
+        self.timer = threading.Timer(self.check_interval, self.on_timer)
+        self.timer.daemon = True
+        self.timer.start()
+
+    def on_timer(self):
+        try:
+            self.check_idle()
+        except Exception as ex:
+            logging.warning(f"idle session check failed: {ex}")
+        with self.lock:
+            self.schedule()
+
+    def check_idle(self, now: float = None) -> Dict[str, int]:
+        """
+        compact or drop the state of idle sessions
+
+        Args:
+            now(float): the current monotonic time - default: time.monotonic()
+
+        Returns:
+            dict: the number of compacted and dropped sessions
+        """
+        now = time.monotonic() if now is None else now
+        counts = {"compacted": 0, "dropped": 0}
+        for session in self.get_sessions():
+            # an analysis can not start while its session is compacted or dropped
+            busy_lock = getattr(session, "busy_lock", None) or contextlib.nullcontext()
+            try:
+                with busy_lock:
+                    if getattr(session, "is_busy", False):
+                        continue
+                    idle = now - session.last_activity
+                    if idle >= self.drop_after and session.idle_state != "dropped":
+                        session.drop_state()
+                        counts["dropped"] += 1
+                    elif idle >= self.compact_after and session.idle_state == "active":
+                        session.compact_state()
+                        counts["compacted"] += 1
+            except Exception as ex:
+                # one failing session must not stop the sweep
+                logging.warning(f"idle check of {session.session_name} failed: {ex}")
+        return counts
+
+    @staticmethod
+    def estimate_size(obj, seen: set = None, max_depth: int = 16) -> int:
+        """
+        estimate the memory used by the given object and everything it contains
+
+        Args:
+            obj: the object
+            seen(set): ids of objects already counted - shared objects count once
+            max_depth(int): the maximum nesting depth to follow
+
+        Returns:
+            int: the estimated size in bytes
+        """
+        seen = set() if seen is None else seen
+        if obj is None or id(obj) in seen or max_depth < 0:
+            return 0
+        seen.add(id(obj))
+        size = sys.getsizeof(obj, 0)
+        if isinstance(obj, dict):
+            for key, value in obj.items():
+                size += SessionRegistry.estimate_size(key, seen, max_depth - 1)
+                size += SessionRegistry.estimate_size(value, seen, max_depth - 1)
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            for item in obj:
+                size += SessionRegistry.estimate_size(item, seen, max_depth - 1)
+        elif hasattr(obj, "__dict__") and not isinstance(obj, type):
+            size += SessionRegistry.estimate_size(vars(obj), seen, max_depth - 1)
+        return size
+
+    def memory_report(self) -> List[dict]:
+        """
+        get the memory usage of all registered sessions
+
+        Returns:
+            list: one record per session ordered by the total size
+        """
+        now = time.monotonic()
+        lod = []
+        for session in self.get_sessions():
+            record = {
+                "session": session.session_name,
+                "state": session.idle_state,
+                "idle s": round(now - session.last_activity),
+            }
+            usage = session.memory_usage()
+            for name, size in usage.items():
+                record[f"{name} KB"] = round(size / 1024, 1)
+            record["total KB"] = round(sum(usage.values()) / 1024, 1)
+            lod.append(record)
+        lod.sort(key=lambda record: -record["total KB"])
+        return lod
@@ -0,0 +1,72 @@
+"""
+Created on 2026-10-19
+
+@author: wf
+"""
+
+from ngwidgets.lod_grid import GridConfig, ListOfDictsGrid
+from nicegui import ui
+
+from wd.admission import AdmissionController
+from wd.cost_model import QueryCostModel
+from wd.session_registry import SessionRegistry
+
+
+class SessionsView:
+    """
+    admin view of the memory used by the open truly tabular sessions
+    and of the admission control queues and the query cost predictions
+    """
+
+    def __init__(self, solution):
+        """
+        constructor
+
+        Args:
+            solution: the client specific solution
+        """
+        self.solution = solution
+        self.registry = SessionRegistry.get_instance()
+        self.setup()
+
+    def setup(self):
+        """
+        set up the user interface
+        """
+        with ui.row():
+            ui.button("refresh", on_click=self.refresh)
+            ui.button("reclaim idle sessions now", on_click=self.on_reclaim)
+        self.status_label = ui.label()
+        self.admission_grid = ListOfDictsGrid(config=GridConfig(key_col="kind"))
+        self.cost_label = ui.label()
+        self.cost_grid = ListOfDictsGrid(config=GridConfig(key_col="#"))
+        self.session_grid = ListOfDictsGrid(config=GridConfig(key_col="session"))
+        self.refresh()
+
+    def on_reclaim(self):
+        counts = self.registry.check_idle()
+        ui.notify(f"{counts['compacted']} compacted, {counts['dropped']} dropped")
+        self.refresh()
+
+    def refresh(self):
+        """
+        show the memory report of all sessions
+        """
+        lod = self.registry.memory_report()
+        total = sum(record["total KB"] for record in lod)
+        self.status_label.text = (
+            f"{len(lod)} sessions using about {total/1024:.1f} MB - "
+            f"compacted after {self.registry.compact_after/60:.0f} min and "
+            f"dropped after {self.registry.drop_after/60:.0f} min idle"
+        )
+        self.session_grid.load_lod(lod)
+        self.session_grid.update()
+        self.admission_grid.load_lod(AdmissionController.get_instance().metrics())
+        self.admission_grid.update()
+        cost_model = QueryCostModel.get_instance()
+        strategies = ", ".join(
+            f"{strategy}: {count}" for strategy, count in cost_model.decisions.items()
+        )
+        self.cost_label.text = f"query strategies chosen - {strategies or 'none yet'}"
+        self.cost_grid.load_lod(cost_model.accuracy())
+        self.cost_grid.update()
@@ -0,0 +1,329 @@
+"""
+Created on 2026-10-19
+
+@author: wf
+"""
+
+import concurrent.futures
+import contextlib
+import contextvars
+import math
+from typing import Callable, Dict, Optional
+
+import numpy as np
+from lodstorage.query import Endpoint
+
+from wd.sparql_results import SparqlResultReader
+from wd.sparql_templates import SparqlTemplates
+
+
+def splitmix64(keys: np.ndarray, seed: int = 0) -> np.ndarray:
+    """
+    hash the given 64 bit keys with the splitmix64 finalizer
+
+    Args:
+        keys(np.ndarray): the keys
+        seed(int): the seed to derive independent hash functions
+
+    Returns:
+        np.ndarray: the uint64 hashes
+    """
+    with np.errstate(over="ignore"):
+        z = keys.astype(np.uint64) + np.uint64(
+            (0x9E3779B97F4A7C15 * (seed + 1)) & 0xFFFFFFFFFFFFFFFF
+        )
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        z = z ^ (z >> np.uint64(31))
+    return z
+
+
+class CountMinSketch:
+    """
+    count-min sketch of the frequencies of integer keys
+
+    the estimate of a frequency is never too low and with probability
+    1-exp(-depth) at most e/width * total too high - sketches with the same
+    dimensions are merged by adding their tables
+    """
+
+    def __init__(self, width: int = 2048, depth: int = 5):
+        """
+        constructor
+
+        Args:
+            width(int): the number of counters per row
+            depth(int): the number of rows i.e. independent hash functions
+        """
+        self.width = width
+        self.depth = depth
+        self.table = np.zeros((depth, width), dtype=np.int64)
+        self.total = 0
+
+    @property
+    def epsilon(self) -> float:
+        return math.e / self.width
+
+    @property
+    def delta(self) -> float:
+        return math.exp(-self.depth)
+
+    def columns(self, keys: np.ndarray, row: int) -> np.ndarray:
+        columns = (splitmix64(keys, seed=row) % np.uint64(self.width)).astype(np.int64)
+        return columns
+
+    def add(self, keys: np.ndarray, counts: np.ndarray = None):
+        """
+        add the given keys with the given counts - default: 1 each
+        """
+        if len(keys) == 0:
+            return
+        if counts is None:
+            counts = np.ones(len(keys), dtype=np.int64)
+        for row in range(self.depth):
+            np.add.at(self.table[row], self.columns(keys, row), counts)
+        self.total += int(np.sum(counts))
+
+    def estimate(self, key: int) -> int:
+        keys = np.array([key], dtype=np.uint64)
+        estimate = min(
+            int(self.table[row, self.columns(keys, row)[0]])
+            for row in range(self.depth)
+        )
+        return estimate
+
+    @property
+    def error_bound(self) -> float:
+        """
+        the maximum overestimate of a frequency with probability 1-delta
+        """
+        return self.epsilon * self.total
+
+    def merge(self, other: "CountMinSketch"):
+        if (other.width, other.depth) != (self.width, self.depth):
+            raise ValueError("can only merge sketches of the same dimensions")
+        self.table += other.table
+        self.total += other.total
+
+
+class PropertySketch:
+    """
+    mergeable approximate statistics of the values per instance of a property
+    """
+
+    def __init__(self, width: int = 2048, depth: int = 5):
+        """
+        constructor
+
+        Args:
+            width(int): the width of the value count count-min sketch
+            depth(int): the depth of the value count count-min sketch
+        """
+        self.value_counts = CountMinSketch(width, depth)
+        self.max_count = 0
+        self.values = 0
+
+    def add_counts(self, counts: np.ndarray):
+        """
+        add the number of values of a chunk of instances
+
+        Args:
+            counts(np.ndarray): the number of values of each instance
+        """
+        if len(counts) == 0:
+            return
+        self.value_counts.add(counts.astype(np.uint64))
+        self.max_count = max(self.max_count, int(counts.max()))
+        self.values += int(counts.sum())
+
+    def merge(self, other: "PropertySketch"):
+        self.value_counts.merge(other.value_counts)
+        self.max_count = max(self.max_count, other.max_count)
+        self.values += other.values
+
+    @staticmethod
+    def with_bound(value: float, bound: float, digits: int = 0) -> str:
+        text = f"≈{value:.{digits}f} ±{bound:.{digits}f}"
+        return text
+
+    def stats_row(self, plabel: str, item_count: int) -> dict:
+        """
+        get an approximate statistics row with error bounds
+
+        Args:
+            plabel(str): the label of the property
+            item_count(int): the instance count of the class
+
+        Returns:
+            dict: the statistics row - "1", "non tabular" and "non tabular%"
+            are texts with the estimate and its error bound, the number of
+            instances using the property is exact
+        """
+        # every instance of the disjoint shards has been added exactly once
+        total = self.value_counts.total
+        single = min(self.value_counts.estimate(1), total)
+        single_bound = self.value_counts.error_bound
+        # the single count is never too low so the non tabular count is never too high
+        nttotal = total - single
+        nt_percent = None
+        if total:
+            nt_percent = self.with_bound(
+                nttotal / total * 100, single_bound / total * 100, digits=1
+            )
+        row = {
+            "property": plabel,
+            "1": self.with_bound(single, single_bound),
+            "maxf": self.max_count,
+            "total": total,
+            "total%": round(total / item_count * 100, 1) if item_count else None,
+            "non tabular": self.with_bound(nttotal, single_bound),
+            "non tabular%": nt_percent,
+            "approximate": True,
+        }
+        return row
+
+
+class ApproximateStatistics:
+    """
+    approximate non tabular statistics of the properties of huge classes
+
+    instead of a single exact frequency query per property the instances are
+    split in shards by the leading digit of their id - each shard is a
+    contiguous range of the ids in the sorted order of the endpoint so the
+    shard queries together group every instance once. The unpaged result of
+    each shard is streamed in chunks into a mergeable sketch. Shards may be
+    fetched by several worker threads which share the admission control and
+    the rate limit of the endpoint with all other queries of the server
+    """
+
+    def __init__(
+        self,
+        endpoint: Endpoint,
+        qid: str,
+        search_predicate: str,
+        lang: str = "en",
+        shards: int = 9,
+        chunk_size: int = 50000,
+        workers: int = 1,
+        width: int = 2048,
+        depth: int = 5,
+        rewrite: Optional[Callable[[str], str]] = None,
+    ):
+        """
+        constructor
+
+        Args:
+            endpoint(Endpoint): the endpoint to query
+            qid(str): the class e.g. Q5
+            search_predicate(str): the predicate to select the instances e.g. wdt:P31
+            lang(str): the language the instances need a label in
+            shards(int): 1 or 9 shards by the leading digit of the ids
+            chunk_size(int): the number of instances to sketch at a time
+            workers(int): the number of worker threads fetching shards
+            width(int): the width of the value count count-min sketch
+            depth(int): the depth of the value count count-min sketch
+            rewrite(Callable): optional rewriting of the queries e.g. with a subclass closure
+        """
+        if shards not in [1, SparqlTemplates.id_shards]:
+            raise ValueError(f"shards must be 1 or 9 but is {shards}")
+        self.endpoint = endpoint
+        self.qid = qid
+        self.search_predicate = search_predicate
+        self.lang = lang
+        self.shards = shards
+        self.chunk_size = chunk_size
+        self.workers = workers
+        self.width = width
+        self.depth = depth
+        self.rewrite = rewrite
+        self.sketches: Dict[str, PropertySketch] = {}
+
+    def shard_filter(self, shard: int) -> str:
+        """
+        get the filter restricting the instances to the id range of the given shard
+
+        Args:
+            shard(int): the shard number - 0 for the ids starting with 1
+        """
+        if self.shards == 1:
+            return ""
+        shard_filter = SparqlTemplates.id_range_filter(shard, self.endpoint.database)
+        return shard_filter
+
+    def shard_query(self, property_id: str, shard: int) -> str:
+        """
+        get the unpaged instance/value count query of the given shard
+
+        Args:
+            property_id(str): the property e.g. P106
+            shard(int): the shard number
+        """
+        query = f"""# values per instance of {self.qid} for {property_id} - shard {shard}
+PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+PREFIX wd: <http://www.wikidata.org/entity/>
+PREFIX wdt: <http://www.wikidata.org/prop/direct/>
+SELECT ?item (COUNT(?value) AS ?count) WHERE {{
+  ?item {self.search_predicate} wd:{self.qid}.{self.shard_filter(shard)}
+  ?item rdfs:label ?itemLabel.
+  FILTER (LANG(?itemLabel) = "{self.lang}").
+  ?item wdt:{property_id} ?value.
+}}
+GROUP BY ?item"""
+        if self.rewrite:
+            query = self.rewrite(query)
+        return query
+
+    def sketch_shard(self, property_id: str, shard: int) -> PropertySketch:
+        """
+        sketch the streamed instance/value count result of the given shard
+        """
+        sketch = PropertySketch(self.width, self.depth)
+        reader = SparqlResultReader(self.endpoint)
+        query = self.shard_query(property_id, shard)
+        chunks = reader.query_as_chunks(query, self.chunk_size)
+        with contextlib.closing(chunks):
+            for columns in chunks:
+                counts = [int(count) for count in columns.get("count", [])]
+                sketch.add_counts(np.array(counts, dtype=np.int64))
+        return sketch
+
+    def compute(self, property_id: str) -> PropertySketch:
+        """
+        compute the merged sketch of the given property
+        """
+        shards = range(self.shards)
+        if self.workers > 1:
+            with concurrent.futures.ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="sketch"
+            ) as executor:
+                # keep the admission client and the tracing parent of the caller
+                futures = [
+                    executor.submit(
+                        contextvars.copy_context().run,
+                        self.sketch_shard,
+                        property_id,
+                        shard,
+                    )
+                    for shard in shards
+                ]
+                shard_sketches = [future.result() for future in futures]
+        else:
+            shard_sketches = [self.sketch_shard(property_id, shard) for shard in shards]
+        sketch = PropertySketch(self.width, self.depth)
+        for shard_sketch in shard_sketches:
+            sketch.merge(shard_sketch)
+        return sketch
+
+    def get_sketch(self, property_id: str) -> PropertySketch:
+        sketch = self.sketches.get(property_id, None)
+        if sketch is None:
+            sketch = self.compute(property_id)
+            self.sketches[property_id] = sketch
+        return sketch
+
+    def stats_row(self, property_id: str, plabel: str, item_count: int) -> dict:
+        """
+        get the approximate statistics row of the given property
+        """
+        row = self.get_sketch(property_id).stats_row(plabel, item_count)
+        return row
@@ -0,0 +1,567 @@
+"""
+Created on 2026-10-19
+
+@author: wf
+"""
+
+import base64
+import datetime
+import itertools
+import json
+import threading
+import time
+import tracemalloc
+import urllib.parse
+import urllib.request
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+from urllib.error import HTTPError
+
+from ez_wikidata.wdproperty import WIKIDATA_USER_AGENT
+from lodstorage.query import Endpoint
+from lodstorage.rate_limiter import RateLimiter
+from lodstorage.sparql import SPARQL
+from SPARQLWrapper.SmartWrapper import Value
+from SPARQLWrapper.SPARQLExceptions import EndPointInternalError
+
+from wd.admission import AdmissionController
+from wd.tracing import Tracer
+
+try:
+    # optional faster JSON decoder
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+XSD = "http://www.w3.org/2001/XMLSchema#"
+
+
+@dataclass
+class ParseReport:
+    """
+    timing and memory report of parsing a SPARQL result
+    """
+
+    name: str
+    rows: int
+    seconds: float
+    peak_kb: float
+
+    def asText(self) -> str:
+        text = f"{self.name}: {self.rows} rows in {self.seconds*1000:.1f} ms peak {self.peak_kb:.0f} KB"
+        return text
+
+
+class SparqlResultParser:
+    """
+    parse SPARQL results into typed python values
+    """
+
+    int_types = {
+        "integer",
+        "int",
+        "long",
+        "short",
+        "byte",
+        "nonNegativeInteger",
+        "positiveInteger",
+        "negativeInteger",
+        "nonPositiveInteger",
+        "unsignedInt",
+        "unsignedLong",
+    }
+    float_types = {"decimal", "double", "float"}
+    escapes = {"t": "\t", "n": "\n", "r": "\r", '"': '"', "'": "'", "\\": "\\"}
+
+    @classmethod
+    def convert(cls, lexical: str, datatype: Optional[str]):
+        """
+        convert the given lexical value of the given xsd datatype
+        the same way lodstorage does for the JSON results
+
+        Args:
+            lexical(str): the lexical form of the literal
+            datatype(str): the datatype IRI or prefixed name
+
+        Returns:
+            the typed python value
+        """
+        if not datatype:
+            return lexical
+        if datatype.startswith(XSD):
+            local_name = datatype[len(XSD) :]
+        elif datatype.startswith("xsd:"):
+            local_name = datatype[4:]
+        else:
+            return lexical
+        try:
+            if local_name in cls.int_types:
+                return int(lexical)
+            if local_name in cls.float_types:
+                return float(lexical)
+            if local_name == "boolean":
+                return lexical in ["TRUE", "true", "1"]
+            if local_name == "date":
+                return datetime.datetime.strptime(lexical, "%Y-%m-%d").date()
+            if local_name == "dateTime":
+                return SPARQL.strToDatetime(lexical)
+        except ValueError:
+            pass
+        return lexical
+
+    @classmethod
+    def unescape(cls, text: str) -> str:
+        """
+        unescape the given turtle string literal content
+        """
+        if "\\" not in text:
+            return text
+        chars = []
+        i = 0
+        while i < len(text):
+            c = text[i]
+            if c == "\\" and i + 1 < len(text):
+                chars.append(cls.escapes.get(text[i + 1], text[i + 1]))
+                i += 2
+            else:
+                chars.append(c)
+                i += 1
+        return "".join(chars)
+
+    @classmethod
+    def parse_term(cls, token: str):
+        """
+        parse a single RDF term of a TSV result
+
+        Args:
+            token(str): the term in turtle syntax
+
+        Returns:
+            the typed python value or None for an unbound value
+        """
+        if not token:
+            return None
+        first = token[0]
+        if first == "<":
+            return token[1:-1]
+        if first == '"':
+            end = token.rfind('"')
+            lexical = cls.unescape(token[1:end])
+            suffix = token[end + 1 :]
+            if suffix.startswith("^^"):
+                datatype = suffix[2:]
+                if datatype.startswith("<"):
+                    datatype = datatype[1:-1]
+                return cls.convert(lexical, datatype)
+            return lexical
+        # unquoted numbers and booleans
+        if token in ("true", "false"):
+            return token == "true"
+        try:
+            return int(token)
+        except ValueError:
+            pass
+        try:
+            return float(token)
+        except ValueError:
+            return token
+
+    @classmethod
+    def parse_tsv(cls, lines: Iterable[bytes]) -> Dict[str, list]:
+        """
+        parse a text/tab-separated-values SPARQL result line by line
+
+        Args:
+            lines(Iterable): the lines of the result e.g. a streamed http response
+
+        Returns:
+            dict: one list of typed values per variable
+        """
+        columns: Dict[str, list] = {}
+        col_lists = []
+        for i, line in enumerate(lines):
+            if isinstance(line, bytes):
+                line = line.decode("utf-8")
+            line = line.rstrip("\r\n")
+            if i == 0:
+                for var in line.split("\t"):
+                    values = []
+                    columns[var.lstrip("?")] = values
+                    col_lists.append(values)
+                continue
+            if not line:
+                continue
+            tokens = line.split("\t")
+            for values, token in zip(col_lists, tokens):
+                values.append(cls.parse_term(token))
+        return columns
+
+    @classmethod
+    def iter_tsv(
+        cls, lines: Iterable[bytes], chunk_size: int
+    ) -> Iterator[Dict[str, list]]:
+        """
+        parse a text/tab-separated-values SPARQL result in chunks of rows
+        while streaming - only one chunk is held in memory at a time
+
+        Args:
+            lines(Iterable): the lines of the result e.g. a streamed http response
+            chunk_size(int): the maximum number of rows per chunk
+
+        Yields:
+            dict: one list of typed values per variable for each chunk
+        """
+        lines = iter(lines)
+        header = next(lines, None)
+        if header is None:
+            return
+        while True:
+            chunk = [header]
+            chunk.extend(itertools.islice(lines, chunk_size))
+            if len(chunk) == 1:
+                return
+            yield cls.parse_tsv(chunk)
+            if len(chunk) <= chunk_size:
+                return
+
+    @classmethod
+    def parse_json(cls, content: bytes) -> Dict[str, list]:
+        """
+        parse an application/sparql-results+json result with the fastest
+        available JSON decoder
+
+        Args:
+            content(bytes): the raw JSON result
+
+        Returns:
+            dict: one list of typed values per variable
+        """
+        result = orjson.loads(content) if orjson else json.loads(content)
+        variables = result["head"]["vars"]
+        columns = {var: [] for var in variables}
+        col_lists = [(var, columns[var]) for var in variables]
+        for binding in result["results"]["bindings"]:
+            for var, values in col_lists:
+                term = binding.get(var, None)
+                if term is None:
+                    values.append(None)
+                else:
+                    values.append(cls.convert(term["value"], term.get("datatype")))
+        return columns
+
+    @classmethod
+    def parse_json_sparqlwrapper(cls, content: bytes) -> List[dict]:
+        """
+        parse a JSON result the way the SPARQLWrapper2/lodstorage path does
+        for comparison
+
+        Args:
+            content(bytes): the raw JSON result
+
+        Returns:
+            list: the list of dicts
+        """
+        full_result = json.loads(content)
+        variables = full_result["head"]["vars"]
+        bindings = []
+        for b in full_result["results"]["bindings"]:
+            bindings.append(
+                {key: Value(key, b[key]) for key in variables if key in b}
+            )
+        lod = SPARQL("https://query.wikidata.org/sparql").asListOfDicts(bindings)
+        return lod
+
+    @staticmethod
+    def as_lod(columns: Dict[str, list]) -> List[dict]:
+        """
+        convert the given columns to a list of dicts leaving out unbound values
+        """
+        lod = []
+        names = list(columns.keys())
+        for row in zip(*columns.values()):
+            record = {
+                name: value for name, value in zip(names, row) if value is not None
+            }
+            lod.append(record)
+        return lod
+
+    @staticmethod
+    def measure(name: str, parse: Callable[[], object]) -> ParseReport:
+        """
+        measure the time and peak memory of the given parse call
+
+        Args:
+            name(str): the name of the parser
+            parse(Callable): the parse call returning a list of dicts or columns
+
+        Returns:
+            ParseReport: the report
+        """
+        tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            result = parse()
+            seconds = time.perf_counter() - start
+            _current, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        if isinstance(result, dict):
+            rows = len(next(iter(result.values()), []))
+        else:
+            rows = len(result)
+        report = ParseReport(
+            name=name, rows=rows, seconds=seconds, peak_kb=peak / 1024
+        )
+        return report
+
+    @classmethod
+    def benchmark(cls, json_content: bytes, tsv_content: bytes) -> List[ParseReport]:
+        """
+        compare the parse time and peak memory of the current JSON path
+        with the TSV and fast JSON parsers
+
+        Args:
+            json_content(bytes): the raw JSON result
+            tsv_content(bytes): the raw TSV result of the same query
+
+        Returns:
+            list: the reports
+        """
+        decoder = "orjson" if orjson else "json"
+        reports = [
+            cls.measure(
+                "SPARQLWrapper JSON (current)",
+                lambda: cls.parse_json_sparqlwrapper(json_content),
+            ),
+            cls.measure(
+                "TSV streaming",
+                lambda: cls.parse_tsv(tsv_content.splitlines()),
+            ),
+            cls.measure(
+                f"JSON {decoder}",
+                lambda: cls.parse_json(json_content),
+            ),
+        ]
+        return reports
+
+
+class SparqlResultReader:
+    """
+    SPARQL query client negotiating the result format with the endpoint
+
+    endpoints known to support it (QLever and Blazegraph) are asked for
+    text/tab-separated-values which is parsed while streaming - all others
+    get application/sparql-results+json decoded with the fastest
+    available JSON decoder
+
+    the requests of all readers of an endpoint share one rate limiter with
+    the calls_per_minute of the endpoint and the Wikimedia User-Agent as
+    the SPARQL access of TrulyTabular
+    """
+
+    tsv_databases = ["qlever", "blazegraph"]
+    tsv_mime_type = "text/tab-separated-values"
+    json_mime_type = "application/sparql-results+json"
+    # http status codes of an endpoint refusing the TSV format
+    unsupported_codes = [406, 415]
+    # rate limited urlopen by endpoint url
+    _rate_limited: Dict[str, Callable] = {}
+    _rate_limited_lock = threading.Lock()
+
+    def __init__(self, endpoint: Endpoint, timeout: float = 120.0):
+        """
+        constructor
+
+        Args:
+            endpoint(Endpoint): the endpoint configuration
+            timeout(float): the http timeout in seconds
+        """
+        self.endpoint = endpoint
+        self.timeout = timeout
+        self.use_tsv = endpoint.database in self.tsv_databases
+
+    @classmethod
+    def get_urlopen(cls, endpoint: Endpoint) -> Callable:
+        """
+        get the urlopen rate limited to the calls_per_minute of the given
+        endpoint - shared by all readers of the endpoint
+        """
+        with cls._rate_limited_lock:
+            urlopen = cls._rate_limited.get(endpoint.endpoint, None)
+            if urlopen is None:
+                # the default of lodstorage SPARQL
+                calls_per_minute = getattr(endpoint, "calls_per_minute", None) or 60
+                limiter = RateLimiter(calls_per_minute=calls_per_minute)
+                urlopen = limiter.rate_limited(urllib.request.urlopen)
+                cls._rate_limited[endpoint.endpoint] = urlopen
+        return urlopen
+
+    def get_headers(self, accept: str) -> Dict[str, str]:
+        """
+        get the http headers for a query asking for the given result mime type
+        """
+        headers = {
+            "Accept": accept,
+            "User-Agent": WIKIDATA_USER_AGENT,
+            "Content-Type": "application/x-www-form-urlencoded",
+        }
+        if getattr(self.endpoint, "auth", None) == "BASIC":
+            credentials = f"{self.endpoint.user}:{self.endpoint.password}"
+            token = base64.b64encode(credentials.encode("utf-8")).decode("ascii")
+            headers["Authorization"] = f"Basic {token}"
+        return headers
+
+    def open(self, query: str, accept: str):
+        """
+        post the given query asking for the given result mime type
+
+        Returns:
+            the http response
+        """
+        data = urllib.parse.urlencode({"query": query}).encode("utf-8")
+        request = urllib.request.Request(
+            self.endpoint.endpoint,
+            data=data,
+            headers=self.get_headers(accept),
+            method="POST",
+        )
+        urlopen = self.get_urlopen(self.endpoint)
+        try:
+            response = urlopen(request, timeout=self.timeout)
+        except HTTPError as ex:
+            if ex.code == 500:
+                # keep the timeout detection of the SPARQLWrapper path working
+                body = ex.read().decode("utf-8", errors="replace")
+                raise EndPointInternalError(body)
+            raise
+        return response
+
+    def fetch(self, query: str, accept: str) -> bytes:
+        """
+        get the raw result of the given query in the given mime type
+        """
+        with self.open(query, accept) as response:
+            content = response.read()
+        return content
+
+    def query_as_columns(self, query: str) -> Dict[str, list]:
+        """
+        run the given query
+
+        Args:
+            query(str): the SPARQL query
+
+        Returns:
+            dict: one list of typed values per variable
+        """
+        with AdmissionController.get_instance().query(), Tracer.get_instance().span(
+            "sparql", endpoint=self.endpoint.name, query_length=len(query)
+        ) as span:
+            columns = self.do_query_as_columns(query)
+            if span is not None:
+                rows = len(next(iter(columns.values()), []))
+                span.set_attributes(rows=rows, tsv=self.use_tsv)
+        return columns
+
+    def query_as_chunks(
+        self, query: str, chunk_size: int
+    ) -> Iterator[Dict[str, list]]:
+        """
+        run the given query and get its result in chunks of rows - a TSV
+        result is parsed while streaming so a huge unpaged result is never
+        held in memory as a whole
+
+        Args:
+            query(str): the SPARQL query
+            chunk_size(int): the maximum number of rows per chunk
+
+        Yields:
+            dict: one list of typed values per variable for each chunk
+        """
+        with AdmissionController.get_instance().query(), Tracer.get_instance().span(
+            "sparql", endpoint=self.endpoint.name, query_length=len(query)
+        ) as span:
+            rows = 0
+            for columns in self.iter_columns(query, chunk_size):
+                rows += len(next(iter(columns.values()), []))
+                yield columns
+            if span is not None:
+                span.set_attributes(rows=rows, tsv=self.use_tsv)
+
+    def do_query_as_columns(self, query: str) -> Dict[str, list]:
+        chunks = list(self.iter_columns(query))
+        columns = chunks[0] if chunks else {}
+        return columns
+
+    def iter_columns(
+        self, query: str, chunk_size: Optional[int] = None
+    ) -> Iterator[Dict[str, list]]:
+        """
+        run the given query asking for TSV if the endpoint supports it - only
+        an endpoint refusing TSV switches this reader to JSON, all other
+        errors e.g. timeouts or rate limiting are raised
+
+        Args:
+            query(str): the SPARQL query
+            chunk_size(int): the maximum number of rows per chunk - None for one chunk
+
+        Yields:
+            dict: one list of typed values per variable for each chunk
+        """
+        response = None
+        content = None
+        if self.use_tsv:
+            try:
+                response = self.open(query, self.tsv_mime_type)
+            except HTTPError as ex:
+                if ex.code not in self.unsupported_codes:
+                    raise
+                self.use_tsv = False
+        if response is not None:
+            with response:
+                content_type = response.headers.get("Content-Type", "")
+                if self.tsv_mime_type in content_type:
+                    if chunk_size is None:
+                        yield SparqlResultParser.parse_tsv(response)
+                    else:
+                        yield from SparqlResultParser.iter_tsv(response, chunk_size)
+                    return
+                self.use_tsv = False
+                if self.json_mime_type in content_type:
+                    # the endpoint answered in JSON anyway - no need to ask again
+                    content = response.read()
+        if content is None:
+            content = self.fetch(query, self.json_mime_type)
+        columns = SparqlResultParser.parse_json(content)
+        size = len(next(iter(columns.values()), []))
+        if chunk_size is None or size <= chunk_size:
+            yield columns
+            return
+        for start in range(0, size, chunk_size):
+            yield {
+                var: values[start : start + chunk_size]
+                for var, values in columns.items()
+            }
+
+    def query_as_lod(self, query: str) -> List[dict]:
+        """
+        run the given query
+
+        Args:
+            query(str): the SPARQL query
+
+        Returns:
+            list: a list of dicts like SPARQL.queryAsListOfDicts
+        """
+        columns = self.query_as_columns(query)
+        lod = SparqlResultParser.as_lod(columns)
+        return lod
+
+    def benchmark(self, query: str) -> List[ParseReport]:
+        """
+        fetch the result of the given query in both formats and compare the parsers
+        """
+        json_content = self.fetch(query, self.json_mime_type)
+        tsv_content = self.fetch(query, self.tsv_mime_type)
+        reports = SparqlResultParser.benchmark(json_content, tsv_content)
+        return reports
@@ -0,0 +1,701 @@
+"""
+Created on 2026-10-19
+
+@author: wf
+"""
+
+import collections
+import re
+import threading
+import time
+import urllib.parse
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import ez_wikidata.trulytabular as trulytabular
+from ez_wikidata.trulytabular import TrulyTabular
+from ez_wikidata.wdproperty import WikidataProperty
+from lodstorage.prefixes import Prefixes
+from lodstorage.query import Query
+
+from wd.admission import AdmissionController
+from wd.cache import TTLCache
+
+
+class SparqlTemplate:
+    """
+    a SPARQL query shape precompiled into literal parts and parameter slots
+
+    slots are written as ${name} - the rendered text and the try it links are
+    memoized per parameter set
+    """
+
+    slot_regex = re.compile(r"\$\{(\w+)\}")
+
+    def __init__(self, name: str, text: str, max_size: int = 10000):
+        """
+        constructor
+
+        Args:
+            name(str): the name of the template
+            text(str): the template text with ${name} slots
+            max_size(int): the maximum number of memoized renderings
+        """
+        self.name = name
+        self.text = text
+        pieces = self.slot_regex.split(text)
+        self.literals: List[str] = pieces[0::2]
+        self.slots: List[str] = pieces[1::2]
+        # the distinct parameter names in order of their first use
+        self.params: Tuple[str, ...] = tuple(dict.fromkeys(self.slots))
+        self.rendered = TTLCache(f"{name} texts", max_size=max_size, ttl=24 * 3600)
+        self.links = TTLCache(f"{name} links", max_size=max_size, ttl=24 * 3600)
+
+    def key(self, params: Dict[str, str]) -> tuple:
+        key = tuple(str(params[param]) for param in self.params)
+        return key
+
+    def fill(self, key: tuple) -> str:
+        values = dict(zip(self.params, key))
+        parts = [self.literals[0]]
+        for slot, literal in zip(self.slots, self.literals[1:]):
+            parts.append(values[slot])
+            parts.append(literal)
+        text = "".join(parts)
+        return text
+
+    def render(self, **params) -> str:
+        """
+        render this template for the given parameters
+
+        Args:
+            **params: the values of the slots - extra parameters are ignored
+
+        Returns:
+            str: the query text
+        """
+        key = self.key(params)
+        text = self.rendered.get(key)
+        if text is None:
+            text = self.fill(key)
+            self.rendered.put(key, text)
+        return text
+
+    def try_it_url(self, baseurl: str, database: str, **params) -> str:
+        """
+        get the url encoded try it link of this template for the given parameters
+
+        Args:
+            baseurl(str): the website of the endpoint
+            database(str): the database type of the endpoint e.g. blazegraph
+            **params: the values of the slots
+
+        Returns:
+            str: the try it url
+        """
+        key = (baseurl, database) + self.key(params)
+        url = self.links.get(key)
+        if url is None:
+            url = SparqlTemplates.encode_try_it_url(
+                self.render(**params), baseurl, database
+            )
+            self.links.put(key, url)
+        return url
+
+
+@dataclass
+class GenerationReport:
+    """
+    timing report of generating the statistics queries of a set of properties
+    """
+
+    name: str
+    calls: int
+    seconds: float
+
+    @property
+    def per_call_us(self) -> float:
+        return self.seconds / self.calls * 1e6 if self.calls else 0.0
+
+    def asText(self) -> str:
+        text = f"{self.name}: {self.calls} properties in {self.seconds*1000:.1f} ms ({self.per_call_us:.1f} µs/property)"
+        return text
+
+
+class SparqlTemplates:
+    """
+    the precompiled query shapes of truly tabular analyses
+
+    renders the same query texts as the string building of TrulyTabular
+    but parses every shape once and memoizes the rendered texts and
+    try it links per parameter set
+    """
+
+    _instance: Optional["SparqlTemplates"] = None
+    _instance_lock = threading.Lock()
+    try_it_comment = "# This query was generated by Truly Tabular\n"
+    entity_prefix = "http://www.wikidata.org/entity/"
+    # the number of id ranges by the leading digit of the item ids
+    id_shards = 9
+
+    def __init__(self, max_size: int = 10000):
+        """
+        constructor
+
+        Args:
+            max_size(int): the maximum number of memoized renderings per template
+        """
+        self.max_size = max_size
+        self.prefixes = Prefixes.getPrefixes()
+        self.script = Path(trulytabular.__file__).name
+        self.links = TTLCache("try it links", max_size=max_size, ttl=24 * 3600)
+        self.templates: Dict[str, SparqlTemplate] = {}
+        self.compile()
+
+    @classmethod
+    def get_instance(cls) -> "SparqlTemplates":
+        """
+        get the process wide templates
+        """
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = SparqlTemplates()
+        return cls._instance
+
+    def add(self, name: str, text: str):
+        self.templates[name] = SparqlTemplate(name, text, max_size=self.max_size)
+
+    def compile(self):
+        """
+        compile the query shapes
+        """
+        none_tabular = """SELECT ?item ?itemLabel (COUNT (?value) AS ?count)
+WHERE
+{
+  # instance of ${qlabel}
+  ?item ${predicate} wd:${qid}.${where}
+  ?item rdfs:label ?itemLabel.
+  FILTER (LANG(?itemLabel) = "${lang}").
+  # ${plabel}
+  ?item ${property} ?value.
+} GROUP BY ?item ?itemLabel
+"""
+        header = f"""# Count all ${{item_text}} items
+# with the given ${{plabel}}(${{pid}}) https://www.wikidata.org/wiki/Property:${{pid}}
+{self.prefixes}
+"""
+        self.add(
+            "queryf",
+            f"""{header}SELECT ?count (COUNT(?count) AS ?frequency) WHERE {{{{
+{none_tabular}
+}}}}
+GROUP BY ?count
+ORDER BY DESC (?frequency)""",
+        )
+        self.add(
+            "queryex",
+            f"""{header}{none_tabular}
+HAVING (COUNT (?value) > 1)
+ORDER BY DESC(?count)""",
+        )
+        for database in ["qlever", "blazegraph", "other"]:
+            self.add(f"mfp_{database}", self.mfp_text(database))
+        # fragments of the generated naive and aggregate queries
+        self.add(
+            "generate_header",
+            f"""# truly tabular ${{mode}} query for
+# ${{qid}}:${{qlabel}}
+# generated by {self.script} version ${{version}} on ${{isodate}}
+{self.prefixes}
+SELECT ?${{item_var}} ?${{label_var}}""",
+        )
+        self.add("select_var", "\n  ?${var}")
+        self.add(
+            "select_list",
+            '\n  (GROUP_CONCAT (DISTINCT ?${var};SEPARATOR="${separator}") AS ?${var}_list)',
+        )
+        self.add("select_count", "\n  (COUNT (DISTINCT ?${var}) AS ?${var}_count)")
+        self.add("select_aggregate", "\n  (${func} (?${var}) AS ?${var}_${aggregate})")
+        self.add(
+            "generate_where",
+            """
+WHERE {
+  # instanceof ${qid}:${qlabel}
+  ?${item_var} ${predicate} wd:${qid}.
+  # label
+  ?${item_var} rdfs:label ?${label_var}.
+  FILTER (LANG(?${label_var}) = "${lang}").
+""",
+        )
+        self.add(
+            "optional",
+            """  # ${property_text}
+  OPTIONAL {
+    ?${item_var} wdt:${pid} ?${value_var}. """,
+        )
+        self.add(
+            "optional_label",
+            """
+    ?${value_var} rdfs:label ?${label_var}.
+    FILTER (LANG(?${label_var}) = "${lang}").""",
+        )
+        self.add("group_by", "GROUP BY\n  ?${item_var}\n  ?${label_var}\n")
+        self.add("having", "\n  ${delim}COUNT(?${var})<=1")
+
+    def mfp_text(self, database: str) -> str:
+        """
+        get the most frequently used properties query shape for the given database
+        """
+        text = f"""# get the most frequently used properties for
+# ${{item_text}}
+{self.prefixes}
+SELECT ?prop ?propLabel ?wbType ?count WHERE {{
+  {{"""
+        if database == "qlever":
+            text += """
+    SELECT ?p (COUNT(DISTINCT ?item) AS ?count) WHERE {"""
+        else:
+            text += """
+    SELECT ?prop (COUNT(DISTINCT ?item) AS ?count) WHERE {"""
+        if database == "blazegraph":
+            text += """
+      hint:Query hint:optimizer "None"."""
+        text += """
+      ${where_clause}"""
+        if database == "qlever":
+            text += """
+      ?item ql:has-predicate ?p
+    } GROUP BY ?p
+  }
+  ?prop wikibase:directClaim ?p."""
+        else:
+            text += """
+      ?prop wikibase:directClaim ?p.
+    }
+    GROUP BY ?prop ?propLabel
+  }"""
+        text += """
+  ?prop rdfs:label ?propLabel.
+  ?prop wikibase:propertyType ?wbType.
+  FILTER(LANG(?propLabel) = "${lang}").${min_count_filter}
+}
+ORDER BY DESC (?count)
+"""
+        return text
+
+    def render(self, name: str, **params) -> str:
+        text = self.templates[name].render(**params)
+        return text
+
+    @classmethod
+    def id_range(cls, shard: int) -> Tuple[str, str]:
+        """
+        get the range of the item ids starting with the digit shard+1 - the
+        ranges of all id_shards shards are contiguous in the sorted order
+
+        Args:
+            shard(int): the shard number - 0 for the ids starting with 1
+
+        Returns:
+            tuple: the first IRI of the shard and the first IRI after it
+        """
+        first = f"{cls.entity_prefix}Q{shard + 1}"
+        # ":" follows "9" in the sorted order
+        after = f"{cls.entity_prefix}Q{':' if shard == 8 else shard + 2}"
+        return first, after
+
+    @classmethod
+    def id_range_filter(cls, shard: int, database: str, var: str = "?item") -> str:
+        """
+        get the filter restricting the given variable to the id range of the given shard
+
+        Args:
+            shard(int): the shard number
+            database(str): the database type of the endpoint e.g. qlever
+            var(str): the item variable
+        """
+        first, after = cls.id_range(shard)
+        lower = cls.item_comparison(var, ">=", first, database)
+        upper = cls.item_comparison(var, "<", after, database)
+        id_filter = f"\n  FILTER({lower} && {upper})"
+        return id_filter
+
+    @staticmethod
+    def item_comparison(var: str, op: str, iri: str, database: str) -> str:
+        """
+        get the comparison of the given item variable with the given iri
+
+        Args:
+            var(str): the item variable e.g. ?item
+            op(str): the comparison operator e.g. >=
+            iri(str): the iri to compare with
+            database(str): the database type of the endpoint e.g. qlever
+        """
+        if database == "qlever":
+            # a range of the sorted ids of the index
+            comparison = f"{var} {op} <{iri}>"
+        else:
+            # standard SPARQL only compares literals
+            comparison = f'STR({var}) {op} "{iri}"'
+        return comparison
+
+    @staticmethod
+    def encode_try_it_url(query_text: str, baseurl: str, database: str) -> str:
+        """
+        get the try it url of the given query text - see Query.getTryItUrl
+        """
+        quoted = urllib.parse.quote(query_text)
+        delim = "/#" if database == "blazegraph" else "?query="
+        url = f"{baseurl}{delim}{quoted}"
+        return url
+
+    def try_it_url(self, query_text: str, baseurl: str, database: str) -> str:
+        """
+        get the memoized url encoded try it link for the given query text
+
+        Args:
+            query_text(str): the SPARQL query
+            baseurl(str): the website of the endpoint
+            database(str): the database type of the endpoint e.g. blazegraph
+
+        Returns:
+            str: the try it url
+        """
+        key = (query_text, baseurl, database)
+        url = self.links.get(key)
+        if url is None:
+            url = self.encode_try_it_url(query_text, baseurl, database)
+            self.links.put(key, url)
+        return url
+
+    def item_params(self, tt: TrulyTabular) -> Dict[str, str]:
+        """
+        get the parameters of the class analyzed by the given TrulyTabular
+        """
+        params = {
+            "qid": tt.itemQid,
+            "qlabel": tt.item.qlabel,
+            "item_text": f"{tt.itemQid}:{tt.item.qlabel}",
+            "predicate": tt.search_predicate,
+            "where": tt.where,
+            "lang": tt.lang,
+        }
+        return params
+
+    def property_params(
+        self, tt: TrulyTabular, wdProperty: WikidataProperty
+    ) -> Dict[str, str]:
+        """
+        get the parameters of the statistics queries of the given property
+        """
+        plabel = wdProperty.plabel
+        # work around https://github.com/RDFLib/sparqlwrapper/issues/211
+        if "described at" in plabel:
+            plabel = plabel.replace("described at", "describ'd at")
+        params = self.item_params(tt)
+        params.update(
+            pid=wdProperty.pid, plabel=plabel, property=wdProperty.getPredicate()
+        )
+        return params
+
+    def none_tabular_query(
+        self, tt: TrulyTabular, wdProperty: WikidataProperty, asFrequency: bool = True
+    ) -> str:
+        """
+        get the text of the non tabular entries query of the given property
+        - see TrulyTabular.noneTabularQuery
+
+        Args:
+            tt(TrulyTabular): the analysis
+            wdProperty(WikidataProperty): the property to analyze
+            asFrequency(bool): if true do a frequency analysis
+
+        Returns:
+            str: the query text
+        """
+        name = "queryf" if asFrequency else "queryex"
+        text = self.render(name, **self.property_params(tt, wdProperty))
+        return text
+
+    def property_statistic(
+        self,
+        tt: TrulyTabular,
+        wdProperty: WikidataProperty,
+        itemCount: int,
+        paginated: bool = False,
+    ) -> dict:
+        """
+        generate a property statistics row - see TrulyTabular.genWdPropertyStatistic
+
+        Args:
+            tt(TrulyTabular): the analysis
+            wdProperty(WikidataProperty): the property to get the statistics for
+            itemCount(int): the total number of items to check
+            paginated(bool): if True query the frequencies per id range and add them up
+
+        Returns:
+            dict: a statistics row
+        """
+        queryf = self.none_tabular_query(tt, wdProperty)
+        if paginated:
+            ntlod = self.paginated_frequencies(tt, wdProperty)
+        else:
+            with AdmissionController.get_instance().query():
+                ntlod = tt.sparql.queryAsListOfDicts(queryf)
+        statsRow = {"property": wdProperty.plabel}
+        total = 0
+        nttotal = 0
+        maxCount = 0
+        for record in ntlod:
+            f = int(record["frequency"])
+            count = int(record["count"])
+            if count > 1:
+                nttotal += f
+            else:
+                statsRow["1"] = f
+            if count > maxCount:
+                maxCount = count
+            total += f
+        statsRow["maxf"] = maxCount
+        statsRow["queryf"] = queryf
+        statsRow["queryex"] = self.none_tabular_query(tt, wdProperty, asFrequency=False)
+        tt.addStatsColWithPercent(statsRow, "total", total, itemCount)
+        tt.addStatsColWithPercent(statsRow, "non tabular", nttotal, total)
+        return statsRow
+
+    def paginated_frequencies(
+        self, tt: TrulyTabular, wdProperty: WikidataProperty
+    ) -> List[dict]:
+        """
+        get the exact value count frequencies of the given property with one
+        frequency query per id range - each query only groups the instances
+        of its range
+
+        Returns:
+            list: the count and frequency records like the frequency query
+        """
+        frequencies = collections.Counter()
+        params = self.property_params(tt, wdProperty)
+        database = tt.endpointConf.database
+        for shard in range(self.id_shards):
+            shard_params = dict(params)
+            shard_params["where"] = tt.where + self.id_range_filter(shard, database)
+            queryf = self.render("queryf", **shard_params)
+            with AdmissionController.get_instance().query():
+                shard_lod = tt.sparql.queryAsListOfDicts(queryf)
+            for record in shard_lod:
+                frequencies[int(record["count"])] += int(record["frequency"])
+        ntlod = [
+            {"count": count, "frequency": frequency}
+            for count, frequency in frequencies.most_common()
+        ]
+        return ntlod
+
+    def most_frequent_properties_query(self, tt: TrulyTabular, minCount: int = 0):
+        """
+        get the most frequently used properties query
+        - see TrulyTabular.mostFrequentPropertiesQuery
+
+        Args:
+            tt(TrulyTabular): the analysis
+            minCount(int): the minimum number of usages
+
+        Returns:
+            Query: the query
+        """
+        database = tt.endpointConf.database
+        if database not in ["qlever", "blazegraph"]:
+            database = "other"
+        params = self.item_params(tt)
+        where_clause = f"?item {tt.search_predicate} wd:{tt.itemQid}"
+        if database != "qlever":
+            where_clause += ";?p ?id"
+        params["where_clause"] = where_clause + "."
+        params["min_count_filter"] = (
+            f"\n  FILTER(?count >{minCount})." if minCount > 0 else ""
+        )
+        sparqlQuery = self.render(f"mfp_{database}", **params)
+        item_text = params["item_text"]
+        query = Query(
+            name=f"mostFrequentProperties for {item_text}",
+            query=sparqlQuery,
+            title=f"most frequently used properties for {tt.item.asText(long=True)}",
+        )
+        return query
+
+    def select_fragment(
+        self, wdProp: WikidataProperty, genList: list, listSeparator: str
+    ) -> str:
+        """
+        get the SELECT part of the given property for an aggregate query
+        """
+        parts = []
+        var = wdProp.valueVarname
+        for aggregate in genList:
+            if aggregate == "list":
+                parts.append(
+                    self.render("select_list", var=var, separator=listSeparator)
+                )
+            elif aggregate == "count":
+                parts.append(self.render("select_count", var=var))
+            elif aggregate == "label":
+                parts.append(self.render("select_var", var=wdProp.labelVarname))
+            elif aggregate == "ignore":
+                if "label" not in genList:
+                    parts.append(self.render("select_var", var=var))
+            else:
+                parts.append(
+                    self.render(
+                        "select_aggregate",
+                        var=var,
+                        func=aggregate.upper(),
+                        aggregate=aggregate,
+                    )
+                )
+        fragment = "".join(parts)
+        return fragment
+
+    def generate_query(
+        self,
+        tt: TrulyTabular,
+        genMap: dict,
+        listSeparator: str = "⇹",
+        naive: bool = True,
+        lang: str = "en",
+    ) -> str:
+        """
+        generate a SPARQL query from the precompiled fragments
+        - see TrulyTabular.generateSparqlQuery
+
+        Args:
+            tt(TrulyTabular): the analysis
+            genMap(dict): a dictionary of generation items aggregates/ignores/labels
+            listSeparator(str): the symbol to use as a list separator for GROUP_CONCAT
+            naive(bool): if True generate a naive query otherwise an aggregate query
+            lang(str): the language to generate for
+
+        Returns:
+            str: the generated SPARQL query
+        """
+        item = tt.item
+        properties = list(tt.properties.values())
+        params = {
+            "qid": item.qid,
+            "qlabel": item.qlabel,
+            "item_var": item.itemVarname,
+            "label_var": item.labelVarname,
+            "predicate": tt.search_predicate,
+            "lang": lang,
+        }
+        parts = [
+            self.render(
+                "generate_header",
+                mode="naive" if naive else "aggregate",
+                version=trulytabular.Version.version,
+                isodate=tt.isodate,
+                **params,
+            )
+        ]
+        for wdProp in properties:
+            if naive:
+                parts.append(self.render("select_var", var=wdProp.valueVarname))
+            elif wdProp.pid in genMap:
+                parts.append(
+                    self.select_fragment(wdProp, genMap[wdProp.pid], listSeparator)
+                )
+        parts.append(self.render("generate_where", **params))
+        for wdProp in properties:
+            parts.append(
+                self.render(
+                    "optional",
+                    item_var=item.itemVarname,
+                    property_text=str(wdProp),
+                    pid=wdProp.pid,
+                    value_var=wdProp.valueVarname,
+                )
+            )
+            if "label" in genMap.get(wdProp.pid, []):
+                parts.append(
+                    self.render(
+                        "optional_label",
+                        value_var=wdProp.valueVarname,
+                        label_var=wdProp.labelVarname,
+                        lang=lang,
+                    )
+                )
+            parts.append("\n  }\n")
+        parts.append("}\n")
+        if not naive:
+            parts.append(self.render("group_by", **params))
+            for wdProp in properties:
+                genList = genMap.get(wdProp.pid, [])
+                if "label" in genList:
+                    parts.append(self.render("select_var", var=wdProp.labelVarname))
+                if "ignore" in genList and "label" not in genList:
+                    parts.append(self.render("select_var", var=wdProp.valueVarname))
+            ignored = [
+                wdProp
+                for wdProp in properties
+                if "ignore" in genMap.get(wdProp.pid, [])
+            ]
+            if ignored:
+                parts.append("\nHAVING (")
+                for i, wdProp in enumerate(ignored):
+                    delim = "   " if i == 0 else "&& "
+                    parts.append(
+                        self.render("having", delim=delim, var=wdProp.valueVarname)
+                    )
+                parts.append("\n)")
+        sparqlQuery = "".join(parts)
+        return sparqlQuery
+
+    def benchmark(
+        self,
+        tt: TrulyTabular,
+        wdProperties: List[WikidataProperty],
+        baseurl: str,
+        database: str,
+        rounds: int = 3,
+    ) -> List[GenerationReport]:
+        """
+        compare the per property cost of generating the statistics queries and
+        their try it links by string building with the compiled templates
+
+        Args:
+            tt(TrulyTabular): the analysis
+            wdProperties(list): the properties to generate the queries for
+            baseurl(str): the website of the endpoint
+            database(str): the database type of the endpoint
+            rounds(int): the number of times to generate the queries of all properties
+
+        Returns:
+            list: the reports
+        """
+
+        def string_building():
+            for wdProperty in wdProperties:
+                for asFrequency in [True, False]:
+                    query = tt.noneTabularQuery(wdProperty, asFrequency=asFrequency)
+                    sparql = f"{self.try_it_comment}{query.query}"
+                    Query(name=query.name, query=sparql).getTryItUrl(
+                        baseurl=baseurl, database=database
+                    )
+
+        def compiled():
+            for wdProperty in wdProperties:
+                for asFrequency in [True, False]:
+                    text = self.none_tabular_query(tt, wdProperty, asFrequency)
+                    self.try_it_url(f"{self.try_it_comment}{text}", baseurl, database)
+
+        reports = []
+        for name, generate in [
+            ("string building (current)", string_building),
+            ("compiled templates", compiled),
+        ]:
+            start = time.perf_counter()
+            for _round in range(rounds):
+                generate()
+            seconds = time.perf_counter() - start
+            reports.append(GenerationReport(name, rounds * len(wdProperties), seconds))
+        return reports
@@ -0,0 +1,223 @@
+"""
+Created on 2026-10-19
+
+@author: wf
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from lodstorage.query import Endpoint
+from lodstorage.sparql import SPARQL
+
+from wd.sparql_results import SparqlResultReader
+from wd.tracing import TracedSPARQL
+
+
+class SubclassClosureIndex:
+    """
+    locally stored subclass closure (wdt:P279*) of target classes
+
+    with the closure available the transitive search predicate
+    wdt:P31/wdt:P279* can be replaced by a plain wdt:P31 lookup
+    against an explicit VALUES list of classes so that the endpoint
+    does not need to evaluate the transitive closure for every
+    count, property and statistics query
+    """
+
+    transitive_predicate = "wdt:P31/wdt:P279*"
+    class_var = "ttClass"
+
+    _instance: Optional["SubclassClosureIndex"] = None
+    _instance_lock = threading.Lock()
+
+    def __init__(
+        self,
+        cache_dir: str = None,
+        ttl: float = 7 * 24 * 3600,
+        max_values: int = 5000,
+    ):
+        """
+        constructor
+
+        Args:
+            cache_dir(str): the directory to store the closures in
+            ttl(float): the time to live of a stored closure in seconds
+            max_values(int): the maximum closure size to rewrite queries for
+        """
+        if cache_dir is None:
+            cache_dir = os.path.join(Path.home(), ".wdgrid", "subclass_closure")
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_values = max_values
+        self.closures: Dict[tuple, dict] = {}
+        self.lock = threading.Lock()
+
+    @classmethod
+    def get_instance(cls) -> "SubclassClosureIndex":
+        """
+        get the process wide subclass closure index
+        """
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = SubclassClosureIndex()
+        return cls._instance
+
+    def get_path(self, qid: str, endpoint_name: str) -> str:
+        """
+        get the path of the stored closure for the given class and endpoint
+        """
+        path = os.path.join(self.cache_dir, f"{endpoint_name}_{qid}.json")
+        return path
+
+    @staticmethod
+    def closure_query(qid: str) -> str:
+        """
+        get the query for the subclass closure of the given class
+        """
+        query = f"""# subclass closure of {qid}
+PREFIX wd: <http://www.wikidata.org/entity/>
+PREFIX wdt: <http://www.wikidata.org/prop/direct/>
+SELECT DISTINCT ?class WHERE {{
+  ?class wdt:P279* wd:{qid}.
+}}"""
+        return query
+
+    def fetch(self, qid: str, endpoint: Endpoint) -> dict:
+        """
+        fetch the subclass closure of the given class from the given endpoint
+        and store it locally
+
+        Returns:
+            dict: the closure record
+        """
+        reader = SparqlResultReader(endpoint)
+        columns = reader.query_as_columns(self.closure_query(qid))
+        classes = sorted(
+            {
+                url.replace("http://www.wikidata.org/entity/", "")
+                for url in columns.get("class", [])
+                if url
+            }
+        )
+        record = {
+            "qid": qid,
+            "endpoint": endpoint.name,
+            "timestamp": time.time(),
+            "classes": classes,
+        }
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(self.get_path(qid, endpoint.name), "w") as json_file:
+            json.dump(record, json_file)
+        return record
+
+    def is_fresh(self, record: Optional[dict]) -> bool:
+        fresh = record is not None and time.time() - record["timestamp"] <= self.ttl
+        return fresh
+
+    def get_closure(self, qid: str, endpoint: Endpoint) -> List[str]:
+        """
+        get the subclass closure of the given class - from memory, the
+        local store or the endpoint in that order
+
+        Args:
+            qid(str): the class e.g. Q5
+            endpoint(Endpoint): the endpoint to fetch the closure from
+
+        Returns:
+            list: the qids of the class and all its transitive subclasses
+        """
+        key = (qid, endpoint.name)
+        with self.lock:
+            record = self.closures.get(key, None)
+            if not self.is_fresh(record):
+                record = None
+                path = self.get_path(qid, endpoint.name)
+                if os.path.isfile(path):
+                    with open(path) as json_file:
+                        record = json.load(json_file)
+                if not self.is_fresh(record):
+                    record = self.fetch(qid, endpoint)
+                self.closures[key] = record
+        return record["classes"]
+
+    def rewrite(self, query: str, qid: str, classes: List[str]) -> str:
+        """
+        rewrite the transitive search predicate of the given query
+        to a wdt:P31 lookup against an explicit VALUES list of classes
+
+        Args:
+            query(str): the SPARQL query
+            qid(str): the class the query is about
+            classes(list): the subclass closure of the class
+
+        Returns:
+            str: the rewritten query or the original one if it
+            does not use the transitive predicate or the closure is too large
+        """
+        if not classes or len(classes) > self.max_values:
+            return query
+        pattern = re.compile(
+            re.escape(f"{self.transitive_predicate} wd:{qid}") + r"(?![0-9])"
+        )
+        match = pattern.search(query)
+        if match is None:
+            return query
+        group_start = query.rfind("{", 0, match.start())
+        if group_start < 0:
+            return query
+        values = " ".join(f"wd:{cls}" for cls in classes)
+        values_clause = f"\n  VALUES ?{self.class_var} {{ {values} }}"
+        rewritten = (
+            query[: group_start + 1]
+            + values_clause
+            + query[group_start + 1 : match.start()]
+            + f"wdt:P31 ?{self.class_var}"
+            + query[match.end() :]
+        )
+        return rewritten
+
+
+class ClosureRewritingSPARQL(TracedSPARQL):
+    """
+    SPARQL access rewriting transitive subclass queries for one class
+    with a precomputed subclass closure
+    """
+
+    def __init__(
+        self,
+        sparql: SPARQL,
+        endpoint: Endpoint,
+        qid: str,
+        index: SubclassClosureIndex,
+    ):
+        """
+        constructor
+
+        Args:
+            sparql(SPARQL): the SPARQL access to wrap keeping its rate limit
+                and user agent
+            endpoint(Endpoint): the endpoint configuration
+            qid(str): the class whose transitive queries should be rewritten
+            index(SubclassClosureIndex): the closure index to use
+        """
+        super().__init__(sparql, endpoint_name=endpoint.name)
+        self.qid = qid
+        self.index = index
+        self.classes = index.get_closure(qid, endpoint)
+
+    def rewrite(self, query: str) -> str:
+        rewritten = self.index.rewrite(query, self.qid, self.classes)
+        return rewritten
+
+    def rawQuery(self, queryString: str, method="POST"):
+        """
+        rewrite and run the given query
+        """
+        bindings = super().rawQuery(self.rewrite(queryString), method=method)
+        return bindings
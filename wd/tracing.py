@@ -0,0 +1,419 @@
+"""
+Created on 2026-10-19
+
+@author: wf
+"""
+
+import collections
+import contextlib
+import contextvars
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+import urllib.request
+from typing import Any, Deque, Dict, List, Optional
+
+from lodstorage.sparql import SPARQL
+
+from wd.admission import AdmissionController
+
+
+class Span:
+    """
+    a timed operation of a trace with attributes
+    """
+
+    def __init__(
+        self,
+        name: str,
+        trace_id: str,
+        parent_id: Optional[str] = None,
+        attributes: Dict[str, Any] = None,
+    ):
+        """
+        constructor
+
+        Args:
+            name(str): the name of the operation
+            trace_id(str): the 32 hex digit id of the trace
+            parent_id(str): the 16 hex digit id of the parent span if any
+            attributes(dict): the attributes of the span
+        """
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.attributes["thread"] = threading.current_thread().name
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.error: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def set_attributes(self, **attributes):
+        self.attributes.update(attributes)
+
+    @property
+    def duration(self) -> float:
+        """
+        the duration in seconds - up to now if the span has not ended yet
+        """
+        end_ns = self.end_ns or time.time_ns()
+        duration = (end_ns - self.start_ns) / 1e9
+        return duration
+
+    def to_dict(self) -> dict:
+        record = {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration": round(self.duration, 6),
+            "status": "ERROR" if self.error else "OK",
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+        return record
+
+    @staticmethod
+    def otlp_value(value: Any) -> dict:
+        if isinstance(value, bool):
+            return {"boolValue": value}
+        if isinstance(value, int):
+            return {"intValue": str(value)}
+        if isinstance(value, float):
+            return {"doubleValue": value}
+        return {"stringValue": str(value)}
+
+    def to_otlp(self) -> dict:
+        """
+        get this span in the OTLP/HTTP JSON encoding
+        """
+        otlp_span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 1,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or time.time_ns()),
+            "attributes": [
+                {"key": key, "value": self.otlp_value(value)}
+                for key, value in self.attributes.items()
+                if value is not None
+            ],
+            "status": (
+                {"code": 2, "message": self.error} if self.error else {"code": 1}
+            ),
+        }
+        if self.parent_id:
+            otlp_span["parentSpanId"] = self.parent_id
+        return otlp_span
+
+
+class JsonlSpanExporter:
+    """
+    append finished spans as json lines to a local file
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+
+    def export(self, spans: List[Span]):
+        with self.lock, open(self.path, "a") as jsonl_file:
+            for span in spans:
+                jsonl_file.write(json.dumps(span.to_dict(), default=str) + "\n")
+
+    def shutdown(self):
+        pass
+
+
+class OtlpHttpExporter:
+    """
+    export finished spans in batches to an OTLP/HTTP JSON collector
+    """
+
+    def __init__(
+        self,
+        endpoint: str,
+        service_name: str = "wdgrid",
+        batch_size: int = 256,
+        flush_interval: float = 5.0,
+    ):
+        """
+        constructor
+
+        Args:
+            endpoint(str): the collector base url e.g. http://localhost:4318
+            service_name(str): the service.name resource attribute
+            batch_size(int): the number of spans that trigger a flush
+            flush_interval(float): the maximum time between flushes in seconds
+        """
+        self.url = endpoint.rstrip("/")
+        if not self.url.endswith("/v1/traces"):
+            self.url += "/v1/traces"
+        self.service_name = service_name
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue: Deque[Span] = collections.deque(maxlen=10000)
+        self.wakeup = threading.Event()
+        self.stopped = False
+        self.thread = threading.Thread(
+            target=self.flush_loop, name="wdgrid-otlp-exporter", daemon=True
+        )
+        self.thread.start()
+
+    def export(self, spans: List[Span]):
+        self.queue.extend(spans)
+        if len(self.queue) >= self.batch_size:
+            self.wakeup.set()
+
+    def payload(self, spans: List[Span]) -> dict:
+        """
+        get the OTLP/HTTP JSON export request for the given spans
+        """
+        payload = {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": [
+                            {
+                                "key": "service.name",
+                                "value": {"stringValue": self.service_name},
+                            }
+                        ]
+                    },
+                    "scopeSpans": [
+                        {
+                            "scope": {"name": "wd.tracing"},
+                            "spans": [span.to_otlp() for span in spans],
+                        }
+                    ],
+                }
+            ]
+        }
+        return payload
+
+    def flush(self):
+        spans = []
+        while self.queue:
+            spans.append(self.queue.popleft())
+        if not spans:
+            return
+        data = json.dumps(self.payload(spans)).encode("utf-8")
+        request = urllib.request.Request(
+            self.url,
+            data=data,
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=10) as response:
+                response.read()
+        except Exception as ex:
+            logging.warning(f"could not export {len(spans)} spans to {self.url}: {ex}")
+
+    def flush_loop(self):
+        while not self.stopped:
+            self.wakeup.wait(self.flush_interval)
+            self.wakeup.clear()
+            self.flush()
+
+    def shutdown(self):
+        self.stopped = True
+        self.wakeup.set()
+        self.flush()
+
+
+class Tracer:
+    """
+    structured tracing of the truly tabular pipeline
+
+    spans are only recorded if at least one exporter is configured - see
+    from_environment - otherwise span() is a no-op context yielding None.
+    The current span is tracked per thread/task with a context variable -
+    work handed to other threads needs to pass its parent explicitly
+    """
+
+    _instance: Optional["Tracer"] = None
+    _instance_lock = threading.Lock()
+    trace_file_env = "WDGRID_TRACE_FILE"
+    otlp_endpoint_env = "OTEL_EXPORTER_OTLP_ENDPOINT"
+
+    def __init__(self, exporters: List = None, keep: int = 5000):
+        """
+        constructor
+
+        Args:
+            exporters(list): the exporters to hand finished spans to
+            keep(int): the number of finished spans to keep for summaries
+        """
+        self.exporters = exporters or []
+        self.current: contextvars.ContextVar = contextvars.ContextVar(
+            "wdgrid_span", default=None
+        )
+        self.finished: Deque[Span] = collections.deque(maxlen=keep)
+
+    @classmethod
+    def from_environment(cls) -> "Tracer":
+        """
+        create a tracer with the exporters configured by the
+        WDGRID_TRACE_FILE and OTEL_EXPORTER_OTLP_ENDPOINT environment variables
+        """
+        exporters = []
+        trace_file = os.environ.get(cls.trace_file_env, None)
+        if trace_file:
+            exporters.append(JsonlSpanExporter(trace_file))
+        otlp_endpoint = os.environ.get(cls.otlp_endpoint_env, None)
+        if otlp_endpoint:
+            exporters.append(OtlpHttpExporter(otlp_endpoint))
+        tracer = cls(exporters)
+        return tracer
+
+    @classmethod
+    def get_instance(cls) -> "Tracer":
+        """
+        get the process wide tracer
+        """
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls.from_environment()
+        return cls._instance
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.exporters)
+
+    def current_span(self) -> Optional[Span]:
+        return self.current.get()
+
+    @contextlib.contextmanager
+    def span(self, name: str, parent: Optional[Span] = None, **attributes):
+        """
+        trace the enclosed block as a span
+
+        Args:
+            name(str): the name of the span
+            parent(Span): the parent span - default: the current span of this context
+            **attributes: the attributes of the span
+
+        Yields:
+            Span: the span or None if tracing is disabled
+        """
+        if not self.exporters:
+            yield None
+            return
+        parent = parent or self.current.get()
+        trace_id = parent.trace_id if parent else secrets.token_hex(16)
+        parent_id = parent.span_id if parent else None
+        span = Span(name, trace_id, parent_id, attributes)
+        token = self.current.set(span)
+        try:
+            yield span
+        except BaseException as ex:
+            span.error = f"{type(ex).__name__}: {ex}"
+            raise
+        finally:
+            self.current.reset(token)
+            self.end(span)
+
+    def end(self, span: Span):
+        """
+        end the given span and export it
+        """
+        span.end_ns = time.time_ns()
+        self.finished.append(span)
+        for exporter in self.exporters:
+            try:
+                exporter.export([span])
+            except Exception as ex:
+                logging.warning(f"could not export span {span.name}: {ex}")
+
+    @staticmethod
+    def summary(spans: List[Span]) -> Dict[str, Any]:
+        """
+        get the critical path latency and the concurrency utilization of a trace
+
+        Args:
+            spans(list): the finished spans of one trace
+
+        Returns:
+            dict: wall time, busy time of the SPARQL calls, their concurrency
+            utilization and the slowest child of each span along the critical path
+        """
+        if not spans:
+            return {}
+        start = min(span.start_ns for span in spans)
+        end = max(span.end_ns or span.start_ns for span in spans)
+        wall = (end - start) / 1e9
+        sparql_spans = [span for span in spans if span.name == "sparql"]
+        busy = sum(span.duration for span in sparql_spans)
+        children = collections.defaultdict(list)
+        for span in spans:
+            children[span.parent_id].append(span)
+        critical_path = []
+        level = children.get(None, [])
+        while level:
+            slowest = max(level, key=lambda span: span.duration)
+            critical_path.append(f"{slowest.name}: {slowest.duration:.3f}s")
+            level = children.get(slowest.span_id, [])
+        summary = {
+            "wall": round(wall, 3),
+            "sparql calls": len(sparql_spans),
+            "sparql busy": round(busy, 3),
+            "utilization": round(busy / wall, 2) if wall else None,
+            "critical path": critical_path,
+        }
+        return summary
+
+    def trace_summary(self, trace_id: str) -> Dict[str, Any]:
+        spans = [span for span in list(self.finished) if span.trace_id == trace_id]
+        summary = self.summary(spans)
+        return summary
+
+    def shutdown(self):
+        for exporter in self.exporters:
+            exporter.shutdown()
+
+
+class TracedSPARQL(SPARQL):
+    """
+    SPARQL access tracing every query as a span
+
+    wraps an existing SPARQL access instead of creating a new client so
+    that the rate limit, the authentication and the user agent of the
+    endpoint are kept - all higher level queries go through rawQuery
+    """
+
+    def __init__(self, sparql: SPARQL, endpoint_name: str = None):
+        """
+        constructor
+
+        Args:
+            sparql(SPARQL): the SPARQL access to wrap
+            endpoint_name(str): the name of the endpoint for the spans
+        """
+        # share the client and the rate limiter of the wrapped access
+        self.__dict__.update(sparql.__dict__)
+        self.wrapped = sparql
+        self.endpoint_name = endpoint_name or sparql.url
+        self.tracer = Tracer.get_instance()
+
+    def rawQuery(self, queryString: str, method="POST"):
+        """
+        run the given query inside a sparql span and a query slot
+        """
+        with AdmissionController.get_instance().query(), self.tracer.span(
+            "sparql", endpoint=self.endpoint_name, query_length=len(queryString)
+        ) as span:
+            bindings = self.wrapped.rawQuery(queryString, method=method)
+            if span is not None and hasattr(bindings, "__len__"):
+                span.set_attribute("rows", len(bindings))
+        return bindings
@@ -6,22 +6,47 @@ Created on 2024-01-04
 
 import asyncio
 import collections
+import contextlib
+import json
+import logging
 import os
+import threading
+import time
 from dataclasses import dataclass
 from typing import Dict, List, Optional, Tuple
 from urllib.error import HTTPError
 
-from ez_wikidata.trulytabular import TrulyTabular
 from lodstorage.query import Endpoint, EndpointManager, Query
 from ngwidgets.lod_grid import GridConfig, ListOfDictsGrid
 from ngwidgets.progress import NiceguiProgressbar
 from ngwidgets.widgets import Lang, Link
-from nicegui import run, ui
+from nicegui import core, run, ui
 from numpy.random.mtrand import pareto
 from SPARQLWrapper.SPARQLExceptions import EndPointInternalError
 
+from wd.admission import AdmissionController
+from wd.class_profile import ClassProfile, ClassProfileStore, ProfileRefresh
+from wd.class_slice import ClassSlice
+from wd.cooccurrence import CooccurrenceAnalysis
+from wd.cost_model import QueryCostModel, QueryPlan
+from wd.generation_spec import GenerationSpecState
+from wd.item_cache import ItemCache
+from wd.label_service import LabelEntry, LabelService
 from wd.pareto import Pareto
+from wd.pareto_analysis import CoverageAnalysis, ParetoTable
+from wd.profiler import SamplingProfiler
+from wd.property_payload import CompactPropertyPayload
+from wd.property_rows import PropertyRowStore
+from wd.property_superset import PropertySuperset, StatsCache
+from wd.property_store import PropertyStore
 from wd.query_view import QueryView
+from wd.session_registry import SessionRegistry
+from wd.sketches import ApproximateStatistics
+from wd.sparql_results import SparqlResultReader
+from wd.sparql_templates import SparqlTemplates
+from wd.subclass_index import ClosureRewritingSPARQL, SubclassClosureIndex
+from wd.tracing import TracedSPARQL, Tracer
+from wd.warmup import RateLimiter
 
 
 @dataclass
@@ -41,6 +66,29 @@ class TrulyTabularConfig:
     pareto_level = 1
     # minimum percentual frequency of availability
     min_property_frequency = 20.0
+    # target statement coverage in percent choosing the min% - 0 for off
+    coverage_target = 0.0
+    # send the property grid rows in the compact wire format
+    compact_payload = False
+    # number of properties above which the property grid is paged server side
+    virtualize_threshold = 500
+    grid_page_size = 100
+    # rewrite wdt:P31/wdt:P279* queries with a locally stored subclass closure
+    use_subclass_index = False
+    # limits of the property co-occurrence analysis
+    cooccurrence_max_properties = 40
+    cooccurrence_max_instances = 1000000
+    # compute the property statistics from locally materialized triples
+    materialize = False
+    materialize_max_triples = 2000000
+    # estimate the property statistics with sketches of sharded streamed results
+    approximate = False
+    approximate_shards = 9
+    approximate_workers = 1
+    # choose the statistics strategy with the query cost model
+    auto_strategy = True
+    # relative count change up to which stored statistics are reused on refresh
+    profile_tolerance = 0.02
 
     @classmethod
     def get_endpoints_path(cls) -> str:
@@ -104,6 +152,13 @@ class TrulyTabularConfig:
             webserver.add_select("Pareto level", self.pareto_select).bind_value(
                 self, "pareto_level"
             )
+            ui.checkbox("compact grid payload").bind_value(self, "compact_payload")
+            ui.checkbox("subclass closure index").bind_value(
+                self, "use_subclass_index"
+            )
+            ui.checkbox("materialize class slice").bind_value(self, "materialize")
+            ui.checkbox("approximate statistics").bind_value(self, "approximate")
+            ui.checkbox("auto strategy").bind_value(self, "auto_strategy")
 
 
 class PropertySelection:
@@ -127,22 +182,72 @@ class PropertySelection:
             paretolLevels: a dict of paretoLevels with the key corresponding to the level
             minFrequency(float): the minimum frequency of the properties to select in percent
         """
-        self.propertyMap: Dict[str, dict] = dict()
+        self._propertyMap: Dict[str, dict] = dict()
         self.headerMap = {}
-        self.propertyList = []
+        self._propertyList = []
+        # columnar rows of an idle session - see compact
+        self.row_store: Optional[PropertyRowStore] = None
+        # the number of instances using each property by property id - the
+        # count column of the rows is the count aggregate checkbox after prepare
+        self.usage_counts: Dict[str, int] = {}
         self.total = total
         self.paretoLevels = paretoLevels
+        self.paretoTable = ParetoTable(paretoLevels)
         self.minFrequency = minFrequency
         for record in inputList:
             ratio = int(record["count"]) / self.total
             level = self.getParetoLevel(ratio)
             record["%"] = f"{ratio*100:.1f}"
             record["pareto"] = level
+            property_id = str(record["prop"]).rsplit("/", 1)[-1]
+            self.usage_counts[property_id] = int(record["count"])
             # if record["pareto"]<=paretoLimit:
             orecord = collections.OrderedDict(record.copy())
             self.propertyList.append(orecord)
         pass
 
+    @property
+    def propertyList(self) -> List[dict]:
+        if self.row_store is not None:
+            self.expand()
+        return self._propertyList
+
+    @propertyList.setter
+    def propertyList(self, property_list: List[dict]):
+        self.row_store = None
+        self._propertyList = property_list
+
+    @property
+    def propertyMap(self) -> Dict[str, dict]:
+        if self.row_store is not None:
+            self.expand()
+        return self._propertyMap
+
+    @propertyMap.setter
+    def propertyMap(self, property_map: Dict[str, dict]):
+        self._propertyMap = property_map
+
+    def compact(self):
+        """
+        keep my rows in columnar form instead of one dict per property
+        until they are accessed again
+        """
+        if self.row_store is None and self._propertyList:
+            self.row_store = PropertyRowStore.from_lod(self._propertyList)
+            self._propertyList = []
+            self._propertyMap = {}
+
+    def expand(self):
+        """
+        restore the dict per property rows of my compacted row store
+        """
+        row_store = self.row_store
+        self.row_store = None
+        self._propertyList = [row_store.get_row(i) for i in range(row_store.size)]
+        self._propertyMap = {
+            row["propertyId"]: row for row in self._propertyList if "propertyId" in row
+        }
+
     @property
     def aggregates(self) -> list:
         aggregates = ["min", "max", "avg", "sample", "list", "count"]
@@ -163,12 +268,16 @@ class PropertySelection:
         return checkbox_cols
 
     def getParetoLevel(self, ratio):
-        level = 0
-        for pareto in reversed(self.paretoLevels.values()):
-            if pareto.ratioInLevel(ratio):
-                level = pareto.level
+        level = self.paretoTable.level_of(ratio)
         return level
 
+    def usage_count(self, property_id: str) -> int:
+        """
+        get the number of instances using the given property
+        """
+        count = self.usage_counts.get(property_id, 0)
+        return count
+
     def getInfoHeaderColumn(self, col: str) -> str:
         href = f"https://wiki.bitplan.com/index.php/Truly_Tabular_RDF/Info#{col}"
         info = f"{col}<br><a href='{href}'style='color:white' target='_blank'>ⓘ</a>"
@@ -197,13 +306,12 @@ class PropertySelection:
                 selected.append((propertyId, propRecord))
         return selected
 
-    def prepare(self):
+    def prepare(self, compact: bool = False):
         """
         prepare the propertyList
 
         Args:
-            total(int): the total number of records
-            paretoLevels(list): the pareto Levels to use
+            compact(bool): if True keep the plain property label instead of a html link
         """
 
         self.headerMap = {}
@@ -233,7 +341,7 @@ class PropertySelection:
             url = prop.pop("prop")
             itemId = url.replace("http://www.wikidata.org/entity/", "")
             prop["propertyId"] = itemId
-            prop["property"] = Link.create(url, propLabel)
+            prop["property"] = propLabel if compact else Link.create(url, propLabel)
             prop["type"] = prop.pop("wbType").replace("http://wikiba.se/ontology#", "")
             prop["1"] = ""
             prop["maxf"] = ""
@@ -246,8 +354,9 @@ class PropertySelection:
             prop["count"] = prop.pop("count")
             for col in self.checkbox_cols:
                 prop[col] = False
-
-            self.propertyMap[itemId] = prop
+        # plain dicts need less memory than the OrderedDicts used for reordering
+        self.propertyList = [dict(prop) for prop in self.propertyList]
+        self.propertyMap = {prop["propertyId"]: prop for prop in self.propertyList}
 
 
 class TrulyTabularDisplay:
@@ -265,9 +374,67 @@ class TrulyTabularDisplay:
         self.search_predicate = "wdt:P31"
         self.qid = qid
         self.tt = None
+        self.property_store = PropertyStore.get_instance()
+        self.item_cache = ItemCache.get_instance()
         self.naive_query_view = None
         self.aggregate_query_view = None
+        # compact wire format - only set if config.compact_payload is active
+        self.payload = None
+        # statistic query texts by property id for try it links generated on click
+        self.stats_queries: Dict[str, Dict[str, str]] = {}
+        # superset of the property table fetched at the lowest min count so far
+        # and the statistics computed for it - for the analysis key
+        self.analysis_key = None
+        self.property_superset: Optional[PropertySuperset] = None
+        # the language the labels of the property superset have been queried in
+        self.superset_lang = None
+        self.stats_cache = StatsCache()
+        self.property_selection = None
+        self.view_lod = None
+        # server side generation spec state - selection and checkbox flags
+        self.gen_specs = None
+        # server side row model - only set for large property lists
+        self.row_store = None
+        self.window_keys = set()
+        self.window_start = 0
+        self.window_sort_col = None
+        self.window_descending = False
+        self.window_filter = ""
+        # property co-occurrence analysis - for the analysis key
+        self.cooccurrence = None
+        self.cooccurrence_key = None
+        self.cooccurrence_grid = None
+        # locally materialized triples of the class - for the analysis key
+        self.class_slice = None
+        self.class_slice_key = None
+        self.preview_grid = None
+        # sketch based approximate statistics - for the analysis key
+        self.approximate = None
+        self.approximate_key = None
+        # the strategy chosen by the query cost model for the statistics
+        self.cost_model = QueryCostModel.get_instance()
+        self.stats_plan: Optional[QueryPlan] = None
+        # on demand profiling - the profile is only set if the profiler is armed
+        self.profiler = SamplingProfiler.get_instance()
+        self.profile = None
+        # tracing spans - only recorded if an exporter is configured
+        self.tracer = Tracer.get_instance()
+        self.stats_parent_span = None
+        # server wide fair share admission of analyses and queries
+        self.admission = AdmissionController.get_instance()
+        self.queued = False
+        # idle session memory reclamation - see SessionRegistry
+        self.last_activity = time.monotonic()
+        self.idle_state = "active"
+        # number of running stages and queued or running analyses
+        self.busy_count = 0
+        self.busy_lock = threading.Lock()
         self.setup()
+        registry = SessionRegistry.get_instance()
+        registry.register(self)
+        # a reconnecting client gets its session back
+        self.solution.client.on_connect(lambda: registry.register(self))
+        self.solution.client.on_disconnect(lambda: registry.unregister(self))
 
     async def ui_yield(self):
         await asyncio.sleep(0)  # allow other tasks to run on the event loop
@@ -293,6 +460,12 @@ class TrulyTabularDisplay:
         set up the user interface
         """
         with ui.element("div").classes("w-full") as self.main_container:
+            with ui.row() as self.idle_row:
+                ui.label(
+                    "the analysis state has been released after inactivity to save memory"
+                )
+                ui.button("reload analysis", on_click=self.update_display)
+            self.idle_row.set_visibility(False)
             with ui.splitter() as splitter:
                 with splitter.before:
                     with ui.row() as self.sp_row:
@@ -324,10 +497,20 @@ class TrulyTabularDisplay:
                             self.config.pareto_select,
                             on_change=self.on_pareto_change,
                         ).bind_value(self.config, "pareto_level")
+                        self.solution.add_select(
+                            "lang",
+                            self.config.languages,
+                            with_input=True,
+                            on_change=self.on_lang_change,
+                        ).bind_value(self.config, "lang")
                         self.min_property_frequency_input = ui.input(
                             "min%",
                             value=str(self.config.min_property_frequency),
                         ).on("keydown.enter", self.on_min_property_frequency_change)
+                        self.coverage_input = ui.input(
+                            "coverage%",
+                            value=str(self.config.coverage_target),
+                        ).on("keydown.enter", self.on_coverage_change)
                 with splitter.after as self.query_display_container:
                     self.count_query_view = QueryView(
                         self.solution,
@@ -344,16 +527,236 @@ class TrulyTabularDisplay:
                     "Generate SPARQL queries", on_click=self.on_generate_button_click
                 )
                 self.generate_button.disable()
+                self.cooccurrence_button = ui.button(
+                    "Co-occurrence", on_click=self.on_cooccurrence_button_click
+                )
+                self.cooccurrence_button.disable()
+                ui.button("save profile", on_click=self.on_save_profile_click)
+                ui.button("refresh profile", on_click=self.on_refresh_profile_click)
             with ui.row() as self.progressbar_row:
                 self.progress_bar = NiceguiProgressbar(
                     total=0, desc="Property statistics", unit="prop"
                 )
+            with ui.column().classes("w-full") as self.cooccurrence_row:
+                self.cooccurrence_label = ui.label()
+            self.cooccurrence_row.set_visibility(False)
+            with ui.row() as self.grid_window_row:
+                ui.input("filter", on_change=self.on_window_change).bind_value(
+                    self, "window_filter"
+                )
+                ui.select(
+                    ["#", "%", "pareto", "property", "propertyId", "type", "count"],
+                    label="sort by",
+                    on_change=self.on_window_change,
+                ).bind_value(self, "window_sort_col")
+                ui.checkbox("descending", on_change=self.on_window_change).bind_value(
+                    self, "window_descending"
+                )
+                ui.button("◀", on_click=lambda: self.move_window(-1))
+                ui.button("▶", on_click=lambda: self.move_window(1))
+                ui.button("select all", on_click=lambda: self.select_all_window(True))
+                ui.button("select none", on_click=lambda: self.select_all_window(False))
+                self.grid_window_label = ui.label()
+            self.grid_window_row.set_visibility(False)
             with ui.row() as self.property_grid_row:
                 config = GridConfig(multiselect=True)
                 self.property_grid = ListOfDictsGrid(config=config)
+                self.property_grid.ag_grid.on(
+                    "cellClicked", self.on_property_grid_cell_clicked
+                )
+                self.property_grid.ag_grid.on(
+                    "rowSelected", self.on_property_grid_row_selected
+                )
+                self.property_grid.ag_grid.on(
+                    "cellValueChanged", self.on_property_grid_cell_value_changed
+                )
         # immediately do an async call of update view
         ui.timer(0, self.update_display, once=True)
 
+    @contextlib.contextmanager
+    def stage(self, name: str, parent=None, **attributes):
+        """
+        run the enclosed block as a stage of the analysis - it is
+        traced as a span and sampled if the analysis is profiled
+
+        Args:
+            name(str): the name of the stage
+            parent(Span): the parent span if the stage runs in another thread
+            **attributes: the span attributes
+
+        Yields:
+            Span: the span or None if tracing is disabled
+        """
+        with self.busy(), self.profiler.stage(self.profile, name), self.tracer.span(
+            name, parent=parent, **attributes
+        ) as span:
+            yield span
+
+    @contextlib.contextmanager
+    def busy(self):
+        """
+        mark this session as busy while the enclosed block runs - busy
+        sessions are never compacted or dropped by the SessionRegistry
+        """
+        with self.busy_lock:
+            self.busy_count += 1
+        try:
+            yield
+        finally:
+            with self.busy_lock:
+                self.busy_count -= 1
+                # the end of a long analysis counts as activity
+                self.last_activity = time.monotonic()
+
+    @property
+    def is_busy(self) -> bool:
+        return self.busy_count > 0
+
+    async def run_analysis(self, func):
+        """
+        run the given analysis in a fair share analysis slot
+
+        Args:
+            func(Callable): the blocking analysis function
+        """
+        with self.busy():
+            await self.admission.run_admitted(
+                "analysis",
+                func,
+                client_id=self.solution.client.id,
+                on_wait=self.on_admission_wait,
+            )
+
+    @property
+    def label_service(self) -> LabelService:
+        """
+        the batched multilingual labels of my endpoint shared by all sessions
+        """
+        label_service = LabelService.get_instance(self.config.endpoint_name)
+        return label_service
+
+    @property
+    def session_name(self) -> str:
+        client_id = self.solution.client.id
+        name = f"{client_id[:8]} {self.qid} {self.search_predicate}"
+        return name
+
+    def touch(self) -> bool:
+        """
+        note user activity in this session
+
+        Returns:
+            bool: True if the heavy state of this session had been dropped
+        """
+        self.last_activity = time.monotonic()
+        dropped = self.idle_state == "dropped"
+        if self.idle_state == "compacted":
+            if self.view_lod is None and self.property_selection is not None:
+                self.view_lod = self.property_selection.propertyList
+            self.idle_state = "active"
+        return dropped
+
+    def compact_state(self):
+        """
+        release the state of an idle session that can be recomputed
+        from the shared caches without a visible change
+        """
+        self.property_superset = None
+        self.stats_cache = StatsCache()
+        self.stats_queries = {}
+        self.cooccurrence = None
+        self.class_slice = None
+        self.approximate = None
+        if self.property_selection is not None and (self.payload or self.row_store):
+            # the grid does not share the rows of the property selection
+            self.property_selection.compact()
+            if not self.payload:
+                self.view_lod = None
+        self.idle_state = "compacted"
+
+    def drop_state(self):
+        """
+        release the heavy state of a long idle session - the analysis is
+        rebuilt from the shared caches when the user returns
+        """
+        self.compact_state()
+        self.tt = None
+        self.property_selection = None
+        self.view_lod = None
+        self.row_store = None
+        self.gen_specs = None
+        self.payload = None
+        self.idle_state = "dropped"
+        # called by the idle check thread - the ui is updated on the event loop
+        core.loop.call_soon_threadsafe(self.show_dropped)
+
+    def show_dropped(self):
+        """
+        clear the grids of a dropped session unless its user has returned
+        """
+        if self.idle_state != "dropped":
+            return
+        with self.main_container:
+            self.property_grid.load_lod([])
+            self.property_grid.update()
+            self.grid_window_row.set_visibility(False)
+            self.cooccurrence_row.set_visibility(False)
+            self.generate_button.disable()
+            self.cooccurrence_button.disable()
+            self.idle_row.set_visibility(True)
+
+    def memory_usage(self) -> Dict[str, int]:
+        """
+        estimate the memory used by the state of this session
+
+        Returns:
+            dict: the size in bytes per component - shared objects
+            like the property metadata and cached items are not counted
+        """
+        seen = set()
+        tt = self.tt
+        if tt is not None:
+            for shared in [tt.wpm, tt.item, tt.endpointConf]:
+                seen.add(id(shared))
+        components = {
+            "tt": tt,
+            "properties": self.property_selection,
+            "grid": [
+                self.view_lod,
+                self.property_grid.lod,
+                self.property_grid.ag_grid.options.get("rowData"),
+            ],
+            "row store": self.row_store,
+            "superset": self.property_superset,
+            "stats": [self.stats_cache, self.stats_queries],
+            "specs": self.gen_specs,
+            "cooccurrence": self.cooccurrence,
+            "class slice": self.class_slice,
+            "sketches": self.approximate,
+        }
+        usage = {}
+        for name, component in components.items():
+            try:
+                usage[name] = SessionRegistry.estimate_size(component, seen)
+            except RuntimeError:
+                # changed by the session while measuring
+                usage[name] = 0
+        return usage
+
+    def get_stats_queries(self, property_id: str) -> Dict[str, str]:
+        """
+        get the statistic query texts of the given property - from the
+        shared statistics cache if this session has released them
+        """
+        queries = self.stats_queries.get(property_id, None)
+        if queries is None and self.tt is not None:
+            key = self.item_cache.stats_key(
+                self.tt, self.config.endpoint_name, property_id
+            )
+            stats_row = self.item_cache.stats.get(key) or {}
+            queries = {"?f": stats_row.get("queryf"), "?ex": stats_row.get("queryex")}
+        return queries or {}
+
     def createTrulyTabular(self, itemQid: str, propertyIds=[]):
         """
         create a Truly Tabular configuration for my configure endpoint and the given itemQid and
@@ -363,17 +766,55 @@ class TrulyTabularDisplay:
             itemQid(str): e.g. Q5 human
             propertyIds(list): list of property Ids (if any) such as P17 country
         """
-        tt = TrulyTabular(
+        # make sure the shared property metadata is installed
+        self.property_store.get_manager()
+        tt = self.item_cache.get_truly_tabular(
             itemQid=itemQid,
             propertyIds=propertyIds,
             search_predicate=self.search_predicate,
             endpointConf=self.config.sparql_endpoint,
             debug=self.solution.debug,
         )
+        if (
+            self.config.use_subclass_index
+            and self.search_predicate == SubclassClosureIndex.transitive_predicate
+        ):
+            try:
+                tt.sparql = ClosureRewritingSPARQL(
+                    tt.sparql,
+                    self.config.sparql_endpoint,
+                    itemQid,
+                    SubclassClosureIndex.get_instance(),
+                )
+            except Exception as ex:
+                logging.warning(f"subclass closure of {itemQid} not available: {ex}")
+        if self.tracer.enabled and not isinstance(tt.sparql, TracedSPARQL):
+            tt.sparql = TracedSPARQL(
+                tt.sparql, endpoint_name=self.config.sparql_endpoint.name
+            )
         return tt
 
+    def get_try_it_url(self, key: str, queryText: str) -> str:
+        """
+        get the url encoded try it url for the given statistics query
+
+        Args:
+            key(str): the name of the query e.g. queryf
+            queryText(str): the SPARQL query
+
+        Returns:
+            str: the try it url for my configured endpoint
+        """
+        sparql = f"{SparqlTemplates.try_it_comment}{queryText}"
+        tryItUrlEncoded = SparqlTemplates.get_instance().try_it_url(
+            sparql,
+            baseurl=self.config.sparql_endpoint.website,
+            database=self.config.sparql_endpoint.database,
+        )
+        return tryItUrlEncoded
+
     def wikiTrulyTabularPropertyStats(
-        self, itemId: str, propertyId: str
+        self, itemId: str, propertyId: str, property_count: int = 0
     ) -> Optional[dict]:
         """
         get the truly tabular property statistics
@@ -385,66 +826,113 @@ class TrulyTabularDisplay:
         Args:
             itemId(str): the Wikidata item identifier
             propertyId(str): the property id
+            property_count(int): the number of instances using the property
         Returns:
-            dict: statistics row with TryIt links, or None if unavailable
+            dict: statistics row, or None if unavailable
         """
         statsRow = None
         try:
             # reuse the existing TrulyTabular for this item (already has the
             # resolved item) instead of constructing a new one per property
             tt = self.tt
-            properties = tt.wpm.get_properties_by_ids([propertyId])
+            properties = self.property_store.get_properties_by_ids([propertyId])
             wdProperty = properties.get(propertyId)
             if wdProperty is not None:
                 # cache the item count so count() is queried only once per item
                 if getattr(self, "_tt_item_count", None) is None:
-                    self._tt_item_count, _ = tt.count()
-                statsRow = tt.genWdPropertyStatistic(wdProperty, self._tt_item_count)
-                for key in ["queryf", "queryex"]:
-                    queryText = statsRow[key]
-                    sparql = f"# This query was generated by Truly Tabular\n{queryText}"
-                    query = Query(name=key, query=sparql)
-                    tryItUrlEncoded = query.getTryItUrl(
-                        baseurl=self.config.sparql_endpoint.website,
-                        database=self.config.sparql_endpoint.database,
+                    with self.admission.query():
+                        self._tt_item_count, _ = tt.count()
+                class_slice = self.class_slice
+                if class_slice is not None and class_slice.has_properties(
+                    [propertyId]
+                ):
+                    statsRow = class_slice.stats_row(wdProperty, self._tt_item_count)
+                    self.add_stats_queries(statsRow, tt, wdProperty)
+                elif self.config.approximate:
+                    statsRow = self.get_approximate_statistics().stats_row(
+                        propertyId, wdProperty.plabel, self._tt_item_count
+                    )
+                    self.add_stats_queries(statsRow, tt, wdProperty)
+                else:
+                    paginated = (
+                        self.stats_plan is not None
+                        and self.stats_plan.strategy == "paginated"
                     )
-                    tryItLink = Link.create(
-                        url=tryItUrlEncoded,
-                        text="try it!",
-                        tooltip=f"try out with {self.config.sparql_endpoint.name}",
-                        target="_blank",
+                    statsRow = self.item_cache.property_stats(
+                        tt,
+                        self.config.endpoint_name,
+                        wdProperty,
+                        self._tt_item_count,
+                        property_count=property_count,
+                        paginated=paginated,
                     )
-                    statsRow[f"{key}TryIt"] = tryItLink
         except (BaseException, HTTPError) as ex:
             self.solution.handle_exception(ex)
         return statsRow
 
+    def add_stats_queries(self, statsRow: dict, tt, wdProperty):
+        """
+        add the queryf and queryex texts to a locally computed statistics row
+        """
+        templates = SparqlTemplates.get_instance()
+        for key, asFrequency in [("queryf", True), ("queryex", False)]:
+            statsRow[key] = templates.none_tabular_query(tt, wdProperty, asFrequency)
+
+    def add_try_it_links(self, statsRow: dict):
+        """
+        add the TryIt links for the queryf and queryex queries of the given statistics row
+
+        Args:
+            statsRow(dict): the statistics row to add the links to
+        """
+        for key in ["queryf", "queryex"]:
+            queryText = statsRow[key]
+            if self.payload:
+                # the try it link is only generated on click
+                statsRow[f"{key}TryIt"] = self.payload.try_it_text
+                continue
+            tryItUrlEncoded = self.get_try_it_url(key, queryText)
+            tryItLink = Link.create(
+                url=tryItUrlEncoded,
+                text="try it!",
+                tooltip=f"try out with {self.config.sparql_endpoint.name}",
+                target="_blank",
+            )
+            statsRow[f"{key}TryIt"] = tryItLink
+
     async def getPropertyIdMap(self) -> Dict:
         """
         get the map of selected property ids
         with generation specs
 
+        the selection and checkbox state is kept on the server
+        so no round trip to the browser is needed
+
         Returns:
             dict: a dict of list
         """
-        idMap = {}
-        cols = self.property_selection.checkbox_cols
-        selected_rows = await self.property_grid.get_selected_rows()
-        for srow in selected_rows:
-            propertyId = srow["propertyId"]
-            key_value = srow["#"]
-            genList = []
-            for col_key in cols:
-                checked = self.property_grid.get_cell_value(key_value, col_key)
-                if checked:
-                    genList.append(col_key)
-            idMap[propertyId] = genList
+        idMap = self.gen_specs.gen_map() if self.gen_specs else {}
         return idMap
 
     async def generateQueries(self):
         """
         generate and show the queries
         """
+        profile = self.profiler.start_profile(
+            f"generate {self.qid}", self.solution.client.id
+        )
+        try:
+            with self.profiler.stage(profile, "generateQueries"), self.tracer.span(
+                "generateQueries",
+                qid=self.qid,
+                predicate=self.search_predicate,
+                endpoint=self.config.endpoint_name,
+            ):
+                await self.do_generate_queries()
+        finally:
+            self.profiler.end_profile(profile)
+
+    async def do_generate_queries(self):
         try:
             propertyIdMap = await self.getPropertyIdMap()
             tt = self.createTrulyTabular(
@@ -465,7 +953,9 @@ class TrulyTabularDisplay:
                         name="aggregate Query",
                         sparql_endpoint=self.config.sparql_endpoint,
                     )
-            sparqlQuery = tt.generateSparqlQuery(
+            templates = SparqlTemplates.get_instance()
+            sparqlQuery = templates.generate_query(
+                tt,
                 genMap=propertyIdMap,
                 naive=True,
                 lang=self.config.lang,
@@ -473,7 +963,8 @@ class TrulyTabularDisplay:
             )
             naiveSparqlQuery = Query(name="naive SPARQL Query", query=sparqlQuery)
             self.naive_query_view.show_query(naiveSparqlQuery.query)
-            sparqlQuery = tt.generateSparqlQuery(
+            sparqlQuery = templates.generate_query(
+                tt,
                 genMap=propertyIdMap,
                 naive=False,
                 lang=self.config.lang,
@@ -483,6 +974,10 @@ class TrulyTabularDisplay:
                 name="aggregate SPARQL Query", query=sparqlQuery
             )
             self.aggregate_query_view.show_query(self.aggregateSparqlQuery.query)
+            if self.class_slice is not None and self.class_slice.has_properties(
+                list(propertyIdMap.keys())
+            ):
+                self.show_aggregate_preview(propertyIdMap, tt)
             ui.notify("SPARQL queries generated")
         except Exception as ex:
             self.solution.handle_exception(ex)
@@ -491,12 +986,319 @@ class TrulyTabularDisplay:
         """
         handle the generate button click
         """
+        self.touch()
         try:
             ui.notify(f"generating SPARQL query for {str(self.tt)}")
             await self.generateQueries()
         except BaseException as ex:
             self.solution.handle_exception(ex)
 
+    async def on_cooccurrence_button_click(self, _event):
+        """
+        handle the co-occurrence button click
+        """
+        self.touch()
+        try:
+            ui.notify(f"analyzing property co-occurrence for {str(self.tt)}")
+            await self.run_analysis(self.update_cooccurrence)
+        except BaseException as ex:
+            self.solution.handle_exception(ex)
+
+    async def on_save_profile_click(self, _event):
+        """
+        store the counts and statistics of the current analysis as class profile
+        """
+        self.touch()
+        try:
+            if self.property_selection is None or not self.stats_cache:
+                ui.notify("no property statistics to save yet")
+                return
+            profile = ClassProfile.from_selection(
+                qid=self.qid,
+                predicate=self.search_predicate,
+                endpoint_name=self.config.endpoint_name,
+                lang=self.analysis_lang,
+                item_count=self.ttcount,
+                property_selection=self.property_selection,
+                stats=self.stats_cache,
+            )
+            path = ClassProfileStore.get_instance().save(profile)
+            ui.notify(f"saved profile of {len(profile.stats)} properties to {path}")
+        except Exception as ex:
+            self.solution.handle_exception(ex)
+
+    async def on_refresh_profile_click(self, _event):
+        """
+        incrementally refresh the stored class profile
+        """
+        self.touch()
+        await self.run_analysis(self.refresh_profile)
+
+    def refresh_profile(self):
+        """
+        refresh the stored profile of the current analysis recomputing only
+        the statistics of changed properties and show the result
+        """
+        self.on_admitted()
+        try:
+            store = ClassProfileStore.get_instance()
+            key = self.get_analysis_key() + (self.analysis_lang,)
+            profile = store.load(*key)
+            if profile is None:
+                with self.main_container:
+                    ui.notify("no stored profile - save the profile first")
+                return
+            refresh = ProfileRefresh(profile, self.config.profile_tolerance)
+            with self.stage("refresh profile", qid=self.qid) as span:
+                RateLimiter.note_activity()
+                profile, report = refresh.refresh(self.config.sparql_endpoint)
+                if span is not None:
+                    span.set_attribute("queries saved", report.queries_saved)
+            store.save(profile)
+            self.config.min_property_frequency = profile.min_property_frequency
+            with self.main_container:
+                self.min_property_frequency_input.value = str(
+                    profile.min_property_frequency
+                )
+                ui.notify(report.asText())
+            # show the refreshed profile from the shared caches
+            self.property_superset = None
+            self.stats_cache = StatsCache()
+            self.do_update_analysis()
+        except Exception as ex:
+            self.solution.handle_exception(ex)
+
+    def get_cooccurrence_analysis(self) -> CooccurrenceAnalysis:
+        """
+        get the co-occurrence analysis for the current analysis key
+        keeping the instance sets fetched so far
+        """
+        key = self.get_analysis_key()
+        if self.cooccurrence is None or self.cooccurrence_key != key:
+            rewrite = None
+            if isinstance(self.tt.sparql, ClosureRewritingSPARQL):
+                rewrite = self.tt.sparql.rewrite
+            self.cooccurrence = CooccurrenceAnalysis(
+                endpoint=self.config.sparql_endpoint,
+                qid=self.tt.itemQid,
+                search_predicate=self.search_predicate,
+                item_count=self.ttcount,
+                max_instances=self.config.cooccurrence_max_instances,
+                rewrite=rewrite,
+            )
+            self.cooccurrence_key = key
+        return self.cooccurrence
+
+    def update_cooccurrence(self):
+        """
+        fetch the instance sets of the selected properties and
+        show their joint coverage as a heatmap
+        """
+        self.on_admitted()
+        self.do_update_cooccurrence()
+
+    def do_update_cooccurrence(self):
+        try:
+            property_ids = []
+            if self.gen_specs:
+                property_ids = self.gen_specs.selected_property_ids()
+            max_properties = self.config.cooccurrence_max_properties
+            if len(property_ids) > max_properties:
+                with self.main_container:
+                    ui.notify(
+                        f"limiting co-occurrence analysis to the first {max_properties} of {len(property_ids)} selected properties"
+                    )
+                property_ids = property_ids[:max_properties]
+            analysis = self.get_cooccurrence_analysis()
+            with self.main_container:
+                self.progress_bar.total = len(property_ids)
+                self.progress_bar.reset()
+            for property_id in property_ids:
+                try:
+                    analysis.add_property(property_id)
+                except EndPointInternalError as ex:
+                    if self.isTimeoutException(ex):
+                        raise Exception(
+                            f"Query timeout of the instance query for {property_id}"
+                        )
+                    raise
+                with self.main_container:
+                    self.progress_bar.update(1)
+            properties = self.property_store.get_properties_by_ids(
+                property_ids, lang=self.config.lang
+            )
+            labels = {pid: prop.plabel for pid, prop in properties.items()}
+            lod = analysis.heatmap_lod(property_ids, labels)
+            with self.main_container:
+                self.progress_bar.reset()
+                self.show_cooccurrence(analysis, property_ids, labels, lod)
+        except Exception as ex:
+            self.solution.handle_exception(ex)
+
+    def show_cooccurrence(
+        self,
+        analysis: CooccurrenceAnalysis,
+        property_ids: List[str],
+        labels: Dict[str, str],
+        lod: List[dict],
+    ):
+        """
+        show the joint coverage of the given properties as a heatmap grid
+        """
+        with self.cooccurrence_row:
+            if self.cooccurrence_grid is None:
+                config = GridConfig(key_col="propertyId", classes="w-full")
+                self.cooccurrence_grid = ListOfDictsGrid(config=config)
+            self.cooccurrence_grid.load_lod(lod)
+            cell_style = CooccurrenceAnalysis.heatmap_cell_style()
+            for pid in property_ids:
+                col_def = self.cooccurrence_grid.get_column_def(pid)
+                if col_def:
+                    col_def["headerName"] = labels.get(pid, pid)
+                    col_def["headerTooltip"] = pid
+                    col_def[":cellStyle"] = cell_style
+            self.cooccurrence_grid.update()
+            sample = f" sampled 1:{analysis.scale}" if analysis.is_sampled else ""
+            self.cooccurrence_label.text = (
+                f"joint coverage % of {len(property_ids)} properties{sample} - "
+                f"{analysis.memory_bytes()/1024:.0f} KB instance sets"
+            )
+        self.cooccurrence_row.set_visibility(True)
+
+    def get_class_slice(self) -> ClassSlice:
+        """
+        get the class slice for the current analysis key
+        keeping the triples materialized so far
+        """
+        key = self.get_analysis_key() + (self.analysis_lang,)
+        if self.class_slice is None or self.class_slice_key != key:
+            rewrite = None
+            if isinstance(self.tt.sparql, ClosureRewritingSPARQL):
+                rewrite = self.tt.sparql.rewrite
+            self.class_slice = ClassSlice(
+                endpoint=self.config.sparql_endpoint,
+                qid=self.tt.itemQid,
+                search_predicate=self.search_predicate,
+                lang=self.analysis_lang,
+                max_triples=self.config.materialize_max_triples,
+                rewrite=rewrite,
+            )
+            self.class_slice_key = key
+        return self.class_slice
+
+    def get_approximate_statistics(self) -> ApproximateStatistics:
+        """
+        get the approximate statistics for the current analysis key
+        keeping the sketches computed so far
+        """
+        key = self.get_analysis_key() + (self.analysis_lang,)
+        if self.approximate is None or self.approximate_key != key:
+            rewrite = None
+            if isinstance(self.tt.sparql, ClosureRewritingSPARQL):
+                rewrite = self.tt.sparql.rewrite
+            self.approximate = ApproximateStatistics(
+                endpoint=self.config.sparql_endpoint,
+                qid=self.tt.itemQid,
+                search_predicate=self.search_predicate,
+                lang=self.analysis_lang,
+                shards=self.config.approximate_shards,
+                workers=self.config.approximate_workers,
+                rewrite=rewrite,
+            )
+            self.approximate_key = key
+        return self.approximate
+
+    def plan_property_stats(self, property_rows: List[dict]) -> QueryPlan:
+        """
+        choose the strategy to compute the statistics of the given property rows
+        before sending any statistics query - cached statistics need no query
+        """
+        endpoint_name = self.config.endpoint_name
+        property_counts = {
+            row["propertyId"]: self.property_selection.usage_count(row["propertyId"])
+            for row in property_rows
+            if self.item_cache.stats_key(self.tt, endpoint_name, row["propertyId"])
+            not in self.item_cache.stats
+        }
+        plan = self.cost_model.plan_statistics(
+            endpoint_name,
+            self._tt_item_count,
+            property_counts,
+            max_triples=self.config.materialize_max_triples,
+            shards=SparqlTemplates.id_shards,
+        )
+        return plan
+
+    def materialize_class_slice(
+        self, property_rows: List[dict], batches: List[List[str]] = None
+    ):
+        """
+        fetch the truthy triples of the given property rows into the class slice
+
+        Args:
+            property_rows(list): the rows of the properties to materialize
+            batches(list): the property ids to fetch per query - default: all at once
+        """
+        class_slice = self.get_class_slice()
+        property_ids = [row["propertyId"] for row in property_rows]
+        # every instance using a property has at least one triple
+        counts = {
+            pid: self.property_selection.usage_count(pid) for pid in property_ids
+        }
+        expected = sum(counts.values())
+        class_slice.set_sampling(expected)
+        with self.main_container:
+            self.progress_bar.total = max(expected // class_slice.scale, 1)
+            self.progress_bar.reset()
+        progress = {"fetched": 0}
+
+        def on_page(fetched: int):
+            with self.main_container:
+                self.progress_bar.update(fetched - progress["fetched"])
+            progress["fetched"] = fetched
+
+        with self.stage("materialize", properties=len(property_ids)):
+            RateLimiter.note_activity()
+            try:
+                for batch in batches or [property_ids]:
+                    progress["fetched"] = 0
+                    batch_expected = sum(counts.get(pid, 0) for pid in batch)
+                    class_slice.fetch(batch, batch_expected, on_page=on_page)
+            except EndPointInternalError as ex:
+                if self.isTimeoutException(ex):
+                    raise Exception(f"Query timeout materializing {self.qid}")
+                raise
+        sample = f" sampled 1:{class_slice.scale}" if class_slice.is_sampled else ""
+        truncated = ""
+        if class_slice.truncated:
+            incomplete = len(
+                [pid for pid in property_ids if pid not in class_slice.complete]
+            )
+            truncated = (
+                f" (truncated - {incomplete} properties fall back to "
+                "per property queries)"
+            )
+        with self.main_container:
+            self.progress_bar.reset()
+            ui.notify(
+                f"materialized {len(class_slice)} triples{sample}{truncated} "
+                f"in {class_slice.memory_bytes()/1024:.0f} KB"
+            )
+
+    def show_aggregate_preview(self, genMap: dict, tt):
+        """
+        show the first rows of the aggregate query computed from the class slice
+        """
+        lod = self.class_slice.aggregate_preview(
+            genMap, tt.properties, separator=self.config.list_separator
+        )
+        with self.query_display_container:
+            if self.preview_grid is None:
+                with ui.expansion("aggregate preview (local)"):
+                    self.preview_grid = ListOfDictsGrid(config=GridConfig())
+            self.preview_grid.load_lod(lod)
+            self.preview_grid.update()
+
     async def on_min_property_frequency_change(self, _event):
         """
         handle a change in the minimum property frequency input
@@ -505,11 +1307,28 @@ class TrulyTabularDisplay:
         try:
             self.config.min_property_frequency = float(value_str)
             ui.notify(f"new freq: {self.config.min_property_frequency}")
-            await self.update_display()
+            # an explicit min% switches the coverage target off
+            self.config.coverage_target = 0.0
+            self.coverage_input.value = str(self.config.coverage_target)
+            await self.update_property_filter()
         except Exception as _ex:
             ui.notify(f"invalid frequency value {value_str}")
             pass
 
+    async def on_coverage_change(self, _event):
+        """
+        handle changes in the target statement coverage
+        """
+        self.touch()
+        value_str = self.coverage_input.value
+        try:
+            value = float(value_str)
+            self.config.coverage_target = value
+            ui.notify(f"coverage target changed to {value}%")
+            await self.update_property_filter()
+        except ValueError:
+            ui.notify(f"invalid coverage value {value_str}")
+
     async def on_pareto_change(self, _event):
         """
         handle changes in the pareto level
@@ -519,17 +1338,208 @@ class TrulyTabularDisplay:
         self.min_property_frequency_input.value = str(
             self.config.min_property_frequency
         )
+        await self.update_property_filter()
+
+    async def on_lang_change(self, _event):
+        """
+        handle changes of the label language
+        """
+        self.touch()
+        await self.run_analysis(self.relabel)
+
+    def relabel_rows(self, compact: bool) -> Dict[str, LabelEntry]:
+        """
+        set the property labels of the rows of the property selection
+        in the current language with batched label queries
+
+        Args:
+            compact(bool): if True set the plain property label instead of a html link
+
+        Returns:
+            dict: the label entries of the properties and of the item
+        """
+        rows = self.property_selection.propertyList
+        qids = [self.qid] + [row["propertyId"] for row in rows]
+        entries = self.label_service.get_entries(qids, self.config.lang)
+        for row in rows:
+            pid = row["propertyId"]
+            label = entries[pid].label or pid
+            url = f"{LabelService.entity_prefix}{pid}"
+            row["property"] = label if compact else Link.create(url, label)
+        return entries
+
+    def relabel(self):
+        """
+        show the item and the property grid rows in the current language
+        without a new analysis run
+        """
+        self.on_admitted()
+        try:
+            if self.property_selection is None or self.tt is None:
+                return
+            lang = self.config.lang
+            queries = self.label_service.queries
+            with self.stage("relabel", lang=lang):
+                entries = self.relabel_rows(compact=self.payload is not None)
+                labels = {
+                    row["propertyId"]: row["property"]
+                    for row in self.property_selection.propertyList
+                }
+                if self.payload:
+                    for wire_row in self.view_lod:
+                        wire_row["property"] = labels[wire_row["propertyId"]]
+                if self.row_store:
+                    for wire_row in self.view_lod:
+                        index = self.row_store.index_of(wire_row["#"])
+                        self.row_store.update_cell(
+                            index, "property", wire_row["property"]
+                        )
+            with self.property_grid_row:
+                if self.row_store:
+                    self.show_property_window()
+                else:
+                    self.property_grid.update()
+                    if self.gen_specs:
+                        self.select_grid_rows(
+                            self.gen_specs.selected_keys(
+                                [row["#"] for row in self.view_lod]
+                            )
+                        )
+            item_url = self.tt.item.url
+            item_text = f"{entries[self.qid].asText()}→ {item_url}"
+            with self.item_row:
+                self.item_link_view.content = Link.create(item_url, item_text)
+            queries = self.label_service.queries - queries
+            with self.main_container:
+                ui.notify(
+                    f"relabeled {len(labels)} properties in {lang} - {queries} queries"
+                )
+        except Exception as ex:
+            self.solution.handle_exception(ex)
+
+    async def update_property_filter(self):
+        """
+        update the property table for a changed min% threshold
+        """
+        self.touch()
+        if self.tt is None or self.analysis_key != self.get_analysis_key():
+            # the analysis of a new item/predicate starts from scratch
+            await self.update_display()
+        else:
+            await self.run_analysis(self.do_update_property_filter)
+
+    def do_update_property_filter(self):
+        """
+        apply a changed min% threshold - the property table is filtered
+        locally from the superset if possible
+        """
+        self.on_admitted()
+        try:
+            if not self.tt.error:
+                self.update_property_query_view(total=self.ttcount)
+        except Exception as ex:
+            self.solution.handle_exception(ex)
+
+    @property
+    def analysis_lang(self) -> str:
+        """
+        the language the instances of the analysis need a label in - the
+        lang of my TrulyTabular which is independent of the ui language
+        """
+        lang = self.tt.lang if self.tt is not None else "en"
+        return lang
+
+    def get_analysis_key(self) -> tuple:
+        """
+        get the key of the analysis the property superset and statistics belong to
+        """
+        key = (self.qid, self.search_predicate, self.config.endpoint_name)
+        return key
+
+    def get_property_lod(self, mfp_query: Query, min_count: int) -> List[dict]:
+        """
+        get the most frequently used properties with more than min_count usages
+
+        the result is filtered from the property superset if it has been fetched
+        for a lower or equal min_count before otherwise the query is run
+
+        Args:
+            mfp_query(Query): the query for the most frequently used properties
+            min_count(int): the minimum number of usages
+
+        Returns:
+            list: a copy of the property records
+        """
+        key = self.get_analysis_key()
+        superset = self.property_superset
+        if superset is not None and superset.covers(key, min_count):
+            property_lod = superset.filter(min_count)
+            with self.main_container:
+                ui.notify(
+                    f"filtered {len(property_lod)} of {superset.size} properties locally"
+                )
+            return property_lod
+        table_key = key + (self.config.lang,)
+        property_lod = self.item_cache.get_property_table(table_key, min_count)
+        if property_lod is None:
+            endpoint_name = self.config.endpoint_name
+            plan = self.cost_model.check(endpoint_name, "property table", self.ttcount)
+            with self.query_display_container:
+                msg = f"running query for most frequently used properties of {str(self.tt)} ..."
+                ui.notify(msg)
+                if plan.reason:
+                    ui.notify(plan.asText(), type="warning")
+            try:
+                query_text = mfp_query.query
+                if isinstance(self.tt.sparql, ClosureRewritingSPARQL):
+                    query_text = self.tt.sparql.rewrite(query_text)
+                reader = SparqlResultReader(self.config.sparql_endpoint)
+                with self.cost_model.measure(
+                    endpoint_name, "property table", self.ttcount
+                ):
+                    property_lod = reader.query_as_lod(query_text)
+            except EndPointInternalError as ex:
+                if self.isTimeoutException(ex):
+                    raise Exception("Query timeout of the property table query")
+                raise
+            self.item_cache.put_property_table(table_key, min_count, property_lod)
+        if self.analysis_key != key:
+            self.stats_cache = StatsCache()
+        self.analysis_key = key
+        self.property_superset = PropertySuperset(key, min_count, property_lod)
+        self.superset_lang = self.config.lang
+        return property_lod
 
     def get_stats_rows(self, property_grid_rows: list):
         """
         get the statistic rows for the given property_grid_rows
         """
+        with self.admission.client(self.solution.client.id), self.stage(
+            "stats rows", parent=self.stats_parent_span, rows=len(property_grid_rows)
+        ):
+            self.do_get_stats_rows(property_grid_rows)
+
+    def do_get_stats_rows(self, property_grid_rows: list):
+        RateLimiter.note_activity()
         for row in property_grid_rows:
             property_id = row["propertyId"]
             row_key = row["#"]
-            stats_row = self.wikiTrulyTabularPropertyStats(self.tt.itemQid, property_id)
+            stats_row = self.stats_cache.get_or_compute(
+                property_id,
+                lambda: self.wikiTrulyTabularPropertyStats(
+                    self.tt.itemQid,
+                    property_id,
+                    self.property_selection.usage_count(property_id),
+                ),
+            )
             if stats_row:
+                stats_row = dict(stats_row)
+                self.add_try_it_links(stats_row)
                 stats_row["✔"] = "✔"
+                self.stats_queries[property_id] = {
+                    "?f": stats_row.get("queryf"),
+                    "?ex": stats_row.get("queryex"),
+                }
             else:
                 stats_row = {"✔": "❌"}
             for col_key, statsColumn in [
@@ -543,7 +1553,7 @@ class TrulyTabularDisplay:
             ]:
                 if statsColumn in stats_row:
                     value = stats_row[statsColumn]
-                    self.property_grid.update_cell(row_key, col_key, value)
+                    self.update_property_cell(row_key, col_key, value)
             self.property_grid.update()
             pass
 
@@ -552,7 +1562,17 @@ class TrulyTabularDisplay:
         update the item count
         """
         try:
-            self.ttcount, countQuery = self.tt.count()
+            count_key = (self.qid, self.search_predicate, self.config.endpoint_name)
+            with self.stage(
+                "update_item_count_view", cache_hit=count_key in self.item_cache.counts
+            ) as span:
+                self.ttcount, countQuery = self.item_cache.count(
+                    self.tt, self.config.endpoint_name
+                )
+                if span is not None:
+                    span.set_attribute("count", self.ttcount)
+            if not self.tt.error:
+                self._tt_item_count = self.ttcount
             self.count_query_view.show_query(countQuery)
             content = "❓" if self.tt.error else f"{self.ttcount} instances found"
             with self.item_row:
@@ -569,16 +1589,21 @@ class TrulyTabularDisplay:
         """
         try:
             pareto = self.config.pareto
-            if total is not None:
+            if total is not None and not self.config.coverage_target:
                 min_count = round(total * self.config.min_property_frequency / 100.0)
             else:
+                # the coverage needs the counts of all properties
                 min_count = 0
             msg = f"searching properties with at least {min_count} usages"
             with self.main_container:
                 ui.notify(msg)
-            mfp_query = self.tt.mostFrequentPropertiesQuery(minCount=min_count)
-            self.property_query_view.show_query(mfp_query.query)
-            self.update_properties_table(mfp_query)
+            with self.stage("update_property_query_view", min_count=min_count):
+                templates = SparqlTemplates.get_instance()
+                mfp_query = templates.most_frequent_properties_query(
+                    self.tt, minCount=min_count
+                )
+                self.property_query_view.show_query(mfp_query.query)
+                self.update_properties_table(mfp_query, min_count=min_count)
         except Exception as ex:
             self.solution.handle_exception(ex)
 
@@ -586,10 +1611,6 @@ class TrulyTabularDisplay:
         """
         prepare the interactive generation specification
         """
-        # render generation spec columns as checkboxes
-        for col in self.property_selection.checkbox_cols:
-            self.property_grid.set_checkbox_renderer(col)
-            pass
         for row in self.property_selection.propertyList:
             has_min_frequency = self.property_selection.hasMinFrequency(row)
             row["count"] = True
@@ -599,30 +1620,39 @@ class TrulyTabularDisplay:
             else:
                 row["ignore"] = True
             pass
-        col_def = self.property_grid.get_column_def("#")
-        col_def["headerCheckboxSelection"] = True
-        self.property_grid.update()
-        self.property_grid.select_all_rows()
+        self.gen_specs = GenerationSpecState.from_lod(
+            self.property_selection.checkbox_cols, self.property_selection.propertyList
+        )
+        self.gen_specs.select_all()
+        if self.row_store:
+            self.show_property_window()
+        else:
+            if self.payload:
+                # repack the flags of the compact rows
+                for row, wire_row in zip(
+                    self.property_selection.propertyList, self.view_lod
+                ):
+                    wire_row[self.payload.flags_col] = self.payload.pack_flags(row)
+            self.property_grid.update()
+            self.property_grid.select_all_rows()
         self.generate_button.enable()
+        self.cooccurrence_button.enable()
 
-    def update_properties_table(self, mfp_query):
+    def update_properties_table(self, mfp_query, min_count: int = 0):
         """
         update my properties table
 
         Args:
             mfp_query(Query): the query for the most frequently used properties
+            min_count(int): the minimum number of usages the query filters for
         """
         try:
-            with self.query_display_container:
-                msg = f"running query for most frequently used properties of {str(self.tt)} ..."
-                ui.notify(msg)
-            property_lod = []
-            try:
-                property_lod = self.tt.sparql.queryAsListOfDicts(mfp_query.query)
-            except EndPointInternalError as ex:
-                if self.isTimeoutException(ex):
-                    raise Exception("Query timeout of the property table query")
-                raise
+            with self.stage("update_properties_table", min_count=min_count) as span:
+                property_lod = self.get_property_lod(mfp_query, min_count)
+                if self.config.coverage_target and property_lod:
+                    property_lod = self.select_coverage(property_lod)
+                if span is not None:
+                    span.set_attribute("rows", len(property_lod))
             if not property_lod:
                 with self.query_display_container:
                     ui.notify(
@@ -631,20 +1661,243 @@ class TrulyTabularDisplay:
                         f"not a class). Try a class item or a different search predicate."
                     )
                 return
-            self.property_selection = PropertySelection(
-                property_lod,
-                total=self.ttcount,
-                paretoLevels=self.config.pareto_levels,
-                minFrequency=self.config.min_property_frequency,
-            )
-            self.property_selection.prepare()
-            with self.property_grid_row:
-                self.view_lod = self.property_selection.propertyList
-                self.property_grid.load_lod(self.view_lod)
-                self.property_grid.set_checkbox_selection("#")
-                self.property_grid.update()
+            compact = self.config.compact_payload
+            with self.stage("PropertySelection.prepare", rows=len(property_lod)):
+                self.property_selection = PropertySelection(
+                    property_lod,
+                    total=self.ttcount,
+                    paretoLevels=self.config.pareto_levels,
+                    minFrequency=self.config.min_property_frequency,
+                )
+                self.property_selection.prepare(compact=compact)
+            if self.superset_lang != self.config.lang:
+                # the rows have been filtered from a superset in another language
+                with self.stage("relabel", lang=self.config.lang):
+                    self.relabel_rows(compact)
+            self.stats_queries = {}
+            self.gen_specs = None
+            with self.property_grid_row, self.stage("grid", compact=compact):
+                if compact:
+                    self.payload = CompactPropertyPayload(
+                        self.property_selection.checkbox_cols
+                    )
+                    self.view_lod = self.payload.to_wire(
+                        self.property_selection.propertyList
+                    )
+                else:
+                    self.payload = None
+                    self.view_lod = self.property_selection.propertyList
+                if len(self.view_lod) > self.config.virtualize_threshold:
+                    self.row_store = PropertyRowStore.from_lod(self.view_lod)
+                    self.window_start = 0
+                    self.show_property_window()
+                else:
+                    self.row_store = None
+                    self.property_grid.load_lod(self.view_lod)
+                    self.configure_property_columns()
+                    self.property_grid.update()
+                self.grid_window_row.set_visibility(self.row_store is not None)
             self.update_property_stats()
-            self.prepare_generation_specs()
+            with self.stage("prepare_generation_specs"):
+                self.prepare_generation_specs()
+        except Exception as ex:
+            self.solution.handle_exception(ex)
+
+    def select_coverage(self, property_lod: List[dict]) -> List[dict]:
+        """
+        select the smallest set of properties reaching the target statement
+        coverage and set the min% accordingly
+
+        Args:
+            property_lod(list): the records of all properties
+
+        Returns:
+            list: the records of the recommended properties
+        """
+        analysis = CoverageAnalysis.from_lod(property_lod, self.ttcount)
+        recommendation = analysis.recommend(self.config.coverage_target)
+        self.config.min_property_frequency = recommendation.min_percent
+        property_lod = [
+            record
+            for record in property_lod
+            if int(record["count"]) > recommendation.min_count
+        ]
+        with self.main_container:
+            self.min_property_frequency_input.value = str(
+                recommendation.min_percent
+            )
+            ui.notify(recommendation.asText())
+        return property_lod
+
+    def configure_property_columns(self):
+        """
+        configure the column rendering of the property grid
+        after rows have been loaded
+        """
+        if self.payload:
+            # client side rendering of the compact property grid rows
+            col_def = self.property_grid.get_column_def("property")
+            col_def[":cellRenderer"] = self.payload.property_link_renderer()
+            col_def = self.property_grid.get_column_def(self.payload.flags_col)
+            col_def["hide"] = True
+            column_defs = self.property_grid.ag_grid.options["columnDefs"]
+            for col in self.payload.flag_cols:
+                column_defs.append(self.payload.flag_column_def(col))
+        else:
+            # render generation spec columns as checkboxes
+            for col in self.property_selection.checkbox_cols:
+                self.property_grid.set_checkbox_renderer(col)
+        self.property_grid.set_checkbox_selection("#")
+        col_def = self.property_grid.get_column_def("#")
+        col_def["headerCheckboxSelection"] = True
+
+    def show_property_window(self):
+        """
+        show the current window of the server side property row model
+        """
+        store = self.row_store
+        page_size = self.config.grid_page_size
+        rows, total = store.window(
+            self.window_start,
+            page_size,
+            sort_col=self.window_sort_col,
+            descending=self.window_descending,
+            filter_text=self.window_filter,
+            filter_cols=["property", "propertyId", "type"],
+        )
+        self.window_keys = {row["#"] for row in rows}
+        specs = self.gen_specs
+        selected_keys = []
+        if specs:
+            # the checkbox and selection state comes from the generation specs
+            for row in rows:
+                index = specs.index_of(row["#"])
+                flags = specs.flags[index]
+                if self.payload:
+                    row[self.payload.flags_col] = flags
+                else:
+                    row.update(specs.packer.unpack_flags(flags))
+            selected_keys = specs.selected_keys([row["#"] for row in rows])
+        with self.property_grid_row:
+            self.property_grid.load_lod(rows)
+            self.configure_property_columns()
+            self.property_grid.update()
+            self.select_grid_rows(selected_keys)
+        end = min(self.window_start + page_size, total)
+        selected_count = specs.selected_count if specs else 0
+        self.grid_window_label.text = (
+            f"{self.window_start+1}-{end} of {total} properties "
+            f"({selected_count} selected)"
+        )
+
+    def select_grid_rows(self, keys: list):
+        """
+        select the rows with the given keys in the property grid with a single
+        browser call instead of one row method call per row
+
+        Args:
+            keys(list): the keys of the rows to select
+        """
+        if not keys:
+            return
+        ag_grid = self.property_grid.ag_grid
+        key_col = json.dumps(self.property_grid.config.key_col)
+        js = f"""
+const api = getElement({ag_grid.id}).api;
+const keys = new Set({json.dumps(list(keys))});
+const nodes = [];
+api.forEachNode((node) => {{
+  if (node.data && keys.has(node.data[{key_col}])) nodes.push(node);
+}});
+api.setNodesSelected({{ nodes: nodes, newValue: true }});
+"""
+        ag_grid.client.run_javascript(js)
+
+    def move_window(self, pages: int):
+        """
+        move the visible window of the property grid by the given number of pages
+        """
+        if not self.row_store:
+            return
+        page_size = self.config.grid_page_size
+        total = len(self.row_store.get_view())
+        start = self.window_start + pages * page_size
+        self.window_start = max(0, min(start, max(total - 1, 0)))
+        self.show_property_window()
+
+    def select_all_window(self, selected: bool):
+        """
+        select or deselect all rows of the server side row model
+        """
+        if self.row_store and self.gen_specs:
+            self.gen_specs.select_all(selected)
+            self.show_property_window()
+
+    async def on_window_change(self, _event):
+        """
+        handle changes of the sort and filter settings of the property grid window
+        """
+        self.touch()
+        if self.row_store:
+            self.window_start = 0
+            self.show_property_window()
+
+    def update_property_cell(self, row_key, col_key: str, value):
+        """
+        update a cell of the property grid - via the server side row model if active
+
+        Args:
+            row_key: the value of the key column "#" of the row
+            col_key(str): the column
+            value: the new value
+        """
+        if self.row_store:
+            index = self.row_store.index_of(row_key)
+            self.row_store.update_cell(index, col_key, value)
+            if row_key not in self.window_keys:
+                return
+        self.property_grid.update_cell(row_key, col_key, value)
+
+    async def on_property_grid_row_selected(self, event):
+        """
+        keep the server side selection bitset in sync with the grid
+        """
+        self.touch()
+        if self.gen_specs:
+            data = event.args.get("data", {})
+            index = self.gen_specs.index_of(data.get("#"))
+            if index is not None:
+                self.gen_specs.set_selected(index, bool(event.args.get("selected")))
+
+    async def on_property_grid_cell_value_changed(self, event):
+        """
+        keep the server side generation spec flags in sync with edited checkboxes
+        """
+        self.touch()
+        if self.gen_specs:
+            data = event.args.get("data", {})
+            index = self.gen_specs.index_of(data.get("#"))
+            col = event.args.get("colId")
+            if index is not None and col in self.gen_specs.packer.bits:
+                self.gen_specs.set_flag(index, col, bool(event.args.get("newValue")))
+
+    async def on_property_grid_cell_clicked(self, event):
+        """
+        generate and open the try it link of a compact statistics cell on click
+        """
+        self.touch()
+        try:
+            if not self.payload:
+                return
+            col_id = event.args.get("colId")
+            if col_id not in self.payload.try_it_cols:
+                return
+            data = event.args.get("data", {})
+            queries = self.get_stats_queries(data.get("propertyId"))
+            query_text = queries.get(col_id)
+            if query_text:
+                url = self.get_try_it_url(col_id, query_text)
+                ui.navigate.to(url, new_tab=True)
         except Exception as ex:
             self.solution.handle_exception(ex)
 
@@ -658,12 +1911,39 @@ class TrulyTabularDisplay:
                 ui.notify(f"Getting property statistics for {count} properties")
                 self.progress_bar.total = count
                 self.progress_bar.reset()
-            for row in self.property_selection.propertyList:
-                # run in background
-                asyncio.run(run.io_bound(self.get_stats_rows, [row]))
-                with self.main_container:
-                    self.progress_bar.update(1)
-            pass
+            with self.stage("update_property_stats", properties=count) as span:
+                self.stats_parent_span = span
+                property_rows = self.property_selection.propertyList
+                self.stats_plan = None
+                materialize = self.config.materialize
+                batches = None
+                if self.config.auto_strategy and not (
+                    self.config.materialize or self.config.approximate
+                ):
+                    self.stats_plan = self.plan_property_stats(property_rows)
+                    if span is not None:
+                        span.set_attribute("strategy", self.stats_plan.strategy)
+                    at_risk = self.stats_plan.predicted > self.cost_model.budget
+                    with self.main_container:
+                        ui.notify(
+                            self.stats_plan.asText(),
+                            type="warning" if at_risk else "info",
+                        )
+                    materialize = self.stats_plan.strategy in [
+                        "batched",
+                        "materialized",
+                    ]
+                    batches = self.stats_plan.property_batches
+                if materialize:
+                    self.materialize_class_slice(property_rows, batches=batches)
+                    with self.main_container:
+                        self.progress_bar.total = count
+                        self.progress_bar.reset()
+                for row in self.property_selection.propertyList:
+                    # run in background
+                    asyncio.run(run.io_bound(self.get_stats_rows, [row]))
+                    with self.main_container:
+                        self.progress_bar.update(1)
             with self.main_container:
                 self.progress_bar.reset()
                 ui.notify(f"Done getting statistics for {count} properties")
@@ -690,19 +1970,68 @@ class TrulyTabularDisplay:
         """
         update the display
         """
-        await run.io_bound(self.do_update_display)
+        self.touch()
+        await self.run_analysis(self.do_update_display)
+
+    def on_admission_wait(self, position: int):
+        """
+        show the queue position while waiting for a free analysis slot
+        """
+        self.queued = True
+        with self.main_container:
+            self.progress_bar.set_description(
+                f"waiting for a free analysis slot - queue position {position}"
+            )
+            self.progress_bar.label.text = self.progress_bar.desc
+
+    def on_admitted(self):
+        """
+        restore the progress bar after waiting for an analysis slot
+        """
+        if self.queued:
+            self.queued = False
+            with self.main_container:
+                self.progress_bar.desc = "Property statistics"
+                self.progress_bar.progress.visible = False
 
     def do_update_display(self):
+        self.on_admitted()
+        self.do_update_analysis()
+
+    def do_update_analysis(self):
+        self.profile = self.profiler.start_profile(
+            f"tt {self.qid}", self.solution.client.id
+        )
         try:
-            if self.solution.log_view:
-                self.solution.log_view.clear()
-            self.tt = self.createTrulyTabular(self.qid)
-            # invalidate cached item count when the item/predicate changes
-            self._tt_item_count = None
-            for query_view in self.count_query_view, self.property_query_view:
-                query_view.sparql_endpoint = self.config.sparql_endpoint
-            # Initialize TrulyTabular with the qid
-            self.update_item_link_view()
-            self.update_item_count_view()
+            with self.stage(
+                "analysis",
+                qid=self.qid,
+                predicate=self.search_predicate,
+                endpoint=self.config.endpoint_name,
+            ):
+                if self.solution.log_view:
+                    self.solution.log_view.clear()
+                if self.idle_state != "active":
+                    self.idle_state = "active"
+                    with self.main_container:
+                        self.idle_row.set_visibility(False)
+                # let background warm up queries give way
+                RateLimiter.note_activity()
+                with self.stage(
+                    "createTrulyTabular",
+                    cache_hit=self.item_cache.has_item(self.qid),
+                ):
+                    self.tt = self.createTrulyTabular(self.qid)
+                # invalidate cached item count when the item/predicate changes
+                self._tt_item_count = None
+                for query_view in self.count_query_view, self.property_query_view:
+                    query_view.sparql_endpoint = self.config.sparql_endpoint
+                # Initialize TrulyTabular with the qid
+                with self.stage("update_item_link_view"):
+                    self.update_item_link_view()
+                self.update_item_count_view()
         except Exception as ex:
             self.solution.handle_exception(ex)
+        finally:
+            self.profiler.end_profile(self.profile)
+            self.profile = None
@@ -0,0 +1,339 @@
+"""
+Created on 2026-10-19
+
+@author: wf
+"""
+
+import collections
+import logging
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Optional
+
+import yaml
+from lodstorage.query import Endpoint, EndpointManager
+
+from wd.cache import TTLCache
+from wd.item_cache import ItemCache
+from wd.property_store import PropertyStore
+from wd.sparql_results import SparqlResultReader
+from wd.sparql_templates import SparqlTemplates
+
+
+class RateLimiter:
+    """
+    limit the rate of background queries and keep them out of the way
+    of interactive traffic
+    """
+
+    # monotonic time of the last interactive query of any client session
+    last_activity = 0.0
+
+    def __init__(self, calls_per_minute: float = 6.0, idle_seconds: float = 10.0):
+        """
+        constructor
+
+        Args:
+            calls_per_minute(float): the maximum number of background queries per minute
+            idle_seconds(float): the time without interactive queries to wait for
+        """
+        self.interval = 60.0 / calls_per_minute
+        self.idle_seconds = idle_seconds
+        self.next_call = 0.0
+        self.stopped = threading.Event()
+
+    @classmethod
+    def note_activity(cls):
+        """
+        note that an interactive query is running
+        """
+        cls.last_activity = time.monotonic()
+
+    def acquire(self) -> bool:
+        """
+        wait until the next background query may run
+
+        Returns:
+            bool: False if the limiter has been stopped while waiting
+        """
+        while not self.stopped.is_set():
+            now = time.monotonic()
+            idle_at = RateLimiter.last_activity + self.idle_seconds
+            wait = max(self.next_call - now, idle_at - now)
+            if wait <= 0:
+                self.next_call = now + self.interval
+                return True
+            self.stopped.wait(wait)
+        return False
+
+    def stop(self):
+        self.stopped.set()
+
+
+@dataclass
+class WarmupTarget:
+    """
+    a class whose truly tabular analysis should be prefetched
+    """
+
+    qid: str
+    predicate: str = "wdt:P31"
+
+
+@dataclass
+class WarmupConfig:
+    """
+    configuration of the cache warm up
+    """
+
+    targets: List[WarmupTarget] = field(default_factory=list)
+    # uvicorn style access log to derive the most popular classes from
+    access_log: Optional[str] = None
+    top: int = 20
+    endpoint_name: str = "wikidata-qlever"
+    # the ui language the property tables are cached for
+    lang: str = "en"
+    min_property_frequency: float = 20.0
+    # maximum number of properties to prefetch statistics for per class
+    max_stats_properties: int = 30
+    calls_per_minute: float = 6.0
+    idle_seconds: float = 10.0
+    # seconds between two warm up runs
+    interval: float = 6 * 3600
+    # warmed entries live this long beyond the next run to cover its duration
+    ttl_margin: float = 3600
+
+    @property
+    def ttl(self) -> float:
+        """
+        the time to live of warmed entries - longer than the interval so that
+        they do not expire before the next run refreshes them
+        """
+        ttl = self.interval + self.ttl_margin
+        return ttl
+
+    @classmethod
+    def get_config_path(cls) -> str:
+        path = os.path.join(Path.home(), ".wdgrid", "warmup.yaml")
+        return path
+
+    @classmethod
+    def load(cls, path: str = None) -> Optional["WarmupConfig"]:
+        """
+        load the warm up configuration from the given yaml file
+
+        Args:
+            path(str): the path of the configuration - default ~/.wdgrid/warmup.yaml
+
+        Returns:
+            WarmupConfig: the configuration or None if there is no configuration file
+        """
+        path = path or cls.get_config_path()
+        if not os.path.isfile(path):
+            return None
+        with open(path) as yaml_file:
+            config_dict = yaml.safe_load(yaml_file) or {}
+        targets = [
+            (
+                WarmupTarget(**target)
+                if isinstance(target, dict)
+                else WarmupTarget(str(target))
+            )
+            for target in config_dict.pop("targets", [])
+        ]
+        config = cls(targets=targets, **config_dict)
+        return config
+
+
+class CacheWarmer:
+    """
+    prefetch item metadata, instance counts, property tables and statistics
+    of popular classes into the shared caches at server start and on a schedule
+    """
+
+    tt_path_regex = re.compile(r'"GET /tt/(Q\d+)[^"]*"\s+(\d{3})')
+
+    def __init__(self, config: WarmupConfig, debug: bool = False):
+        """
+        constructor
+
+        Args:
+            config(WarmupConfig): the warm up configuration
+            debug(bool): if True show debug information
+        """
+        self.config = config
+        self.debug = debug
+        self.item_cache = ItemCache.get_instance()
+        self.property_store = PropertyStore.get_instance()
+        self.limiter = RateLimiter(
+            calls_per_minute=config.calls_per_minute,
+            idle_seconds=config.idle_seconds,
+        )
+        self.timer: Optional[threading.Timer] = None
+        self.runs = 0
+        self.queries = 0
+
+    @classmethod
+    def targets_from_access_log(cls, path: str, top: int = 20) -> List[WarmupTarget]:
+        """
+        get the most frequently requested classes from the given access log
+
+        Args:
+            path(str): the access log
+            top(int): the number of classes to return
+
+        Returns:
+            list: the warm up targets ordered by popularity
+        """
+        counter = collections.Counter()
+        with open(path, errors="replace") as log_file:
+            for line in log_file:
+                match = cls.tt_path_regex.search(line)
+                if match and match.group(2).startswith("2"):
+                    counter[match.group(1)] += 1
+        targets = [WarmupTarget(qid) for qid, _count in counter.most_common(top)]
+        return targets
+
+    def get_targets(self) -> List[WarmupTarget]:
+        """
+        get the configured targets and the popular ones from the access log
+        """
+        targets = list(self.config.targets)
+        if self.config.access_log and os.path.isfile(self.config.access_log):
+            known = {(target.qid, target.predicate) for target in targets}
+            for target in self.targets_from_access_log(
+                self.config.access_log, self.config.top
+            ):
+                if (target.qid, target.predicate) not in known:
+                    targets.append(target)
+        return targets
+
+    @property
+    def endpoint(self) -> Endpoint:
+        endpoints_path = os.path.join(
+            os.path.dirname(__file__), "resources", "endpoints.yaml"
+        )
+        endpoints = EndpointManager.getEndpoints(
+            endpointPath=endpoints_path, lang="sparql", with_default=False
+        )
+        endpoint = endpoints.get(self.config.endpoint_name, None)
+        return endpoint
+
+    def is_fresh(self, cache: TTLCache, key: tuple) -> bool:
+        """
+        check whether the entry of the given key lives until the next run
+        """
+        fresh = cache.expires_in(key) >= self.config.interval
+        return fresh
+
+    def warm(self, target: WarmupTarget, endpoint: Endpoint) -> bool:
+        """
+        prefetch the analysis of the given target - entries that would expire
+        before the next run are refreshed with the warm up time to live
+
+        Returns:
+            bool: False if the warm up has been stopped
+        """
+        name = self.config.endpoint_name
+        ttl = self.config.ttl
+        if not self.limiter.acquire():
+            return False
+        # the item key of TrulyTabularDisplay.createTrulyTabular
+        tt = self.item_cache.get_truly_tabular(
+            itemQid=target.qid,
+            search_predicate=target.predicate,
+            endpointConf=endpoint,
+        )
+        if not self.limiter.acquire():
+            return False
+        count_key = (target.qid, target.predicate, name)
+        if not self.is_fresh(self.item_cache.counts, count_key):
+            self.item_cache.counts.invalidate(count_key)
+        count, _query = self.item_cache.count(tt, name, ttl=ttl)
+        self.queries += 2
+        if tt.error or not count:
+            return True
+        min_count = round(count * self.config.min_property_frequency / 100.0)
+        table_key = (target.qid, target.predicate, name, self.config.lang)
+        if not self.is_fresh(self.item_cache.property_tables, table_key):
+            self.item_cache.property_tables.invalidate(table_key)
+        property_lod = self.item_cache.get_property_table(table_key, min_count)
+        if property_lod is None:
+            if not self.limiter.acquire():
+                return False
+            templates = SparqlTemplates.get_instance()
+            mfp_query = templates.most_frequent_properties_query(tt, minCount=min_count)
+            reader = SparqlResultReader(endpoint)
+            property_lod = reader.query_as_lod(mfp_query.query)
+            self.queries += 1
+            self.item_cache.put_property_table(
+                table_key, min_count, property_lod, ttl=ttl
+            )
+        property_ids = [
+            record["prop"].replace("http://www.wikidata.org/entity/", "")
+            for record in property_lod[: self.config.max_stats_properties]
+        ]
+        properties = self.property_store.get_properties_by_ids(property_ids)
+        for property_id in property_ids:
+            wd_property = properties.get(property_id, None)
+            if wd_property is None:
+                continue
+            key = self.item_cache.stats_key(tt, name, property_id)
+            if self.is_fresh(self.item_cache.stats, key):
+                continue
+            self.item_cache.stats.invalidate(key)
+            if not self.limiter.acquire():
+                return False
+            self.item_cache.property_stats(tt, name, wd_property, count, ttl=ttl)
+            self.queries += 1
+        return True
+
+    def run(self):
+        """
+        run a warm up of all targets
+        """
+        endpoint = self.endpoint
+        if endpoint is None:
+            logging.warning(f"warm up: unknown endpoint {self.config.endpoint_name}")
+            return
+        start = time.time()
+        for target in self.get_targets():
+            try:
+                if not self.warm(target, endpoint):
+                    return
+            except Exception as ex:
+                logging.warning(f"warm up of {target.qid} failed: {ex}")
+        self.runs += 1
+        if self.debug:
+            elapsed = time.time() - start
+            print(f"warm up run {self.runs}: {self.queries} queries in {elapsed:.0f} s")
+
+    def on_timer(self):
+        self.run()
+        self.schedule()
+
+    def schedule(self, delay: float = None):
+        """
+        schedule the next warm up run
+        """
+        if self.limiter.stopped.is_set():
+            return
+        delay = self.config.interval if delay is None else delay
+        self.timer = threading.Timer(delay, self.on_timer)
+        self.timer.daemon = True
+        self.timer.start()
+
+    def start(self):
+        """
+        start warming up in the background right away and then on schedule
+        """
+        self.schedule(delay=0)
+
+    def stop(self):
+        self.limiter.stop()
+        if self.timer:
+            self.timer.cancel()
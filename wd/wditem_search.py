@@ -5,8 +5,13 @@ Created on 2024-01-03
 """
 
 import asyncio
-from typing import Callable
+import collections
+import threading
+import time
+from typing import Callable, Deque, Dict, List, Optional, Tuple
 
+import httpx
+import numpy as np
 from ez_wikidata.wdsearch import WikidataSearch
 from ngwidgets.lod_grid import ListOfDictsGrid
 from ngwidgets.webserver import WebSolution
@@ -14,11 +19,147 @@ from ngwidgets.widgets import Link
 from nicegui import ui
 
 
+class AdaptiveDebounce:
+    """
+    debounce delay adapted to the typing speed and the backend latency
+
+    the delay is 1.5 times the typical gap between two keystrokes so that
+    no search is started while the user is still typing - a slow backend
+    lengthens the delay to half its typical latency since a search started
+    too early costs a whole request that is cancelled again
+    """
+
+    def __init__(
+        self,
+        initial: float = 0.65,
+        min_delay: float = 0.1,
+        max_delay: float = 2.0,
+        pause: float = 2.0,
+        alpha: float = 0.3,
+    ):
+        """
+        constructor
+
+        Args:
+            initial(float): the initial keystroke gap and latency in seconds
+            min_delay(float): the minimum debounce delay in seconds
+            max_delay(float): the maximum debounce delay in seconds - not
+                shorter than the pause to stay above all counted keystroke gaps
+            pause(float): keystroke gaps longer than this are pauses and not counted
+            alpha(float): the weight of a new measurement in the moving averages
+        """
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.pause = pause
+        self.alpha = alpha
+        self.typing_gap = initial
+        self.latency = initial
+        self.last_keystroke: Optional[float] = None
+
+    def note_keystroke(self, now: float = None):
+        """
+        note a keystroke at the given monotonic time
+        """
+        now = time.monotonic() if now is None else now
+        if self.last_keystroke is not None:
+            gap = now - self.last_keystroke
+            if gap < self.pause:
+                self.typing_gap += self.alpha * (gap - self.typing_gap)
+        self.last_keystroke = now
+
+    def note_latency(self, latency: float):
+        """
+        note the latency of a completed search in seconds
+        """
+        self.latency += self.alpha * (latency - self.latency)
+
+    @property
+    def delay(self) -> float:
+        delay = max(1.5 * self.typing_gap, 0.5 * self.latency)
+        delay = min(max(delay, self.min_delay), self.max_delay)
+        return delay
+
+
+class SearchLatency:
+    """
+    process wide perceived latency of the item search from the last
+    keystroke to the shown result - per debounce mode so the fixed and
+    the adaptive debounce can be compared
+    """
+
+    _instance: Optional["SearchLatency"] = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, keep: int = 1000):
+        self.latencies: Dict[str, Deque[float]] = collections.defaultdict(
+            lambda: collections.deque(maxlen=keep)
+        )
+        self.counts = collections.Counter()
+
+    @classmethod
+    def get_instance(cls) -> "SearchLatency":
+        """
+        get the process wide search latency statistics
+        """
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = SearchLatency()
+        return cls._instance
+
+    def record(self, mode: str, latency: float):
+        """
+        record the perceived latency of a shown search result
+        """
+        self.latencies[mode].append(latency)
+
+    def note(self, mode: str, event: str):
+        """
+        count a search event e.g. started, cancelled or stale
+        """
+        self.counts[(mode, event)] += 1
+
+    def summary(self) -> List[dict]:
+        """
+        get the perceived latency percentiles per debounce mode
+        """
+        lod = []
+        for mode, latencies in sorted(self.latencies.items()):
+            values = np.array(latencies)
+            record = {
+                "mode": mode,
+                "searches": len(values),
+                "p50 s": round(float(np.percentile(values, 50)), 3),
+                "p95 s": round(float(np.percentile(values, 95)), 3),
+                "started": self.counts[(mode, "started")],
+                "cancelled": self.counts[(mode, "cancelled")],
+                "stale": self.counts[(mode, "stale")],
+            }
+            lod.append(record)
+        return lod
+
+    def asText(self) -> str:
+        text = " / ".join(
+            f"{record['mode']}: p50 {record['p50 s']:.2f} s "
+            f"p95 {record['p95 s']:.2f} s ({record['searches']} searches)"
+            for record in self.summary()
+        )
+        return text
+
+
 class WikidataItemSearch:
     """
     wikidata item search
+
+    every keystroke starts a new debounced search task and cancels the
+    previous one - the search request is sent asynchronously so that
+    cancelling the task also aborts an HTTP request in flight and results
+    of superseded searches are discarded by their sequence number
     """
 
+    api_url = "https://www.wikidata.org/w/api.php"
+    # shared by all clients - created on first use in the event loop
+    http_client: Optional[httpx.AsyncClient] = None
+
     def __init__(self, solution: WebSolution, record_filter: Callable = None, lang:str="en"):
         """
         Initialize the WikidataItemSearch with the given solution.
@@ -34,6 +175,13 @@ class WikidataItemSearch:
         self.wd_search = WikidataSearch(lang)
         self.search_debounce_task = None
         self.keyStrokeTime = 0.65  # minimum time in seconds to wait between keystrokes before starting searching
+        # adapt the debounce delay to the typing speed and the backend latency
+        self.adaptive = True
+        self.debounce = AdaptiveDebounce(initial=self.keyStrokeTime)
+        self.latency = SearchLatency.get_instance()
+        # sequence number of the latest keystroke
+        self.search_seq = 0
+        self.keystroke_time = None
         self.search_result_row = None
         self.setup()
 
@@ -53,45 +201,131 @@ class WikidataItemSearch:
                 self.search_input = ui.input(
                     label="search", on_change=self.on_search_change
                 ).props("size=80")
+            with ui.row():
+                ui.checkbox("adaptive debounce").bind_value(self, "adaptive")
+                self.latency_label = ui.label()
         with ui.row() as self.search_result_row:
             self.search_result_grid = ListOfDictsGrid()
 
+    @property
+    def mode(self) -> str:
+        mode = "adaptive" if self.adaptive else "fixed"
+        return mode
+
     async def on_search_change(self, _args):
         """
         react on changes in the search input
         """
-        # Cancel the existing search task if it's still waiting
-        if self.search_debounce_task:
+        self.search_seq += 1
+        self.keystroke_time = time.monotonic()
+        self.debounce.note_keystroke(self.keystroke_time)
+        # Cancel the existing search task - waiting or with a request in flight
+        if self.search_debounce_task and not self.search_debounce_task.done():
             self.search_debounce_task.cancel()
 
         # Create a new task for the new search
-        self.search_debounce_task = asyncio.create_task(self.debounced_search())
+        self.search_debounce_task = asyncio.create_task(
+            self.debounced_search(self.search_seq)
+        )
 
-    async def debounced_search(self):
+    @classmethod
+    def get_http_client(cls) -> httpx.AsyncClient:
+        if cls.http_client is None or cls.http_client.is_closed:
+            cls.http_client = httpx.AsyncClient(
+                headers={"User-Agent": WikidataSearch.get_user_agent()}
+            )
+        return cls.http_client
+
+    async def search_options(
+        self, search_for: str, limit: int
+    ) -> List[Tuple[str, str, str]]:
+        """
+        search asynchronously - see WikidataSearch.searchOptions
+
+        Returns:
+            list: qid, itemLabel and description tuples
+        """
+        params = {
+            "action": "wbsearchentities",
+            "language": self.lang,
+            "uselang": self.lang,
+            "format": "json",
+            "limit": limit,
+            "search": search_for,
+        }
+        response = await self.get_http_client().get(
+            self.api_url, params=params, timeout=self.wd_search.timeout
+        )
+        response.raise_for_status()
+        options = self.to_options(response.json().get("search", []))
+        return options
+
+    @staticmethod
+    def to_options(srlist: List[dict]) -> List[Tuple[str, str, str]]:
+        """
+        convert the wbsearchentities search results to option tuples
+        """
+        options = []
+        for sr in srlist:
+            qid = sr["id"]
+            itemLabel = sr.get("label", qid)
+            desc = sr.get("display", {}).get("description", {}).get("value", "")
+            options.append((qid, itemLabel, desc))
+        return options
+
+    async def debounced_search(self, seq: int):
         """
         Waits for a period of inactivity and then performs the search.
+
+        Args:
+            seq(int): the sequence number of the keystroke starting this search
         """
+        mode = self.mode
         try:
-            # Wait for the debounce period (keyStrokeTime)
-            await asyncio.sleep(self.keyStrokeTime)
+            # Wait for the debounce period
+            delay = self.debounce.delay if self.adaptive else self.keyStrokeTime
+            await asyncio.sleep(delay)
             search_for = self.search_input.value
-            if self.search_result_row:
-                with self.search_result_row:
-                    lang = self.lang
-                    ui.notify(f"searching wikidata for {search_for} ({lang})...")
-                    self.wd_search.language = lang
-                    wd_search_result = self.wd_search.searchOptions(
-                        search_for, limit=self.limit
-                    )
-                    view_lod = self.get_selection_view_lod(wd_search_result)
-                    self.search_result_grid.load_lod(view_lod)
-                    # self.search_result_grid.set_checkbox_selection("#")
-                    self.search_result_grid.update()
+            if not search_for or not self.search_result_row:
+                return
+            self.notify_search(search_for)
+            self.latency.note(mode, "started")
+            start = time.monotonic()
+            wd_search_result = await self.search_options(search_for, self.limit)
+            self.debounce.note_latency(time.monotonic() - start)
+            if seq != self.search_seq:
+                # a newer keystroke has superseded this search - the response
+                # arrived before the cancellation took effect
+                self.latency.note(mode, "stale")
+                return
+            self.show_result(wd_search_result)
+            self.latency.record(mode, time.monotonic() - self.keystroke_time)
+            self.latency_label.text = (
+                f"debounce {delay:.2f} s - perceived latency {self.latency.asText()}"
+            )
         except asyncio.CancelledError:
             # The search was cancelled because of new input, so just quietly exit
-            pass
+            self.latency.note(mode, "cancelled")
         except BaseException as ex:
-            self.solution.handle_exception(ex)
+            if seq == self.search_seq:
+                self.solution.handle_exception(ex)
+
+    def notify_search(self, search_for: str):
+        """
+        notify that the search for the given text has started
+        """
+        with self.search_result_row:
+            ui.notify(f"searching wikidata for {search_for} ({self.lang})...")
+
+    def show_result(self, wd_search_result: List[Tuple[str, str, str]]):
+        """
+        show the given search result in the result grid
+        """
+        with self.search_result_row:
+            view_lod = self.get_selection_view_lod(wd_search_result)
+            self.search_result_grid.load_lod(view_lod)
+            # self.search_result_grid.set_checkbox_selection("#")
+            self.search_result_grid.update()
 
     def get_selection_view_lod(self, wd_search_result: list) -> dict:
         """
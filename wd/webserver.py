@@ -7,10 +7,21 @@ Created on 2024-01-03
 from ngwidgets.input_webserver import InputWebserver, InputWebSolution
 from ngwidgets.webserver import WebserverConfig
 from ngwidgets.widgets import Link
-from nicegui import Client, ui
-
+from nicegui import Client, app, ui
+from starlette.requests import Request
+from starlette.responses import HTMLResponse, JSONResponse, PlainTextResponse
+
+from wd.admin import AdminAccess
+from wd.admission import AdmissionController
+from wd.class_comparison_display import ClassComparisonDisplay
+from wd.cost_model import QueryCostModel
+from wd.profiler import SamplingProfiler
+from wd.profiler_view import ProfilerView
+from wd.property_store import PropertyStore
+from wd.sessions_view import SessionsView
 from wd.truly_tabular_display import TrulyTabularConfig, TrulyTabularDisplay
 from wd.version import Version
+from wd.warmup import CacheWarmer, WarmupConfig
 from wd.wditem_search import WikidataItemSearch
 
 
@@ -38,6 +49,14 @@ class WdgridWebServer(InputWebserver):
     def __init__(self):
         """Constructs all the necessary attributes for the WebServer object."""
         InputWebserver.__init__(self, config=WdgridWebServer.get_config())
+        # preload the wikidata property metadata shared by all clients
+        PropertyStore.get_instance().start()
+        # prefetch popular classes if ~/.wdgrid/warmup.yaml is configured
+        self.cache_warmer = None
+        warmup_config = WarmupConfig.load()
+        if warmup_config:
+            self.cache_warmer = CacheWarmer(warmup_config)
+            self.cache_warmer.start()
 
         @ui.page("/tt/{qid}")
         async def truly_tabular(client: Client, qid: str):
@@ -46,6 +65,83 @@ class WdgridWebServer(InputWebserver):
             """
             await self.page(client, WdgridSolution.truly_tabular, qid)
 
+        @ui.page("/compare/{qids}")
+        async def compare(client: Client, qids: str):
+            """
+            compare the property frequencies of the given comma separated Wikidata QIDs
+            """
+            await self.page(client, WdgridSolution.compare, qids)
+
+        @ui.page("/admin/profiler")
+        async def profiler(client: Client):
+            """
+            arm the sampling profiler and download the profiles
+            """
+            await self.page(client, WdgridSolution.show_profiler)
+
+        @ui.page("/admin/sessions")
+        async def sessions(client: Client):
+            """
+            show the memory used by the open sessions
+            """
+            await self.page(client, WdgridSolution.show_sessions)
+
+        @app.get(AdminAccess.login_path)
+        def admin_login_form(request: Request):
+            """
+            show the admin login form
+            """
+            next_path = request.query_params.get("next", "/admin/sessions")
+            return HTMLResponse(AdminAccess.login_form(next_path))
+
+        @app.post(AdminAccess.login_path)
+        async def admin_login(request: Request):
+            """
+            log in with the admin token
+            """
+            return await AdminAccess.login(request)
+
+        @app.get("/admin/metrics/admission")
+        def admission_metrics(request: Request):
+            """
+            get the queue depth and wait time metrics of the admission control
+            """
+            if not AdminAccess.is_admin(request):
+                return JSONResponse({"error": "forbidden"}, status_code=403)
+            return JSONResponse(AdmissionController.get_instance().metrics())
+
+        @app.get("/admin/metrics/cost")
+        def cost_metrics(request: Request):
+            """
+            get the prediction accuracy and strategy decisions of the query cost model
+            """
+            if not AdminAccess.is_admin(request):
+                return JSONResponse({"error": "forbidden"}, status_code=403)
+            cost_model = QueryCostModel.get_instance()
+            return JSONResponse(
+                {
+                    "accuracy": cost_model.accuracy(),
+                    "strategies": dict(cost_model.decisions),
+                }
+            )
+
+        @app.get("/admin/profiler/{profile_id}.folded")
+        def download_profile(request: Request, profile_id: int):
+            """
+            download the collapsed stacks of the given profile
+            """
+            if not AdminAccess.is_admin(request):
+                return PlainTextResponse("forbidden", status_code=403)
+            for profile in SamplingProfiler.get_instance().profiles:
+                if profile.id == profile_id:
+                    return PlainTextResponse(
+                        profile.folded(),
+                        headers={
+                            "Content-Disposition": f"attachment; filename=wdgrid-profile-{profile_id}.folded"
+                        },
+                    )
+            return PlainTextResponse("profile not found", status_code=404)
+
 
 class WdgridSolution(InputWebSolution):
     """
@@ -70,6 +166,47 @@ class WdgridSolution(InputWebSolution):
 
         await self.setup_content_div(show)
 
+    async def compare(self, qids: str):
+        """
+        show a side by side comparison of the given Wikidata classes
+
+        Args:
+            qids(str): comma separated Wikidata ids of the classes to compare
+        """
+
+        def show():
+            self.ccd = ClassComparisonDisplay(self, qids)
+
+        await self.setup_content_div(show)
+
+    async def show_profiler(self):
+        """
+        show the profiler admin view
+        """
+
+        def show():
+            if AdminAccess.is_admin(self.client.request):
+                self.profiler_view = ProfilerView(self)
+            else:
+                ui.label("the profiler is only available to admins")
+                ui.link("login", f"{AdminAccess.login_path}?next=/admin/profiler")
+
+        await self.setup_content_div(show)
+
+    async def show_sessions(self):
+        """
+        show the sessions admin view
+        """
+
+        def show():
+            if AdminAccess.is_admin(self.client.request):
+                self.sessions_view = SessionsView(self)
+            else:
+                ui.label("the sessions view is only available to admins")
+                ui.link("login", f"{AdminAccess.login_path}?next=/admin/sessions")
+
+        await self.setup_content_div(show)
+
     def configure_settings(self):
         """
         extra settings